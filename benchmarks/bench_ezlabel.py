@@ -0,0 +1,502 @@
+# ------------------------------------------------------------------------------
+# File: benchmarks/bench_ezlabel.py
+# Description: Headless benchmark of label I/O, hit-testing, folder listing and
+#              the draw pipeline. Results are printed (or saved) as JSON.
+#
+# Usage:
+#   python benchmarks/bench_ezlabel.py                     # quick profile
+#   python benchmarks/bench_ezlabel.py --profile full -o bench.json
+# ------------------------------------------------------------------------------
+
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import PIL
+from PIL import Image
+
+from modules import workspace_draw
+from modules.crop_export import CROP_MODES, export_image_crops
+from modules.duplicates import cluster_duplicates
+from modules.geometry import polygon_iou
+from modules.image_cache import DecodedImageCache
+from modules.image_files import list_image_files, open_display_image
+from modules.labels_handler import LabelHandler
+from modules.multi_frame import FrameSource
+from modules.selection import select_in_lasso, select_in_rect
+from modules.spatial_index import SnapIndex
+from modules.thumbnails import ThumbnailCache
+from modules.workspace import WorkspaceFrame
+from modules.workspace_draw import WorkspaceDrawer
+from modules.workspace_polygons import WorkspacePolygons
+
+PROFILES = {
+    "quick": {
+        "polygons": [1, 50],
+        "vertices": [4, 200],
+        "files": [1000],
+        "image_size": (1280, 960),
+        "repeat": 3,
+        "queries": 200,
+    },
+    "full": {
+        "polygons": [1, 50, 500],
+        "vertices": [4, 100, 2000],
+        "files": [1000, 10000, 100000],
+        "image_size": (4000, 3000),
+        "repeat": 5,
+        "queries": 1000,
+    },
+}
+
+COLORS = ["#FF0000", "#00FF00", "#0000FF", "#FFFF00", "#FF00FF", "#00FFFF", "#000000", "#FFFFFF"]
+
+
+# ----------------------------
+# Headless stand-ins for Tk
+# ----------------------------
+
+
+class StubCanvas:
+    """Counts canvas item operations instead of drawing them."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.items = 0
+        self.calls = 0
+
+    def _create(self, *args, **kwargs):
+        self.items += 1
+        self.calls += 1
+        return self.items
+
+    create_line = create_oval = create_image = create_rectangle = _create
+
+    def delete(self, *args):
+        self.calls += 1
+
+    def coords(self, *args):
+        self.calls += 1
+
+    def config(self, **kwargs):
+        self.calls += 1
+
+    configure = config
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+
+class _StubPhotoImage:
+    def __init__(self, image=None, **kwargs):
+        self.image = image
+
+
+class _StubImageTk:
+    PhotoImage = _StubPhotoImage
+
+
+class StubWorkspace:
+    """
+    Minimal WorkspaceFrame replacement: it reuses the real geometry/hit-testing
+    methods of WorkspaceFrame, with a StubCanvas in place of the Tk canvas.
+    """
+
+    _to_image_coords = WorkspaceFrame._to_image_coords
+    _to_canvas_coords = WorkspaceFrame._to_canvas_coords
+    _find_point_near = WorkspaceFrame._find_point_near
+    _check_near_point = WorkspaceFrame._check_near_point
+    _find_segment_near = WorkspaceFrame._find_segment_near
+    _point_to_segment_distance = WorkspaceFrame._point_to_segment_distance
+
+    def __init__(self, image, canvas_size=(1200, 800)):
+        self.image = image
+        self.base_width = image.width
+        self.base_height = image.height
+        self.canvas = StubCanvas(*canvas_size)
+        self.scale = min(canvas_size[0] / image.width, canvas_size[1] / image.height)
+        self.offset_x = 0
+        self.offset_y = 0
+        self.line_color = COLORS[0]
+        self.is_drawing_segment = False
+        self.temp_point = None
+        self.poly_manager = WorkspacePolygons(self)
+        self.drawer = WorkspaceDrawer(self)
+
+    def event_generate(self, *args, **kwargs):
+        pass
+
+    def prompt_class_selection(self):
+        return "0"
+
+
+# ----------------------------
+# Synthetic data
+# ----------------------------
+
+
+def make_polygon(rng, width, height, n_vertices):
+    """A jittered polygon around a random center (vertices sorted by angle) inside the image."""
+    r = rng.uniform(0.02, 0.2) * min(width, height)
+    cx = rng.uniform(r, width - r)
+    cy = rng.uniform(r, height - r)
+    pts = []
+    for i in range(n_vertices):
+        a = 2 * math.pi * i / n_vertices
+        rr = r * rng.uniform(0.8, 1.0)
+        pts.append((cx + rr * math.cos(a), cy + rr * math.sin(a)))
+    return pts
+
+
+def fill_workspace(ws, rng, n_polygons, n_vertices):
+    pm = ws.poly_manager
+    pm.clear_all()
+    for i in range(n_polygons):
+        pts = make_polygon(rng, ws.base_width, ws.base_height, n_vertices)
+        pm.add_polygon(pts, COLORS[i % len(COLORS)], str(i % 15), record=False)
+
+
+def populate_folder(folder, n_files, sample_image):
+    """Creates 'n_files' image entries (hardlinks to one sample when possible) plus labels."""
+    os.makedirs(folder, exist_ok=True)
+    for i in range(n_files):
+        dst = os.path.join(folder, f"img_{i:06d}.jpg")
+        try:
+            os.link(sample_image, dst)
+        except OSError:
+            shutil.copyfile(sample_image, dst)
+        if i % 2 == 0:
+            with open(os.path.join(folder, f"img_{i:06d}.txt"), "w", encoding="utf-8") as f:
+                f.write("0 0.1 0.1 0.2 0.1 0.2 0.2\n")
+
+
+# ----------------------------
+# Timing
+# ----------------------------
+
+
+def timeit(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return {
+        "repeat": repeat,
+        "min_s": min(samples),
+        "median_s": statistics.median(samples),
+        "mean_s": statistics.fmean(samples),
+    }
+
+
+def _git_revision():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            timeout=10,
+        )
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(profile_name, workdir, seed):
+    profile = PROFILES[profile_name]
+    repeat = profile["repeat"]
+    n_queries = profile["queries"]
+    rng = random.Random(seed)
+    results = []
+
+    def add(name, params, stats, **extra):
+        entry = {"name": name, "params": params}
+        entry.update(stats)
+        entry.update(extra)
+        results.append(entry)
+        print(f"{name:<24} {json.dumps(params):<48} {stats['median_s'] * 1000:10.3f} ms", file=sys.stderr)
+
+    width, height = profile["image_size"]
+    image = Image.new("RGB", (width, height), (90, 120, 150))
+    sample_path = os.path.join(workdir, "sample.jpg")
+    image.save(sample_path, quality=90)
+    palette_path = os.path.join(workdir, "sample_palette.png")
+    image.convert("P").save(palette_path)
+    for path in (sample_path, palette_path):
+        add(
+            "open_display_image",
+            {"image_size": [width, height], "format": os.path.splitext(path)[1]},
+            timeit(lambda: open_display_image(path), repeat),
+        )
+    # Miniaturas: geração (JPEG com draft) e leitura do cache em disco
+    thumbs = ThumbnailCache(os.path.join(workdir, "thumbnails"))
+    add(
+        "thumbnail_make",
+        {"image_size": [width, height]},
+        timeit(lambda: thumbs.make(sample_path), repeat),
+    )
+    thumbs.load(sample_path)
+    add(
+        "thumbnail_cache_hit",
+        {"image_size": [width, height]},
+        timeit(lambda: thumbs.load(sample_path), repeat),
+    )
+
+    # Cache decodificado: leitura via mmap (o primeiro load só preenche o cache)
+    cache = DecodedImageCache(os.path.join(workdir, "image_cache"), min_pixels=0)
+    cache.load(sample_path)
+    add(
+        "image_cache_hit",
+        {"image_size": [width, height]},
+        timeit(lambda: cache.load(sample_path), repeat),
+    )
+    # TIFF de várias páginas: abrir (índice das páginas) e saltar para a última
+    tiff_path = os.path.join(workdir, "sample_pages.tif")
+    n_pages = 20
+    image.save(tiff_path, save_all=True, append_images=[image] * (n_pages - 1))
+
+    def open_and_jump():
+        source = FrameSource(tiff_path)
+        source.get(n_pages - 1)
+        source.close()
+
+    add(
+        "frame_open_and_jump",
+        {"image_size": [width, height], "frames": n_pages},
+        timeit(open_and_jump, repeat),
+    )
+    image = open_display_image(sample_path)
+
+    # Troca apenas o PhotoImage (precisa de um Tk ativo) pelo stub
+    workspace_draw.ImageTk = _StubImageTk
+
+    handler = LabelHandler(normalize=True)
+    handler.current_image_path = sample_path
+    label_path = os.path.join(workdir, "sample.txt")
+
+    for n_polygons in profile["polygons"]:
+        for n_vertices in profile["vertices"]:
+            params = {"polygons": n_polygons, "vertices": n_vertices}
+            ws = StubWorkspace(image)
+            fill_workspace(ws, rng, n_polygons, n_vertices)
+            polygons = ws.poly_manager.polygons
+
+            stats = timeit(lambda: handler.save_labels(polygons, width, height, label_path), repeat)
+            add("save_labels", params, stats, bytes=os.path.getsize(label_path))
+
+            handler.normalize = False
+            handler.save_labels(polygons, width, height, label_path)
+            handler.normalize = True
+            add("load_labels", params, timeit(lambda: handler.load_labels(label_path, ws), repeat))
+
+            fill_workspace(ws, rng, n_polygons, n_vertices)
+            all_pts = [
+                tuple(xy) for poly in ws.poly_manager.polygons.values() for xy in poly.coords.tolist()
+            ]
+            queries = []
+            for _ in range(n_queries):
+                if rng.random() < 0.5:
+                    x, y = rng.choice(all_pts)
+                    queries.append((x + rng.uniform(-3, 3), y + rng.uniform(-3, 3)))
+                else:
+                    queries.append((rng.uniform(0, width), rng.uniform(0, height)))
+
+            def run_point_queries():
+                for x, y in queries:
+                    ws._find_point_near(x, y)
+
+            def run_segment_queries():
+                for x, y in queries:
+                    ws._find_segment_near(x, y, radius=10)
+
+            stats = timeit(run_point_queries, repeat)
+            add("find_point_near", params, stats, per_query_s=stats["median_s"] / n_queries)
+            stats = timeit(run_segment_queries, repeat)
+            add("find_segment_near", params, stats, per_query_s=stats["median_s"] / n_queries)
+
+            # Sessão de arrasto: índice montado uma vez, consultado a cada movimento
+            drag_key = next(iter(ws.poly_manager.polygons))
+            build_snap = lambda: SnapIndex.from_polygons(
+                ws.poly_manager.polygons, exclude=(drag_key, 0), cell_size=10
+            )
+            add("snap_index_build", params, timeit(build_snap, repeat))
+            snap_index = build_snap()
+
+            def run_snap_queries():
+                for x, y in queries:
+                    snap_index.nearest(x, y, 10)
+
+            stats = timeit(run_snap_queries, repeat)
+            add("snap_nearest", params, stats, per_query_s=stats["median_s"] / n_queries)
+
+            # Seleção sobre todos os polígonos: metade da imagem / laço circular de 200 pontos
+            add(
+                "select_rect",
+                params,
+                timeit(lambda: select_in_rect(polygons, 0, 0, width / 2, height / 2), repeat),
+            )
+            lasso = [
+                (width / 2 + width / 3 * math.cos(a), height / 2 + height / 3 * math.sin(a))
+                for a in (2 * math.pi * i / 200 for i in range(200))
+            ]
+            add("select_lasso", params, timeit(lambda: select_in_lasso(polygons, lasso), repeat))
+
+            # Caminho vetorial (um item por vértice) para comparação com o overlay
+            ws.drawer.overlay_threshold = None
+            ws.canvas.items = 0
+            add("draw_polygons", params, timeit(ws.drawer._draw_polygons, repeat))
+            results[-1]["canvas_items"] = ws.canvas.items // repeat
+            # draw_all reaproveita o quadro da imagem (caso do arrasto de pontos)
+            add("draw_all", params, timeit(ws.drawer.draw_all, repeat))
+
+            # Um vértice movido: só o polígono sujo é redesenhado
+            pm = ws.poly_manager
+            moved_key = next(iter(pm.polygons))
+
+            def move_and_refresh():
+                x, y = pm.polygons[moved_key].coords[0]
+                pm.move_point(moved_key, 0, x + 0.5, y)
+                ws.drawer.refresh()
+
+            ws.canvas.items = 0
+            add("refresh_one_polygon", params, timeit(move_and_refresh, repeat))
+            results[-1]["canvas_items"] = ws.canvas.items // repeat
+
+            # Overlay rasterizado: os demais polígonos viram uma imagem RGBA e só
+            # o polígono arrastado (ativo) continua como itens do canvas
+            ws.drawer.overlay_threshold = 0
+
+            def render_overlay():
+                ws.drawer._overlay_key = None
+                ws.drawer.draw_all()
+
+            ws.canvas.items = 0
+            add("draw_all_overlay", params, timeit(render_overlay, repeat))
+            results[-1]["canvas_items"] = ws.canvas.items // repeat
+            pm.active_key = moved_key
+            ws.drawer.draw_all()
+            ws.canvas.items = 0
+            add("refresh_one_polygon_overlay", params, timeit(move_and_refresh, repeat))
+            results[-1]["canvas_items"] = ws.canvas.items // repeat
+
+    # Exportação de recortes de uma imagem com 20 polígonos (recorte da caixa / com máscara)
+    crop_ws = StubWorkspace(image)
+    fill_workspace(crop_ws, rng, 20, 50)
+    handler.save_labels(crop_ws.poly_manager.polygons, width, height, label_path)
+    crops_dir = os.path.join(workdir, "crops")
+    for mode in CROP_MODES:
+
+        def export_crops():
+            export_image_crops(sample_path, label_path, crops_dir, mode=mode)
+
+        add(
+            "export_image_crops",
+            {"image_size": [width, height], "polygons": 20, "mode": mode},
+            timeit(export_crops, repeat),
+        )
+
+    # Reamostragem da parte visível da imagem: alta qualidade e quadro rápido
+    ws = StubWorkspace(image)
+    for fast in (False, True):
+
+        def render_image():
+            ws.drawer._frame_key = None
+            ws.drawer._draw_image(fast)
+
+        name = "render_image_fast" if fast else "render_image"
+        add(name, {"image_size": [width, height], "scale": ws.scale}, timeit(render_image, repeat))
+
+    # IoU de um polígono consigo mesmo: recorte exato (convexo) e grade (estrela
+    # auto-intersectante, que não pode seguir o caminho convexo); ambos devem dar 1.0
+    star_angles = [4 * math.pi * i / 5 for i in range(5)]
+    iou_shapes = {
+        "convex": [(100, 100), (300, 100), (300, 300), (100, 300)],
+        "star": [(200 + 100 * math.cos(a), 200 + 100 * math.sin(a)) for a in star_angles],
+    }
+    for shape, coords in iou_shapes.items():
+        iou = polygon_iou(coords, coords)
+        if abs(iou - 1.0) > 1e-9:
+            raise RuntimeError(f"polygon_iou({shape}, {shape}) = {iou}, expected 1.0")
+        add("polygon_iou", {"shape": shape}, timeit(lambda: polygon_iou(coords, coords), repeat))
+
+    # Agrupamento de hashes perceptuais (multi-index): cópias a 1-3 bits do original
+    hash_rng = random.Random(seed)
+    for n_hashes in (1000, 10000):
+        hashes = {f"img{i}": hash_rng.getrandbits(64) for i in range(n_hashes)}
+        for i in range(0, n_hashes, 10):
+            flips = sum(1 << b for b in hash_rng.sample(range(64), hash_rng.randint(1, 3)))
+            hashes[f"img{i}_copy"] = hashes[f"img{i}"] ^ flips
+        add(
+            "cluster_duplicates",
+            {"hashes": len(hashes), "max_distance": 6},
+            timeit(lambda: cluster_duplicates(hashes, 6), repeat),
+        )
+
+    for n_files in profile["files"]:
+        folder = os.path.join(workdir, f"folder_{n_files}")
+        populate_folder(folder, n_files, sample_path)
+        add(
+            "list_image_files",
+            {"files": n_files},
+            timeit(lambda: list_image_files(folder), repeat),
+        )
+        shutil.rmtree(folder, ignore_errors=True)
+
+    return {
+        "meta": {
+            "profile": profile_name,
+            "seed": seed,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EZLabel headless benchmarks")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick")
+    parser.add_argument("-o", "--output", help="JSON output file (default: stdout)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", help="Directory for synthetic data (default: temp dir)")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ezlabel_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        report = run(args.profile, workdir, args.seed)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,20 @@
-import shutil
+import threading
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
+from tkinter import ttk, messagebox, filedialog, simpledialog
 import os
 
+import numpy as np
+
 from modules.workspace import WorkspaceFrame
 from modules.labels_handler import LabelHandler
+from modules.dataset_split import SplitCommitter, label_path_for, transfer_file
+from modules.crop_export import CropExporter
+from modules.duplicates import DuplicateFinder, cluster_keeper, copy_cluster_labels
+from modules.image_cache import DecodedImageCache
+from modules.image_files import IMAGE_EXTENSIONS, list_image_files
+from modules.multi_frame import frame_label_path
+from modules.overlap_audit import OverlapAuditor, read_label_polygons
+from modules.thumbnail_grid import ThumbnailGrid
 
 
 class Tooltip:
@@ -70,28 +80,47 @@ class MainApplication(tk.Tk):
         self.label_handler = LabelHandler()
         self.active_color = "#FF0000"
 
-        # Bindings para teclas de navegação e modos de desenho
-        self.bind_all("<Key-Down>", self._on_key_down)
-        self.bind_all("<Key-Up>", self._on_key_up)
-        self.bind_all("<Key-f>", self._on_shortcut_free)
-        self.bind_all("<Key-b>", self._on_shortcut_box)
-        self.bind_all("<Key-r>", self._on_shortcut_rect)
-        self.bind_all("<Key-c>", self._on_shortcut_c_lection)
-        self.bind_all("<Key-w>", self._on_key_up)
-        self.bind_all("<Key-a>", self._on_key_up)
-        self.bind_all("<Key-s>", self._on_key_down)
-        self.bind_all("<Key-d>", self._on_key_down)
-        self.bind_all("<Key-q>", self.generate_label_file)
+        # Bindings para teclas de navegação e modos de desenho. Atalhos de uma
+        # tecla só valem na janela principal, fora de campos de texto (ver
+        # _is_workspace_shortcut): digitar nos diálogos não troca de imagem etc.
+        shortcut = self._shortcut
+        self.bind_all("<Key-Down>", shortcut(self._on_key_down, in_file_list=True))
+        self.bind_all("<Key-Up>", shortcut(self._on_key_up, in_file_list=True))
+        self.bind_all("<Key-f>", shortcut(self._on_shortcut_free, in_file_list=True))
+        self.bind_all("<Key-b>", shortcut(self._on_shortcut_box, in_file_list=True))
+        self.bind_all("<Key-r>", shortcut(self._on_shortcut_rect, in_file_list=True))
+        self.bind_all("<Key-c>", shortcut(self._on_shortcut_c_lection, in_file_list=True))
+        self.bind_all("<Key-w>", shortcut(self._on_key_up, in_file_list=True))
+        self.bind_all("<Key-a>", shortcut(self._on_key_up, in_file_list=True))
+        self.bind_all("<Key-s>", shortcut(self._on_key_down, in_file_list=True))
+        self.bind_all("<Key-d>", shortcut(self._on_key_down, in_file_list=True))
+        self.bind_all("<Key-q>", shortcut(self.generate_label_file, in_file_list=True))
+        self.bind_all("<Control-z>", lambda e: self.workspace_frame.undo())
+        self.bind_all("<Control-Z>", lambda e: self.workspace_frame.redo())
+        self.bind_all("<Control-y>", lambda e: self.workspace_frame.redo())
+        self.bind_all("<Key-Delete>", shortcut(lambda e: self.workspace_frame.delete_selection()))
+        self.bind_all("<Key-e>", shortcut(lambda e: self.workspace_frame.extract_selection()))
+        self.bind_all(
+            "<Key-Escape>",
+            shortcut(lambda e: self.workspace_frame.clear_selection(), in_file_list=True),
+        )
+        # Páginas de TIFF / frames de GIF
+        self.bind_all(
+            "<Key-Prior>", shortcut(lambda e: self.show_frame(self.workspace_frame.frame_index - 1))
+        )
+        self.bind_all(
+            "<Key-Next>", shortcut(lambda e: self.show_frame(self.workspace_frame.frame_index + 1))
+        )
 
         # Bind em cada cor usando as teclas numéricas (topo do teclado):
-        self.bind_all("<Key-1>", lambda e: self._on_color_button_click("#FF0000"))
-        self.bind_all("<Key-2>", lambda e: self._on_color_button_click("#00FF00"))
-        self.bind_all("<Key-3>", lambda e: self._on_color_button_click("#0000FF"))
-        self.bind_all("<Key-4>", lambda e: self._on_color_button_click("#FFFF00"))
-        self.bind_all("<Key-5>", lambda e: self._on_color_button_click("#FF00FF"))
-        self.bind_all("<Key-6>", lambda e: self._on_color_button_click("#00FFFF"))
-        self.bind_all("<Key-7>", lambda e: self._on_color_button_click("#000000"))
-        self.bind_all("<Key-8>", lambda e: self._on_color_button_click("#FFFFFF"))
+        for key, color in enumerate(
+            ["#FF0000", "#00FF00", "#0000FF", "#FFFF00", "#FF00FF", "#00FFFF", "#000000", "#FFFFFF"],
+            start=1,
+        ):
+            self.bind_all(
+                f"<Key-{key}>",
+                shortcut(lambda e, c=color: self._on_color_button_click(c), in_file_list=True),
+            )
 
         self._create_toolbar()
 
@@ -107,6 +136,8 @@ class MainApplication(tk.Tk):
 
         self._create_files_list()
         self.current_folder = None
+        self.hidden_files = set()  # duplicatas recolhidas na lista de arquivos
+        self.thumbnail_grid = None
 
     def _place_on_current_monitor(self, w=1200, h=600):
         """Centraliza a janela principal no monitor em que o mouse está,
@@ -131,6 +162,7 @@ class MainApplication(tk.Tk):
         )
         if folder_selected:
             self.current_folder = folder_selected
+            self.hidden_files = set()
             self._update_files_list()
             if self.files_listbox.size() > 0:
                 self.files_listbox.selection_clear(0, tk.END)
@@ -158,6 +190,33 @@ class MainApplication(tk.Tk):
         self.mode_combo.set("selection")
         self._on_mode_changed(event)
 
+    def _is_workspace_shortcut(self, event, in_file_list=False):
+        """
+        False when the key went to a text widget or to another window (dialogs,
+        thumbnail grid): there the key belongs to the widget. With
+        'in_file_list', the file list counts as part of the workspace (for keys
+        the Listbox does not use itself).
+        """
+        widget = event.widget
+        if isinstance(widget, str):  # widgets internos do Tk (ex.: diálogos de arquivo)
+            return False
+        if isinstance(widget, (tk.Entry, tk.Text, tk.Spinbox)):
+            return False
+        if isinstance(widget, ttk.Entry) and not widget.instate(["readonly"]):
+            return False  # Combobox "readonly" (modo de desenho) não recebe texto
+        if isinstance(widget, tk.Listbox) and not in_file_list:
+            return False
+        return widget.winfo_toplevel() is self
+
+    def _shortcut(self, handler, in_file_list=False):
+        """Wraps a key handler so it only runs for workspace shortcuts (see above)."""
+
+        def on_key(event):
+            if self._is_workspace_shortcut(event, in_file_list):
+                return handler(event)
+
+        return on_key
+
     def _create_toolbar(self):
         """Creates a toolbar with color squares, zoom combobox, etc."""
         toolbar = tk.Frame(self, bd=2, relief=tk.RAISED)
@@ -201,6 +260,10 @@ class MainApplication(tk.Tk):
         btn_zoom_fit = tk.Button(toolbar, text="Fit", command=self.zoom_fit)
         btn_zoom_fit.pack(side=tk.LEFT, padx=2)
 
+        # "Frame i/n" só aparece para arquivos com vários frames
+        self.frame_var = tk.StringVar(value="")
+        tk.Label(toolbar, textvariable=self.frame_var).pack(side=tk.LEFT, padx=5)
+
         btn_generate = tk.Button(
             toolbar, text="Generate Label", command=self.generate_label_file
         )
@@ -225,6 +288,36 @@ class MainApplication(tk.Tk):
         )
         self.overwrite_check.pack(side=tk.LEFT, padx=5, pady=2)
 
+        tools_button = tk.Menubutton(toolbar, text="Tools", relief=tk.RAISED)
+        self.tools_menu = tk.Menu(tools_button, tearoff=False)
+        self.tools_menu.add_command(
+            label="Commit Folder to Splits...", command=self.commit_folder
+        )
+        self.tools_menu.add_command(
+            label="Find Overlapping Labels...", command=self.find_overlaps
+        )
+        self.tools_menu.add_command(
+            label="Find Duplicate Images...", command=self.find_duplicates
+        )
+        self.tools_menu.add_command(label="Export Crops...", command=self.export_crops)
+        self.tools_menu.add_command(label="Thumbnail Grid...", command=self.show_thumbnail_grid)
+        self.tools_menu.add_command(label="Go to Frame...", command=self.go_to_frame)
+        self.tools_menu.add_command(label="Event Handler Stats", command=self.show_event_stats)
+        self.image_cache_var = tk.BooleanVar(value=False)
+        self.tools_menu.add_checkbutton(
+            label="Cache Decoded Large Images",
+            variable=self.image_cache_var,
+            command=self._on_image_cache_switch,
+        )
+        self.clean_labels_var = tk.BooleanVar(value=self.label_handler.normalize)
+        self.tools_menu.add_checkbutton(
+            label="Clean Up Polygons on Save",
+            variable=self.clean_labels_var,
+            command=self._on_clean_labels_switch,
+        )
+        tools_button.config(menu=self.tools_menu)
+        tools_button.pack(side=tk.LEFT, padx=5, pady=2)
+
         color_list = [
             "#FF0000",
             "#00FF00",
@@ -271,11 +364,11 @@ class MainApplication(tk.Tk):
             self.workspace_frame.load_image(filepath)
             self.label_handler.current_image_path = filepath
 
-            base_name, ext = os.path.splitext(filename)
-            txt_filename = base_name + ".txt"
-            txt_filepath = os.path.join(self.current_folder, txt_filename)
+            txt_filepath = self._current_label_path()
             if os.path.exists(txt_filepath):
                 self.label_handler.load_labels(txt_filepath, self.workspace_frame)
+            self._recover_unsaved_edits()
+            self._update_frame_label()
         else:
             messagebox.showwarning("Warning", f"File not found: {filepath}")
 
@@ -319,11 +412,11 @@ class MainApplication(tk.Tk):
         self.files_listbox.delete(0, tk.END)
         if not self.current_folder:
             return
-        image_extensions = (".jpg", ".jpeg", ".png", ".bmp", ".gif")
-        for f in os.listdir(self.current_folder):
-            if not f.lower().endswith(image_extensions):
-                continue
-            self.files_listbox.insert(tk.END, f)
+        files = list_image_files(self.current_folder)
+        if self.hidden_files:
+            files = [name for name in files if name not in self.hidden_files]
+        if files:
+            self.files_listbox.insert(tk.END, *files)
 
     def zoom_fit(self):
         self.workspace_frame.zoom_to_fit()
@@ -370,11 +463,67 @@ class MainApplication(tk.Tk):
         image_path = filedialog.askopenfilename(
             parent=self,
             title="Select an image",
-            filetypes=[("Image files", "*.jpg *.jpeg *.png *.bmp *.gif")],
+            filetypes=[
+                ("Image files", " ".join("*" + ext for ext in IMAGE_EXTENSIONS))
+            ],
         )
         if image_path:
             self.workspace_frame.load_image(image_path)
             self.label_handler.current_image_path = image_path
+            self._recover_unsaved_edits()
+            self._update_frame_label()
+
+    def _current_label_path(self):
+        """Sibling .txt of the current image, or 'name_fNNNN.txt' for a frame of a multi-frame file."""
+        image_path = self.label_handler.current_image_path
+        if self.workspace_frame.frame_source is not None:
+            return frame_label_path(image_path, self.workspace_frame.frame_index)
+        return label_path_for(image_path)
+
+    def _update_frame_label(self):
+        ws = self.workspace_frame
+        if ws.frame_source is not None:
+            self.frame_var.set(f"Frame {ws.frame_index + 1}/{ws.n_frames}")
+        else:
+            self.frame_var.set("")
+
+    def show_frame(self, frame):
+        """Shows another frame of the current multi-frame file, with its labels."""
+        ws = self.workspace_frame
+        image_path = self.label_handler.current_image_path
+        if ws.frame_source is None or not image_path:
+            return
+        frame = max(0, min(frame, ws.n_frames - 1))
+        if frame == ws.frame_index:
+            return
+        ws.load_image(image_path, frame)
+        txt_path = self._current_label_path()
+        if os.path.exists(txt_path):
+            self.label_handler.load_labels(txt_path, ws)
+        self._recover_unsaved_edits()
+        self._update_frame_label()
+
+    def go_to_frame(self):
+        ws = self.workspace_frame
+        if ws.frame_source is None:
+            messagebox.showinfo("Go to Frame", "The current image has a single frame.")
+            return
+        frame = simpledialog.askinteger(
+            "Go to Frame",
+            f"Frame (1-{ws.n_frames}):",
+            parent=self,
+            minvalue=1,
+            maxvalue=ws.n_frames,
+            initialvalue=ws.frame_index + 1,
+        )
+        if frame:
+            self.show_frame(frame - 1)
+
+    def _recover_unsaved_edits(self):
+        """Replays the edit journal of the loaded image, if edits were left unsaved."""
+        if self.workspace_frame.recover_unsaved_edits():
+            tip = Tooltip(self.btn_generate, "Unsaved edits recovered")
+            tip.show()
 
     def open_label_file(self):
         if not self.workspace_frame.image:
@@ -388,6 +537,8 @@ class MainApplication(tk.Tk):
         if txt_path:
             if os.path.exists(txt_path):
                 self.label_handler.load_labels(txt_path, self.workspace_frame)
+                # Os rótulos carregados passam a ser a base das próximas edições
+                self.workspace_frame.journal.discard()
             else:
                 messagebox.showwarning("Warning", f"File not found: {txt_path}")
 
@@ -405,14 +556,17 @@ class MainApplication(tk.Tk):
             messagebox.showwarning("Warning", "No image path set.")
             return
 
+        ws = self.workspace_frame
+        is_frame = ws.frame_source is not None
         if self.overwrite_label_var.get():
-            label_dest_path = os.path.splitext(current_image_path)[0] + ".txt"
+            label_dest_path = self._current_label_path()
             self.label_handler.save_labels(
                 self.workspace_frame.polygons,
                 self.workspace_frame.image.width,
                 self.workspace_frame.image.height,
                 label_dest_path=label_dest_path,
             )
+            self.workspace_frame.journal.discard()
         else:
             train_dir = os.path.join(os.getcwd(), "train")
             images_dir = os.path.join(train_dir, "images")
@@ -420,7 +574,7 @@ class MainApplication(tk.Tk):
             os.makedirs(images_dir, exist_ok=True)
             os.makedirs(labels_dir, exist_ok=True)
 
-            base_name = os.path.splitext(os.path.basename(current_image_path))[0]
+            base_name = os.path.splitext(os.path.basename(self._current_label_path()))[0]
             label_dest_path = os.path.join(labels_dir, base_name + ".txt")
 
             self.label_handler.save_labels(
@@ -429,30 +583,45 @@ class MainApplication(tk.Tk):
                 self.workspace_frame.image.height,
                 label_dest_path=label_dest_path,
             )
-
-            image_dest_path = os.path.join(
-                images_dir, os.path.basename(current_image_path)
-            )
-            try:
-                shutil.move(current_image_path, image_dest_path)
-            except Exception as e:
-                messagebox.showerror("Error", f"Error moving image file: {str(e)}")
-                return
-
-            self.workspace_frame.clear_workspace()
-            self._update_files_list()
-            messagebox.showinfo(
-                "Success", "Label generated and image moved successfully."
-            )
+            self.workspace_frame.journal.discard()
+
+            if is_frame:
+                # O arquivo de vários frames fica no lugar; só o frame vai para o treino
+                try:
+                    ws.image.convert("RGB").save(os.path.join(images_dir, base_name + ".png"))
+                except OSError as e:
+                    messagebox.showerror("Error", f"Error saving frame image: {str(e)}")
+                    return
+            else:
+                image_dest_path = os.path.join(
+                    images_dir, os.path.basename(current_image_path)
+                )
+                try:
+                    transfer_file(current_image_path, image_dest_path, mode="move")
+                except Exception as e:
+                    messagebox.showerror("Error", f"Error moving image file: {str(e)}")
+                    return
+
+                self.workspace_frame.clear_workspace()
+                self._update_files_list()
+                messagebox.showinfo(
+                    "Success", "Label generated and image moved successfully."
+                )
 
         tip = Tooltip(self.btn_generate, "Label generated successfully")
         tip.show()
+        if self.thumbnail_grid is not None and self.thumbnail_grid.winfo_exists():
+            self.thumbnail_grid.refresh_item(os.path.basename(current_image_path))
+
+        if is_frame and ws.frame_index < ws.n_frames - 1:
+            self.show_frame(ws.frame_index + 1)
+            return
 
         if self.files_listbox.size() > 0:
             current_selection = self.files_listbox.curselection()
             if current_selection:
                 current_index = current_selection[0]
-                if self.overwrite_label_var.get():
+                if self.overwrite_label_var.get() or is_frame:
                     new_index = (
                         current_index + 1
                         if current_index < self.files_listbox.size() - 1
@@ -473,6 +642,503 @@ class MainApplication(tk.Tk):
             self._on_shortcut_free(event)
             
 
+    def commit_folder(self):
+        """
+        Commits every labeled image of the current folder (image + sibling .txt)
+        into train/val/test splits, in a background thread.
+        """
+        if not self.current_folder:
+            messagebox.showwarning("Warning", "Open a folder first.")
+            return
+        images = [
+            os.path.join(self.current_folder, self.files_listbox.get(i))
+            for i in range(self.files_listbox.size())
+        ]
+        labeled = [p for p in images if os.path.exists(label_path_for(p))]
+
+        dialog = tk.Toplevel(self)
+        dialog.title("Commit Folder")
+        dialog.attributes("-topmost", True)
+        dialog.transient(self)
+
+        tk.Label(dialog, text=f"{len(labeled)} labeled image(s) in folder").grid(
+            row=0, column=0, columnspan=3, padx=10, pady=5
+        )
+
+        tk.Label(dialog, text="Destination:").grid(row=1, column=0, sticky="e", padx=5)
+        dest_var = tk.StringVar(value=os.getcwd())
+        tk.Entry(dialog, textvariable=dest_var, width=40).grid(row=1, column=1, padx=5)
+        tk.Button(
+            dialog,
+            text="...",
+            command=lambda: dest_var.set(
+                filedialog.askdirectory(parent=dialog, mustexist=False)
+                or dest_var.get()
+            ),
+        ).grid(row=1, column=2, padx=5)
+
+        ratio_vars = {}
+        for row, (split, default) in enumerate(
+            (("train", "80"), ("val", "10"), ("test", "10")), start=2
+        ):
+            tk.Label(dialog, text=f"{split} %:").grid(row=row, column=0, sticky="e", padx=5)
+            ratio_vars[split] = tk.StringVar(value=default)
+            tk.Entry(dialog, textvariable=ratio_vars[split], width=6).grid(
+                row=row, column=1, sticky="w", padx=5
+            )
+
+        tk.Label(dialog, text="Mode:").grid(row=5, column=0, sticky="e", padx=5)
+        mode_combo = ttk.Combobox(
+            dialog, values=["move", "link", "copy"], state="readonly", width=6
+        )
+        mode_combo.current(0)
+        mode_combo.grid(row=5, column=1, sticky="w", padx=5)
+
+        stratify_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(dialog, text="Stratify by class", variable=stratify_var).grid(
+            row=6, column=1, sticky="w", padx=5
+        )
+
+        status = tk.Label(dialog, text="")
+        status.grid(row=8, column=0, columnspan=3, padx=10, pady=5)
+        state = {"done": 0, "total": 0, "result": None}
+
+        def poll():
+            if state["result"] is None:
+                status.config(text=f"{state['done']} / {state['total']}")
+                dialog.after(200, poll)
+                return
+            committed, errors = state["result"]
+            if isinstance(errors, str):
+                messagebox.showerror("Error", errors, parent=dialog)
+            elif errors:
+                messagebox.showwarning(
+                    "Commit",
+                    f"{committed} committed, {len(errors)} failed "
+                    f"(run again to resume).\n{errors[0][0]}: {errors[0][1]}",
+                    parent=dialog,
+                )
+            else:
+                messagebox.showinfo("Commit", f"{committed} image(s) committed.", parent=dialog)
+            dialog.destroy()
+            if mode_combo.get() == "move":
+                self.workspace_frame.clear_workspace()
+                self._update_files_list()
+
+        def on_progress(done, total):
+            state["done"] = done
+            state["total"] = total
+
+        def run(committer):
+            try:
+                state["result"] = committer.commit(labeled, progress=on_progress)
+            except Exception as e:
+                state["result"] = (0, str(e))
+
+        def start():
+            try:
+                ratios = tuple(float(ratio_vars[s].get()) for s in ("train", "val", "test"))
+            except ValueError:
+                messagebox.showwarning("Warning", "Invalid split ratios.", parent=dialog)
+                return
+            committer = SplitCommitter(
+                dest_var.get(),
+                ratios=ratios,
+                mode=mode_combo.get(),
+                stratify=stratify_var.get(),
+            )
+            if not labeled and not committer.has_pending_manifest():
+                messagebox.showinfo("Commit", "Nothing to commit.", parent=dialog)
+                return
+            btn_commit.config(state="disabled")
+            threading.Thread(target=run, args=(committer,), daemon=True).start()
+            poll()
+
+        btn_commit = tk.Button(dialog, text="Commit", command=start)
+        btn_commit.grid(row=7, column=1, pady=5)
+
+    def export_crops(self):
+        """
+        Exports every labeled region of the current folder as an image crop
+        (bounding box, or polygon on a transparent background) into one folder
+        per class, in a process pool.
+        """
+        if not self.current_folder:
+            messagebox.showwarning("Warning", "Open a folder first.")
+            return
+        folder = self.current_folder
+
+        dialog = tk.Toplevel(self)
+        dialog.title("Export Crops")
+        dialog.attributes("-topmost", True)
+        dialog.transient(self)
+
+        tk.Label(dialog, text="Destination:").grid(row=0, column=0, sticky="e", padx=5)
+        dest_var = tk.StringVar(value=os.path.join(os.getcwd(), "crops"))
+        tk.Entry(dialog, textvariable=dest_var, width=40).grid(row=0, column=1, padx=5)
+        tk.Button(
+            dialog,
+            text="...",
+            command=lambda: dest_var.set(
+                filedialog.askdirectory(parent=dialog, mustexist=False)
+                or dest_var.get()
+            ),
+        ).grid(row=0, column=2, padx=5)
+
+        tk.Label(dialog, text="Crop:").grid(row=1, column=0, sticky="e", padx=5)
+        mode_combo = ttk.Combobox(dialog, values=["bbox", "mask"], state="readonly", width=6)
+        mode_combo.current(0)
+        mode_combo.grid(row=1, column=1, sticky="w", padx=5)
+
+        status = tk.Label(dialog, text="")
+        status.grid(row=3, column=0, columnspan=3, padx=10, pady=5)
+        state = {"done": 0, "total": 0, "result": None}
+
+        def poll():
+            if state["result"] is None:
+                status.config(text=f"{state['done']} / {state['total']}")
+                dialog.after(200, poll)
+                return
+            result = state["result"]
+            if isinstance(result, str):
+                messagebox.showerror("Error", result, parent=dialog)
+                dialog.destroy()
+                return
+            summary = (
+                f"{result['crops']} crop(s) from {result['images']} image(s) in "
+                f"{result['seconds']:.1f} s ({result['images_per_s']:.1f} images/s, "
+                f"{result['crops_per_s']:.1f} crops/s)."
+            )
+            if result["errors"]:
+                path, message = result["errors"][0]
+                messagebox.showwarning(
+                    "Export Crops",
+                    f"{summary}\n{len(result['errors'])} image(s) failed.\n{path}: {message}",
+                    parent=dialog,
+                )
+            else:
+                messagebox.showinfo("Export Crops", summary, parent=dialog)
+            dialog.destroy()
+
+        def on_progress(done, total):
+            state["done"] = done
+            state["total"] = total
+
+        def run(exporter):
+            try:
+                state["result"] = exporter.export_folder(folder, progress=on_progress)
+            except Exception as e:
+                state["result"] = str(e)
+
+        def start():
+            exporter = CropExporter(
+                dest_var.get(), class_names=self.class_definitions, mode=mode_combo.get()
+            )
+            btn_export.config(state="disabled")
+            threading.Thread(target=run, args=(exporter,), daemon=True).start()
+            poll()
+
+        btn_export = tk.Button(dialog, text="Export", command=start)
+        btn_export.grid(row=2, column=1, pady=5)
+
+    def find_overlaps(self):
+        """
+        Scans every label file of the current folder (in a process pool) for
+        polygons overlapping above an IoU threshold: duplicates and the same
+        object labeled with two classes. Double-click a result to open it.
+        """
+        if not self.current_folder:
+            messagebox.showwarning("Warning", "Open a folder first.")
+            return
+        folder = self.current_folder
+
+        dialog = tk.Toplevel(self)
+        dialog.title("Overlapping Labels")
+        dialog.transient(self)
+
+        top = tk.Frame(dialog)
+        top.pack(fill=tk.X, padx=10, pady=5)
+        tk.Label(top, text="IoU >=").pack(side=tk.LEFT)
+        iou_var = tk.StringVar(value="0.7")
+        tk.Entry(top, textvariable=iou_var, width=6).pack(side=tk.LEFT, padx=5)
+        btn_scan = tk.Button(top, text="Scan")
+        btn_scan.pack(side=tk.LEFT, padx=5)
+        status = tk.Label(top, text="")
+        status.pack(side=tk.LEFT, padx=5)
+
+        results_list = tk.Listbox(dialog, width=90, height=20)
+        results_list.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        state = {"done": 0, "total": 0, "result": None}
+        findings = []
+
+        def poll():
+            if state["result"] is None:
+                status.config(text=f"{state['done']} / {state['total']}")
+                dialog.after(200, poll)
+                return
+            btn_scan.config(state="normal")
+            if isinstance(state["result"], str):
+                messagebox.showerror("Error", state["result"], parent=dialog)
+                return
+            findings[:] = state["result"]
+            status.config(text=f"{len(findings)} pair(s) found")
+            results_list.delete(0, tk.END)
+            for f in findings:
+                kind = "conflict" if f["kind"] == "class_conflict" else "duplicate"
+                results_list.insert(
+                    tk.END,
+                    f"{os.path.basename(f['image'])}  [{kind}]  "
+                    f"#{f['a'] + 1} (class {f['class_a']}) vs #{f['b'] + 1} "
+                    f"(class {f['class_b']})  IoU {f['iou']:.2f}",
+                )
+
+        def on_progress(done, total):
+            state["done"] = done
+            state["total"] = total
+
+        def run(auditor):
+            try:
+                state["result"] = auditor.audit_folder(folder, progress=on_progress)
+            except Exception as e:
+                state["result"] = str(e)
+
+        def start():
+            try:
+                threshold = float(iou_var.get())
+            except ValueError:
+                messagebox.showwarning("Warning", "Invalid IoU threshold.", parent=dialog)
+                return
+            state.update(done=0, total=0, result=None)
+            btn_scan.config(state="disabled")
+            threading.Thread(
+                target=run, args=(OverlapAuditor(iou_threshold=threshold),), daemon=True
+            ).start()
+            poll()
+
+        def jump(event=None):
+            sel = results_list.curselection()
+            if not sel:
+                return
+            self._open_overlap_finding(findings[sel[0]])
+
+        btn_scan.config(command=start)
+        results_list.bind("<Double-Button-1>", jump)
+        results_list.bind("<Return>", jump)
+
+    def find_duplicates(self):
+        """
+        Finds near-duplicate images in the current folder (perceptual hashes,
+        in a process pool) and lets the user collapse them in the file list or
+        copy the labels of an annotated copy to the others.
+        """
+        if not self.current_folder:
+            messagebox.showwarning("Warning", "Open a folder first.")
+            return
+        folder = self.current_folder
+
+        dialog = tk.Toplevel(self)
+        dialog.title("Duplicate Images")
+        dialog.transient(self)
+
+        top = tk.Frame(dialog)
+        top.pack(fill=tk.X, padx=10, pady=5)
+        tk.Label(top, text="Max. distance (bits):").pack(side=tk.LEFT)
+        distance_var = tk.StringVar(value="6")
+        tk.Entry(top, textvariable=distance_var, width=4).pack(side=tk.LEFT, padx=5)
+        method_combo = ttk.Combobox(top, values=["dhash", "phash"], state="readonly", width=7)
+        method_combo.current(0)
+        method_combo.pack(side=tk.LEFT, padx=5)
+        btn_scan = tk.Button(top, text="Scan")
+        btn_scan.pack(side=tk.LEFT, padx=5)
+        status = tk.Label(top, text="")
+        status.pack(side=tk.LEFT, padx=5)
+
+        results_list = tk.Listbox(dialog, width=90, height=20)
+        results_list.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        bottom = tk.Frame(dialog)
+        bottom.pack(fill=tk.X, padx=10, pady=5)
+        btn_collapse = tk.Button(bottom, text="Collapse in File List", state="disabled")
+        btn_collapse.pack(side=tk.LEFT, padx=5)
+        btn_copy = tk.Button(bottom, text="Copy Labels to Unlabeled Copies", state="disabled")
+        btn_copy.pack(side=tk.LEFT, padx=5)
+        btn_show_all = tk.Button(bottom, text="Show All Files")
+        btn_show_all.pack(side=tk.LEFT, padx=5)
+
+        state = {"done": 0, "total": 0, "result": None}
+        clusters = []
+
+        def poll():
+            if state["result"] is None:
+                status.config(text=f"{state['done']} / {state['total']} hashed")
+                dialog.after(200, poll)
+                return
+            btn_scan.config(state="normal")
+            if isinstance(state["result"], str):
+                messagebox.showerror("Error", state["result"], parent=dialog)
+                return
+            clusters[:] = state["result"]
+            status.config(text=f"{len(clusters)} group(s) of near duplicates")
+            results_list.delete(0, tk.END)
+            for cluster in clusters:
+                keeper = cluster_keeper(folder, cluster)
+                others = [name for name in cluster if name != keeper]
+                results_list.insert(tk.END, f"{keeper}  <-  {', '.join(others)}")
+            state_buttons = "normal" if clusters else "disabled"
+            btn_collapse.config(state=state_buttons)
+            btn_copy.config(state=state_buttons)
+
+        def on_progress(done, total):
+            state["done"] = done
+            state["total"] = total
+
+        def run(finder):
+            try:
+                state["result"] = finder.find(folder, progress=on_progress)
+            except Exception as e:
+                state["result"] = str(e)
+
+        def start():
+            try:
+                distance = int(distance_var.get())
+            except ValueError:
+                messagebox.showwarning("Warning", "Invalid distance.", parent=dialog)
+                return
+            state.update(done=0, total=0, result=None)
+            btn_scan.config(state="disabled")
+            finder = DuplicateFinder(max_distance=distance, method=method_combo.get())
+            threading.Thread(target=run, args=(finder,), daemon=True).start()
+            poll()
+
+        def collapse():
+            if folder != self.current_folder:
+                return
+            for cluster in clusters:
+                keeper = cluster_keeper(folder, cluster)
+                self.hidden_files.update(name for name in cluster if name != keeper)
+            self._update_files_list()
+
+        def show_all():
+            if folder != self.current_folder:
+                return
+            self.hidden_files = set()
+            self._update_files_list()
+
+        def copy_labels():
+            if not messagebox.askyesno(
+                "Copy Labels",
+                "Copy the label file of each group's annotated image to the copies "
+                "that have no label yet? Existing labels are not touched.",
+                parent=dialog,
+            ):
+                return
+            try:
+                copied = copy_cluster_labels(folder, clusters)
+            except OSError as e:
+                messagebox.showerror("Error", f"Error copying labels: {str(e)}", parent=dialog)
+                return
+            messagebox.showinfo(
+                "Copy Labels", f"{len(copied)} label file(s) copied.", parent=dialog
+            )
+
+        def jump(event=None):
+            sel = results_list.curselection()
+            if not sel or folder != self.current_folder:
+                return
+            self._open_file_by_name(cluster_keeper(folder, clusters[sel[0]]))
+
+        btn_scan.config(command=start)
+        btn_collapse.config(command=collapse)
+        btn_show_all.config(command=show_all)
+        btn_copy.config(command=copy_labels)
+        results_list.bind("<Double-Button-1>", jump)
+        results_list.bind("<Return>", jump)
+
+    def _open_overlap_finding(self, finding):
+        """Opens the image of an overlap finding and selects both polygons' vertices."""
+        if os.path.dirname(finding["image"]) != self.current_folder:
+            return
+        name = os.path.basename(finding["image"])
+        if name not in self.files_listbox.get(0, tk.END):
+            return
+        self._open_file_by_name(name)
+
+        # O journal pode ter reaplicado edições (removendo ou reordenando
+        # polígonos), então a posição no .txt não basta: cada polígono do achado
+        # é procurado pelas coordenadas; os que mudaram ficam sem seleção.
+        ws = self.workspace_frame
+        try:
+            label_polygons = read_label_polygons(finding["label"])
+        except (OSError, UnicodeDecodeError):
+            return
+        size = np.array([ws.image.width, ws.image.height], dtype=np.float64)
+        pm = ws.poly_manager
+        selection = {}
+        for i in (finding["a"], finding["b"]):
+            if i >= len(label_polygons):
+                continue
+            target = label_polygons[i][1] * size
+            for key, poly in pm.polygons.items():
+                if (
+                    key not in selection
+                    and poly.coords.shape == target.shape
+                    and np.allclose(poly.coords, target, atol=0.5)
+                ):
+                    selection[key] = range(len(poly))
+                    break
+        pm.set_selection(selection)
+        ws.drawer.refresh()
+
+    def show_thumbnail_grid(self):
+        """Opens a thumbnail grid of the current folder; double-click opens the file."""
+        if not self.current_folder:
+            messagebox.showwarning("Warning", "Open a folder first.")
+            return
+        if self.thumbnail_grid is not None and self.thumbnail_grid.winfo_exists():
+            self.thumbnail_grid.close()
+        self.thumbnail_grid = ThumbnailGrid(
+            self,
+            self.current_folder,
+            self.files_listbox.get(0, tk.END),
+            on_open=self._open_file_by_name,
+        )
+
+    def _open_file_by_name(self, name):
+        names = self.files_listbox.get(0, tk.END)
+        if name not in names:
+            return
+        index = names.index(name)
+        self.files_listbox.selection_clear(0, tk.END)
+        self.files_listbox.selection_set(index)
+        self.files_listbox.see(index)
+        self._on_file_selected(index=index)
+
+    def _on_image_cache_switch(self):
+        """Turns the memory-mapped cache of decoded large images on or off."""
+        if self.image_cache_var.get():
+            self.workspace_frame.image_cache = DecodedImageCache()
+        else:
+            self.workspace_frame.image_cache = None
+
+    def _on_clean_labels_switch(self):
+        """Drops duplicate/collinear vertices from the polygons when saving labels."""
+        self.label_handler.normalize = self.clean_labels_var.get()
+
+    def show_event_stats(self):
+        """Shows how often each canvas event handler ran and how long it took."""
+        stats = self.workspace_frame.events.dispatcher.stats()
+        if not stats:
+            messagebox.showinfo("Event Stats", "No events handled yet.")
+            return
+        lines = []
+        for name, st in sorted(stats.items(), key=lambda kv: -kv[1]["total_s"]):
+            avg_ms = st["total_s"] / st["calls"] * 1000 if st["calls"] else 0.0
+            lines.append(
+                f"{name}: {st['events']} events, {st['coalesced']} coalesced, "
+                f"{st['calls']} calls, avg {avg_ms:.2f} ms, max {st['max_s'] * 1000:.2f} ms"
+            )
+        messagebox.showinfo("Event Stats", "\n".join(lines))
+
     def set_zoom_percentage(self):
         def apply_zoom():
             try:
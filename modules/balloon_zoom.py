@@ -1,21 +1,82 @@
 import tkinter as tk
-from PIL import Image, ImageTk, ImageDraw
+from PIL import Image, ImageTk
+
+# Interpolações disponíveis para ampliar o recorte
+INTERPOLATIONS = {
+    "nearest": Image.Resampling.NEAREST,
+    "bicubic": Image.Resampling.BICUBIC,
+    "lanczos": Image.Resampling.LANCZOS,
+}
 
 
 class BalloonZoom:
     """
     Exibe uma mini-janela (balloon) com parte da imagem ampliada
     enquanto um ponto de polígono é arrastado.
+
+    A janela, o canvas e a PhotoImage são criados uma única vez: entre
+    arrastos a janela só é escondida, e cada quadro é colado na mesma
+    PhotoImage (paste). O ponto arrastado é um item do canvas movido por
+    cima da imagem, então o recorte só é refeito quando a janela de
+    recorte (em pixels inteiros da imagem) muda de fato.
+
+    Os recortes saem de um "patch" RGB já convertido, 'patch_factor' vezes
+    maior que o balloon, buscado na imagem original só quando o recorte sai
+    dele; assim o custo por movimento não depende do tamanho da imagem.
     """
 
-    def __init__(self, parent_canvas):
+    def __init__(
+        self,
+        parent_canvas,
+        zoom_levels=(2.0, 3.0, 4.0),
+        interpolation="nearest",
+        patch_factor=4,
+    ):
+        """
+        :param zoom_levels: Fatores de ampliação disponíveis (o primeiro é o inicial).
+        :param interpolation: "nearest" (pixels nítidos), "bicubic" ou "lanczos".
+        :param patch_factor: Tamanho do patch em cache, em múltiplos do recorte.
+        """
         self.parent_canvas = parent_canvas
         self.zoom_window = None
         # Aumentamos o tamanho da região do baloon e a ampliação.
         # Se antes era 50 e zoom_factor=2.0, agora dobramos ambos.
         self.zoom_size = 100  # área crua recortada da imagem
-        self.zoom_factor = 2.0  # fator de ampliação aplicado ao recorte
+        self.zoom_levels = tuple(zoom_levels)
+        self.zoom_factor = self.zoom_levels[0]  # fator de ampliação aplicado ao recorte
+        self.resample = INTERPOLATIONS[interpolation]
+        self.patch_factor = max(1, int(patch_factor))
+        self._patch = None
+        self._patch_key = None  # (imagem, x0, y0) do patch em cache
         self.zoom_canvas = None
+        self.photo = None
+        self.marker_id = None
+        self._photo_size = None
+        self._rendered_key = None  # (imagem, x1, y1) do último recorte desenhado
+        self._position = None
+
+    def set_zoom_factor(self, factor):
+        """Muda a ampliação (vale a partir da próxima atualização)."""
+        if factor > 0 and factor != self.zoom_factor:
+            self.zoom_factor = factor
+            self._rendered_key = None
+
+    def cycle_zoom(self, step=1):
+        """Passa para o próximo (step=1) ou anterior (step=-1) nível de ampliação."""
+        levels = self.zoom_levels
+        if self.zoom_factor in levels:
+            idx = levels.index(self.zoom_factor) + step
+        else:
+            idx = 0
+        self.set_zoom_factor(levels[max(0, min(len(levels) - 1, idx))])
+
+    def set_interpolation(self, interpolation):
+        """Define a interpolação: 'nearest', 'bicubic' ou 'lanczos'."""
+        self.resample = INTERPOLATIONS[interpolation]
+        self._rendered_key = None
+
+    def _output_size(self):
+        return max(1, int(self.zoom_size * self.zoom_factor))
 
     def _create_window(self):
         """Cria a janela de zoom (balloon), caso ainda não exista."""
@@ -26,6 +87,7 @@ class BalloonZoom:
             self.zoom_window.attributes("-alpha", 1)
             # Remove a decoração da janela:
             self.zoom_window.overrideredirect(True)
+            self.zoom_window.withdraw()
             # Aqui definimos um tamanho inicial maior, pois tudo foi dobrado:
             self.zoom_canvas = tk.Canvas(
                 self.zoom_window,
@@ -36,6 +98,65 @@ class BalloonZoom:
             )
             self.zoom_canvas.pack()
 
+        size = self._output_size()
+        if self._photo_size != size:
+            # Só recria a PhotoImage se o tamanho de saída mudou
+            self.photo = ImageTk.PhotoImage("RGB", (size, size))
+            self.zoom_canvas.delete("all")
+            self.zoom_canvas.config(width=size, height=size)
+            self.zoom_canvas.create_image(0, 0, anchor=tk.NW, image=self.photo)
+            self.marker_id = self.zoom_canvas.create_oval(
+                0, 0, 0, 0, fill="yellow", outline="yellow"
+            )
+            self._photo_size = size
+            self._rendered_key = None
+
+    def _fetch_patch(self, image, x1, y1):
+        """
+        Garante que o patch em cache cubra o recorte em (x1, y1); senão, recorta
+        um novo patch RGB centrado nele (o que cai fora da imagem fica preto).
+        """
+        size = self.zoom_size
+        if self._patch_key is not None:
+            image_id, x0, y0 = self._patch_key
+            patch_size = self._patch.width
+            if (
+                image_id == id(image)
+                and x0 <= x1
+                and y0 <= y1
+                and x1 + size <= x0 + patch_size
+                and y1 + size <= y0 + patch_size
+            ):
+                return x0, y0
+
+        patch_size = size * self.patch_factor
+        x0 = x1 + size // 2 - patch_size // 2
+        y0 = y1 + size // 2 - patch_size // 2
+        patch = Image.new("RGB", (patch_size, patch_size), color=(0, 0, 0))
+
+        # Recorta apenas a parte que existe dentro da imagem:
+        overlap_x1 = max(0, x0)
+        overlap_y1 = max(0, y0)
+        overlap_x2 = min(image.width, x0 + patch_size)
+        overlap_y2 = min(image.height, y0 + patch_size)
+        if overlap_x2 > overlap_x1 and overlap_y2 > overlap_y1:
+            region = image.crop((overlap_x1, overlap_y1, overlap_x2, overlap_y2))
+            if region.mode != "RGB":
+                region = region.convert("RGB")
+            patch.paste(region, (overlap_x1 - x0, overlap_y1 - y0))
+
+        self._patch = patch
+        self._patch_key = (id(image), x0, y0)
+        return x0, y0
+
+    def _render(self, image, x1, y1):
+        """Cola na PhotoImage o recorte de 'zoom_size' px com canto em (x1, y1)."""
+        x0, y0 = self._fetch_patch(image, x1, y1)
+        size = self.zoom_size
+        crop = self._patch.crop((x1 - x0, y1 - y0, x1 - x0 + size, y1 - y0 + size))
+        out = self._output_size()
+        self.photo.paste(crop.resize((out, out), self.resample))
+
     def update_zoom_view(
         self, image, x, y, scale, mouse_x_root=None, mouse_y_root=None, point_radius=3
     ):
@@ -51,80 +172,42 @@ class BalloonZoom:
         # Garante que a janela de zoom exista:
         self._create_window()
 
-        # Tamanho (em pixels da imagem) que queremos recortar ao redor do ponto:
-        balloon_size = self.zoom_size
-        half = balloon_size / 2.0
-
-        # Coordenadas "ideais" do recorte na imagem, sem clamping:
-        balloon_x1 = x - half
-        balloon_y1 = y - half
-        balloon_x2 = balloon_x1 + balloon_size
-        balloon_y2 = balloon_y1 + balloon_size
-
-        # Calcula a região que efetivamente cai dentro da imagem:
-        overlap_x1 = max(0, balloon_x1)
-        overlap_y1 = max(0, balloon_y1)
-        overlap_x2 = min(image.width, balloon_x2)
-        overlap_y2 = min(image.height, balloon_y2)
-
-        # Cria uma base toda em preto, do tamanho exato de balloon_size:
-        base = Image.new("RGB", (balloon_size, balloon_size), color=(0, 0, 0))
-
-        # Recorta apenas a parte que existe dentro da imagem:
-        if overlap_x2 > overlap_x1 and overlap_y2 > overlap_y1:
-            region = image.crop((overlap_x1, overlap_y1, overlap_x2, overlap_y2))
-        else:
-            # Se não há interseção, retorna rapidamente (estamos fora da imagem).
-            region = None
-
-        # Calcula onde a região recortada deve ser "colada" dentro de 'base':
-        paste_x = overlap_x1 - balloon_x1
-        paste_y = overlap_y1 - balloon_y1
-
-        if region:
-            base.paste(region, (int(paste_x), int(paste_y)))
-
-        # Desenha o ponto amarelo na base (o ponto está em coords do balloon):
-        px = x - balloon_x1
-        py = y - balloon_y1
-        draw = ImageDraw.Draw(base)
-        r = point_radius
-        draw.ellipse((px - r, py - r, px + r, py + r), fill="yellow", outline="yellow")
-
-        # Aplica o fator de zoom final:
-        final_w = int(balloon_size * self.zoom_factor)
-        final_h = int(balloon_size * self.zoom_factor)
-        if final_w < 1:
-            final_w = 1
-        if final_h < 1:
-            final_h = 1
-        zoomed = base.resize((final_w, final_h), Image.Resampling.NEAREST)
-
-        # Atualiza o canvas com a imagem final ampliada:
-        photo = ImageTk.PhotoImage(zoomed)
-        self.zoom_canvas.delete("all")
-        # Ajusta dinamicamente o tamanho do canvas à imagem resultante
-        self.zoom_canvas.config(width=final_w, height=final_h)
-        self.zoom_canvas.create_image(0, 0, anchor=tk.NW, image=photo)
-        self.zoom_canvas.image = photo
+        # Canto do recorte em pixels inteiros da imagem:
+        x1 = int(round(x - self.zoom_size / 2.0))
+        y1 = int(round(y - self.zoom_size / 2.0))
+        key = (id(image), x1, y1)
+        if key != self._rendered_key:
+            self._render(image, x1, y1)
+            self._rendered_key = key
+
+        # O ponto é um item do canvas: move sem redesenhar pixels
+        f = self.zoom_factor
+        px = (x - x1) * f
+        py = (y - y1) * f
+        r = point_radius * f
+        self.zoom_canvas.coords(self.marker_id, px - r, py - r, px + r, py + r)
 
         # Posiciona o balloon perto do cursor:
         offset_x = 20
         offset_y = -100
         if mouse_x_root is not None and mouse_y_root is not None:
-            pos_x = mouse_x_root + offset_x
-            pos_y = mouse_y_root + offset_y
-            self.zoom_window.geometry(f"+{pos_x}+{pos_y}")
+            position = (mouse_x_root + offset_x, mouse_y_root + offset_y)
         else:
             # Fallback: posiciona relativo ao canvas e ao ponto.
             root_x = self.parent_canvas.winfo_rootx()
             root_y = self.parent_canvas.winfo_rooty()
-            self.zoom_window.geometry(
-                f"+{root_x + int((x*scale)+20)}" f"+{root_y + int((y*scale)-100)}"
-            )
+            position = (root_x + int((x * scale) + 20), root_y + int((y * scale) - 100))
+        if position != self._position:
+            self.zoom_window.geometry(f"+{position[0]}+{position[1]}")
+            self._position = position
+        if self.zoom_window.state() == "withdrawn":
+            self.zoom_window.deiconify()
 
     def hide_zoom_view(self):
-        """Esconde a janela (balloon) de zoom."""
+        """Esconde a janela (balloon) de zoom, mantendo-a para o próximo arrasto."""
         if self.zoom_window:
-            self.zoom_window.destroy()
-            self.zoom_window = None
+            self.zoom_window.withdraw()
+        # A imagem pode mudar até o próximo arrasto
+        self._rendered_key = None
+        self._patch = None
+        self._patch_key = None
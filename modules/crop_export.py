@@ -0,0 +1,158 @@
+# ------------------------------------------------------------------------------
+# File: modules/crop_export.py
+# Description: Batch export of the labeled regions of a folder as image crops,
+#              one folder per class (input of a second-stage classifier).
+# ------------------------------------------------------------------------------
+
+import os
+import re
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from .dataset_split import label_path_for
+from .image_files import list_image_files, open_display_image
+from .overlap_audit import read_label_polygons
+
+CROP_MODES = ("bbox", "mask")
+
+
+def class_folder_name(class_id, class_names):
+    """Folder of a class: its name from class_definitions (or the id), safe for the filesystem."""
+    name = class_names.get(class_id, class_id) if class_names else class_id
+    return re.sub(r'[\\/:*?"<>|]+', "_", str(name)).strip() or str(class_id)
+
+
+def export_image_crops(image_path, label_path, out_dir, class_names=None, mode="bbox"):
+    """
+    Writes one crop per polygon of 'label_path' (YOLO format, as written by
+    LabelHandler.save_labels) to out_dir/<class folder>/<image>_<n>.<ext>.
+
+    'bbox' crops the polygon's bounding box (JPEG); 'mask' crops the same box
+    as RGBA with everything outside the polygon transparent (PNG). Returns the
+    number of crops written.
+    """
+    if mode not in CROP_MODES:
+        raise ValueError(f"Unknown crop mode: {mode}")
+    polygons = read_label_polygons(label_path)
+    if not polygons:
+        return 0
+    image = open_display_image(image_path)
+    size = np.array(image.size, dtype=np.float64)
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    written = 0
+    for n, (class_id, coords) in enumerate(polygons):
+        points = coords * size
+        x0, y0 = np.clip(np.floor(points.min(axis=0)), 0, size).astype(int)
+        x1, y1 = np.clip(np.ceil(points.max(axis=0)), 0, size).astype(int)
+        if x1 <= x0 or y1 <= y0:
+            continue
+        crop = image.crop((x0, y0, x1, y1))
+        if mode == "mask":
+            alpha = Image.new("L", crop.size, 0)
+            shifted = points - (x0, y0)
+            ImageDraw.Draw(alpha).polygon([tuple(p) for p in shifted.tolist()], fill=255)
+            crop = crop.convert("RGBA")
+            crop.putalpha(alpha)
+            name, options = f"{stem}_{n:03d}.png", {"compress_level": 1}
+        else:
+            name, options = f"{stem}_{n:03d}.jpg", {"quality": 95}
+        class_dir = os.path.join(out_dir, class_folder_name(class_id, class_names))
+        os.makedirs(class_dir, exist_ok=True)
+        crop.save(os.path.join(class_dir, name), **options)
+        written += 1
+    return written
+
+
+def _export_batch(items, out_dir, class_names, mode):
+    """Exports the items one after the other: a worker holds one decoded image at a time."""
+    crops = 0
+    errors = []
+    for image_path, label_path in items:
+        try:
+            crops += export_image_crops(image_path, label_path, out_dir, class_names, mode)
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            errors.append((image_path, str(e)))
+    return crops, errors, len(items)
+
+
+class CropExporter:
+    """
+    Runs export_image_crops over labeled images in a process pool,
+    'batch_size' images per task. Each worker decodes a single image at a
+    time, and at most 'max_pending' tasks are queued ahead of the workers, so
+    memory stays bounded however many images there are.
+    """
+
+    def __init__(
+        self, out_dir, class_names=None, mode="bbox", workers=None, batch_size=8, max_pending=None
+    ):
+        if mode not in CROP_MODES:
+            raise ValueError(f"Unknown crop mode: {mode}")
+        self.out_dir = out_dir
+        self.class_names = dict(class_names or {})
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.max_pending = max_pending or 2 * self.workers
+
+    def export_folder(self, folder, progress=None):
+        """Exports the images of 'folder' that have a sibling .txt label."""
+        items = []
+        for name in list_image_files(folder):
+            image_path = os.path.join(folder, name)
+            label_path = label_path_for(image_path)
+            if os.path.exists(label_path):
+                items.append((image_path, label_path))
+        return self.export(items, progress)
+
+    def export(self, items, progress=None):
+        """
+        Exports (image_path, label_path) items. 'progress(done, total)' is called
+        as images finish. Returns a dict with the counts ("images", "crops",
+        "errors" as [(image_path, message)]), "seconds" and the throughput
+        ("images_per_s", "crops_per_s").
+        """
+        start = time.perf_counter()
+        total = len(items)
+        crops = 0
+        errors = []
+        done = 0
+        batches = [
+            items[i : i + self.batch_size] for i in range(0, total, self.batch_size)
+        ]
+        if batches:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(batches))) as pool:
+                pending = set()
+                next_batch = 0
+                while next_batch < len(batches) or pending:
+                    while next_batch < len(batches) and len(pending) < self.max_pending:
+                        pending.add(
+                            pool.submit(
+                                _export_batch,
+                                batches[next_batch],
+                                self.out_dir,
+                                self.class_names,
+                                self.mode,
+                            )
+                        )
+                        next_batch += 1
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        batch_crops, batch_errors, count = future.result()
+                        crops += batch_crops
+                        errors.extend(batch_errors)
+                        done += count
+                        if progress:
+                            progress(done, total)
+        seconds = time.perf_counter() - start
+        return {
+            "images": total,
+            "crops": crops,
+            "errors": errors,
+            "seconds": seconds,
+            "images_per_s": total / seconds if seconds > 0 else 0.0,
+            "crops_per_s": crops / seconds if seconds > 0 else 0.0,
+        }
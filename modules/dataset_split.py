@@ -0,0 +1,285 @@
+# ------------------------------------------------------------------------------
+# File: modules/dataset_split.py
+# Description: Batch "commit" of labeled images into train/val/test splits.
+# ------------------------------------------------------------------------------
+
+import json
+import os
+import random
+import shutil
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+SPLITS = ("train", "val", "test")
+MANIFEST_NAME = ".ezlabel_commit.jsonl"
+
+# ioctl do Linux para clonar um arquivo (reflink) em btrfs/xfs
+_FICLONE = 0x40049409
+
+
+def label_path_for(image_path):
+    """Returns the sibling YOLO .txt path for an image."""
+    return os.path.splitext(image_path)[0] + ".txt"
+
+
+def read_label_classes(label_path):
+    """Returns the list of class ids (first token of each line) in a label file."""
+    classes = []
+    try:
+        with open(label_path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split(maxsplit=1)
+                if parts:
+                    classes.append(parts[0])
+    except OSError:
+        pass
+    return classes
+
+
+def _same_filesystem(src, dest_dir):
+    try:
+        return os.stat(src).st_dev == os.stat(dest_dir).st_dev
+    except OSError:
+        return False
+
+
+def _try_reflink(src, dst):
+    """Clones 'src' into 'dst' sharing blocks (copy-on-write). Returns False if unsupported."""
+    if fcntl is None:
+        return False
+    try:
+        with open(src, "rb") as fs, open(dst, "wb") as fd:
+            fcntl.ioctl(fd.fileno(), _FICLONE, fs.fileno())
+        shutil.copystat(src, dst)
+        return True
+    except OSError:
+        try:
+            os.remove(dst)
+        except OSError:
+            pass
+        return False
+
+
+def transfer_file(src, dst, mode="move"):
+    """
+    Transfers one file to 'dst'.
+    mode="move": rename when on the same filesystem, copy+delete otherwise.
+    mode="link": hardlink when on the same filesystem (source is kept).
+    mode="copy": reflink when supported (source is kept).
+    Any mode falls back to a regular copy when the fast path is unavailable.
+    """
+    dest_dir = os.path.dirname(dst)
+    same_fs = _same_filesystem(src, dest_dir)
+    if mode == "move":
+        if same_fs:
+            os.replace(src, dst)
+        else:
+            shutil.move(src, dst)
+        return
+    if same_fs:
+        if mode == "link":
+            try:
+                if os.path.exists(dst):
+                    os.remove(dst)
+                os.link(src, dst)
+                return
+            except OSError:
+                pass
+        if _try_reflink(src, dst):
+            return
+    shutil.copy2(src, dst)
+
+
+def assign_splits(items, ratios, stratify=False, seed=0):
+    """
+    Assigns a split name to each (image_path, label_path) item.
+    With 'stratify', images are grouped by their rarest class so every class
+    is distributed across the splits according to 'ratios'.
+    Returns {image_path: split}.
+    """
+    total = float(sum(ratios)) or 1.0
+    ratios = [r / total for r in ratios]
+
+    strata = {}
+    if stratify:
+        per_image = {img: set(read_label_classes(lbl)) if lbl else set() for img, lbl in items}
+        freq = Counter(c for classes in per_image.values() for c in classes)
+        for img, _ in items:
+            classes = per_image[img]
+            key = min(classes, key=lambda c: (freq[c], c)) if classes else ""
+            strata.setdefault(key, []).append(img)
+    else:
+        strata[""] = [img for img, _ in items]
+
+    rng = random.Random(seed)
+    assignment = {}
+    for key in sorted(strata):
+        group = sorted(strata[key])
+        rng.shuffle(group)
+        # Distribui pelo maior resto para que as contagens somem exatamente len(group)
+        exact = [r * len(group) for r in ratios]
+        counts = [int(e) for e in exact]
+        remainder = len(group) - sum(counts)
+        order = sorted(range(len(ratios)), key=lambda i: exact[i] - counts[i], reverse=True)
+        for i in order[:remainder]:
+            counts[i] += 1
+        start = 0
+        for split, count in zip(SPLITS, counts):
+            for img in group[start : start + count]:
+                assignment[img] = split
+            start += count
+    return assignment
+
+
+class SplitCommitter:
+    """
+    Moves (or links/copies) labeled images and their .txt files into
+    <dest_root>/<split>/images and <dest_root>/<split>/labels.
+
+    The plan and every finished file are appended to a manifest in 'dest_root',
+    so an interrupted commit picks up where it stopped when run again.
+    """
+
+    def __init__(
+        self,
+        dest_root,
+        ratios=(0.8, 0.1, 0.1),
+        mode="move",
+        stratify=False,
+        workers=8,
+        seed=0,
+    ):
+        self.dest_root = dest_root
+        self.ratios = ratios
+        self.mode = mode
+        self.stratify = stratify
+        self.workers = workers
+        self.seed = seed
+        self.manifest_path = os.path.join(dest_root, MANIFEST_NAME)
+        self._manifest_lock = threading.Lock()
+
+    # ----------------------------
+    # Manifest
+    # ----------------------------
+
+    def _read_manifest(self):
+        """Returns (planned {image: (label, split)}, done set)."""
+        planned = {}
+        done = set()
+        if not os.path.exists(self.manifest_path):
+            return planned, done
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    # Última linha pode ter ficado pela metade numa queda
+                    continue
+                if rec.get("type") == "item":
+                    planned[rec["image"]] = (rec.get("label"), rec["split"])
+                elif rec.get("type") == "done":
+                    done.add(rec["image"])
+        return planned, done
+
+    def _append_manifest(self, records):
+        with self._manifest_lock:
+            with open(self.manifest_path, "a", encoding="utf-8") as f:
+                for rec in records:
+                    f.write(json.dumps(rec) + "\n")
+                f.flush()
+
+    # ----------------------------
+    # Commit
+    # ----------------------------
+
+    def _destinations(self, image_path, split):
+        name = os.path.basename(image_path)
+        base = os.path.splitext(name)[0]
+        img_dst = os.path.join(self.dest_root, split, "images", name)
+        lbl_dst = os.path.join(self.dest_root, split, "labels", base + ".txt")
+        return img_dst, lbl_dst
+
+    def _is_transferred(self, image_path, img_dst):
+        """Detects files finished right before a crash (not yet marked as done)."""
+        if not os.path.exists(img_dst):
+            return False
+        if self.mode == "move":
+            return not os.path.exists(image_path)
+        return os.path.getsize(img_dst) == os.path.getsize(image_path)
+
+    def _commit_one(self, image_path, label_path, split):
+        img_dst, lbl_dst = self._destinations(image_path, split)
+        if label_path and os.path.exists(label_path):
+            transfer_file(label_path, lbl_dst, self.mode)
+        if not self._is_transferred(image_path, img_dst):
+            transfer_file(image_path, img_dst, self.mode)
+        return image_path
+
+    def commit(self, image_paths, label_paths=None, progress=None):
+        """
+        Commits 'image_paths' (labels default to the sibling .txt files).
+        'progress', if given, is called as progress(done_count, total_count).
+        Returns (committed_count, [(image_path, error_message), ...]).
+        """
+        os.makedirs(self.dest_root, exist_ok=True)
+        for split in SPLITS:
+            os.makedirs(os.path.join(self.dest_root, split, "images"), exist_ok=True)
+            os.makedirs(os.path.join(self.dest_root, split, "labels"), exist_ok=True)
+
+        planned, done = self._read_manifest()
+
+        if label_paths is None:
+            label_paths = [label_path_for(p) for p in image_paths]
+        new_items = [
+            (os.path.abspath(img), os.path.abspath(lbl) if lbl else None)
+            for img, lbl in zip(image_paths, label_paths)
+            if os.path.abspath(img) not in planned
+        ]
+        if new_items:
+            assignment = assign_splits(new_items, self.ratios, self.stratify, self.seed)
+            records = []
+            for img, lbl in new_items:
+                planned[img] = (lbl, assignment[img])
+                records.append({"type": "item", "image": img, "label": lbl, "split": assignment[img]})
+            self._append_manifest(records)
+
+        pending = [(img, lbl, split) for img, (lbl, split) in planned.items() if img not in done]
+        total = len(planned)
+        finished = total - len(pending)
+        errors = []
+
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            futures = {
+                pool.submit(self._commit_one, img, lbl, split): img
+                for img, lbl, split in pending
+            }
+            for future in as_completed(futures):
+                img = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    if not os.path.exists(img):
+                        # Arquivo de origem sumiu: nada a retomar para ele
+                        self._append_manifest([{"type": "done", "image": img}])
+                    errors.append((img, str(e)))
+                    continue
+                self._append_manifest([{"type": "done", "image": img}])
+                finished += 1
+                if progress:
+                    progress(finished, total)
+
+        if not errors and os.path.exists(self.manifest_path):
+            # Commit completo: o manifesto não é mais necessário (sem itens, nem foi criado)
+            os.remove(self.manifest_path)
+        return finished, errors
+
+    def has_pending_manifest(self):
+        """True if a previous commit into 'dest_root' was interrupted."""
+        planned, done = self._read_manifest()
+        return any(img not in done for img in planned)
@@ -0,0 +1,315 @@
+# ------------------------------------------------------------------------------
+# File: modules/duplicates.py
+# Description: Near-duplicate image detection with perceptual hashes (dHash /
+#              pHash), multi-index hashing for Hamming-radius queries and a
+#              per-folder hash index.
+# ------------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from .dataset_split import label_path_for
+from .image_files import list_image_files
+
+HASH_METHODS = ("dhash", "phash")
+
+
+def default_hash_dir():
+    """Local directory for the per-folder hash indexes (next to the edit journals)."""
+    return os.path.join(os.path.expanduser("~"), ".ezlabel", "hashes")
+
+
+def _gray(path, size):
+    """Upright grayscale image of 'path' resized to 'size' (JPEGs decoded at reduced scale)."""
+    with Image.open(path) as image:
+        if image.format == "JPEG":
+            image.draft("L", (size[0] * 4, size[1] * 4))
+        image = ImageOps.exif_transpose(image).convert("L")
+    return np.asarray(image.resize(size, Image.Resampling.BILINEAR), dtype=np.float64)
+
+
+def _bits_to_int(bits):
+    return int("".join("1" if b else "0" for b in bits.ravel().tolist()), 2)
+
+
+def dhash(path, hash_size=8):
+    """Difference hash: sign of the horizontal gradient on a (size+1) x size thumbnail."""
+    pixels = _gray(path, (hash_size + 1, hash_size))
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    m = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n))
+    m[0] /= np.sqrt(2)
+    return m * np.sqrt(2 / n)
+
+
+def phash(path, hash_size=8, highfreq_factor=4):
+    """DCT hash: low frequencies of a 32 x 32 thumbnail compared with their median."""
+    n = hash_size * highfreq_factor
+    pixels = _gray(path, (n, n))
+    dct = _dct_matrix(n)
+    low = (dct @ pixels @ dct.T)[:hash_size, :hash_size]
+    return _bits_to_int(low > np.median(low.ravel()[1:]))
+
+
+def image_hash(path, method="dhash"):
+    if method == "phash":
+        return phash(path)
+    return dhash(path)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+_BYTE_BITS = np.array([bin(b).count("1") for b in range(256)], dtype=np.uint8)
+
+
+def _popcount(values):
+    """Set bits of each element of a uint64 array."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    return _BYTE_BITS[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+class MultiIndexHash:
+    """
+    Multi-index hashing for Hamming-radius queries. The 'bits'-bit hashes are
+    split into max_distance + 1 chunks, each with its own lookup table; by
+    the pigeonhole principle two hashes at most max_distance bits apart are
+    identical in at least one chunk. A query therefore only compares against
+    the hashes that share one of its chunks, instead of against every hash
+    (a BK-tree degrades to that for 64-bit hashes, whose distances pile up
+    around 32).
+    """
+
+    def __init__(self, max_distance, bits=64):
+        self.max_distance = max_distance
+        n_chunks = max(1, min(bits, max_distance + 1))
+        bounds = [bits * i // n_chunks for i in range(n_chunks + 1)]
+        self._chunks = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(bounds, bounds[1:])]
+        self._tables = [{} for _ in self._chunks]
+        self._entries = []  # (hash, item)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, value, item):
+        index = len(self._entries)
+        self._entries.append((value, item))
+        for table, (shift, mask) in zip(self._tables, self._chunks):
+            table.setdefault((value >> shift) & mask, []).append(index)
+
+    def search(self, value, radius=None):
+        """(distance, item) of every item whose hash is within 'radius' (<= max_distance) bits."""
+        radius = self.max_distance if radius is None else min(radius, self.max_distance)
+        candidates = set()
+        for table, (shift, mask) in zip(self._tables, self._chunks):
+            candidates.update(table.get((value >> shift) & mask, ()))
+        found = []
+        for index in candidates:
+            other, item = self._entries[index]
+            d = hamming(value, other)
+            if d <= radius:
+                found.append((d, item))
+        return found
+
+    def pairs(self):
+        """
+        Every pair of entries at most max_distance bits apart, as two index
+        arrays (i < j). The candidates (pairs sharing a chunk) are generated
+        and checked with NumPy, chunk by chunk.
+        """
+        n = len(self._entries)
+        empty = np.empty(0, dtype=np.int64)
+        if n < 2:
+            return empty, empty
+        values = np.array([value for value, _ in self._entries], dtype=np.uint64)
+        found = []
+        for shift, mask in self._chunks:
+            keys = (values >> np.uint64(shift)) & np.uint64(mask)
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            # fim do grupo (mesma chave) de cada posição da ordem
+            bounds = np.flatnonzero(np.diff(sorted_keys)) + 1
+            group_end = np.repeat(np.r_[bounds, n], np.diff(np.r_[0, bounds, n]))
+            counts = group_end - np.arange(n) - 1
+            total = int(counts.sum())
+            if not total:
+                continue
+            first = np.repeat(np.arange(n), counts)
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            i = order[first]
+            j = order[first + 1 + offsets]
+            close = _popcount(values[i] ^ values[j]) <= self.max_distance
+            found.append(np.stack((np.minimum(i, j)[close], np.maximum(i, j)[close])))
+        if not found:
+            return empty, empty
+        unique = np.unique(np.concatenate(found, axis=1), axis=1)
+        return unique[0], unique[1]
+
+
+def cluster_duplicates(hashes, max_distance=6):
+    """
+    Groups the {name: hash} entries whose hashes are within 'max_distance'
+    bits, transitively (union-find over the MultiIndexHash matches). Returns the
+    groups with more than one member, each sorted by name, largest first.
+    """
+    index = MultiIndexHash(max_distance)
+    for name, value in hashes.items():
+        index.add(value, name)
+
+    parent = {name: name for name in hashes}
+
+    def find(name):
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    names = list(hashes)
+    for i, j in zip(*(idx.tolist() for idx in index.pairs())):
+        a, b = find(names[i]), find(names[j])
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+
+    groups = {}
+    for name in hashes:
+        groups.setdefault(find(name), []).append(name)
+    clusters = [sorted(g) for g in groups.values() if len(g) > 1]
+    clusters.sort(key=lambda g: (-len(g), g[0]))
+    return clusters
+
+
+def cluster_keeper(folder, cluster):
+    """Member of a cluster to keep in view: the first one with a label file, else the first."""
+    for name in cluster:
+        if os.path.exists(label_path_for(os.path.join(folder, name))):
+            return name
+    return cluster[0]
+
+
+def copy_cluster_labels(folder, clusters):
+    """
+    Copies, in every cluster, the label file of its keeper (see cluster_keeper)
+    to the members that have no label yet; existing labels are never
+    overwritten. Labels are normalized, so they carry over to a near duplicate
+    at another resolution. Returns the [(source, copy)] label paths written.
+    """
+    copied = []
+    for cluster in clusters:
+        source = label_path_for(os.path.join(folder, cluster_keeper(folder, cluster)))
+        if not os.path.exists(source):
+            continue
+        for name in cluster:
+            dest = label_path_for(os.path.join(folder, name))
+            if not os.path.exists(dest):
+                shutil.copyfile(source, dest)
+                copied.append((source, dest))
+    return copied
+
+
+def _hash_batch(paths, method):
+    results = []
+    for path in paths:
+        try:
+            results.append((path, image_hash(path, method)))
+        except (OSError, ValueError, Image.DecompressionBombError):
+            results.append((path, None))
+    return results
+
+
+class DuplicateFinder:
+    """
+    Hashes the images of a folder in a process pool ('batch_size' files per
+    task) and clusters near duplicates. Hashes are kept in a per-folder index
+    keyed by file name, mtime and size, so rescanning a folder only hashes new
+    or changed files.
+    """
+
+    def __init__(
+        self, max_distance=6, method="dhash", workers=None, batch_size=64, index_dir=None
+    ):
+        if method not in HASH_METHODS:
+            raise ValueError(f"Unknown hash method: {method}")
+        self.max_distance = max_distance
+        self.method = method
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.index_dir = index_dir or default_hash_dir()
+
+    def _index_path(self, folder):
+        digest = hashlib.sha1(os.path.abspath(folder).encode("utf-8")).hexdigest()
+        return os.path.join(self.index_dir, f"{digest}_{self.method}.json")
+
+    def _read_index(self, folder):
+        try:
+            with open(self._index_path(folder), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self, folder, index):
+        path = self._index_path(folder)
+        try:
+            os.makedirs(self.index_dir, exist_ok=True)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def hash_folder(self, folder, progress=None):
+        """
+        {name: hash} of the images of 'folder' (unreadable files are left out).
+        'progress(done, total)' is called as files are hashed.
+        """
+        old_index = self._read_index(folder)
+        index = {}
+        todo = []
+        for name in list_image_files(folder):
+            try:
+                st = os.stat(os.path.join(folder, name))
+            except OSError:
+                continue
+            stamp = [st.st_mtime_ns, st.st_size]
+            entry = old_index.get(name)
+            if entry is not None and entry[:2] == stamp:
+                index[name] = entry
+            else:
+                index[name] = stamp + [None]
+                todo.append(os.path.join(folder, name))
+
+        total = len(todo)
+        if todo:
+            batches = [
+                todo[start : start + self.batch_size]
+                for start in range(0, total, self.batch_size)
+            ]
+            done = 0
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(batches))) as pool:
+                futures = [pool.submit(_hash_batch, batch, self.method) for batch in batches]
+                for future in as_completed(futures):
+                    results = future.result()
+                    for path, value in results:
+                        index[os.path.basename(path)][2] = (
+                            None if value is None else format(value, "x")
+                        )
+                    done += len(results)
+                    if progress:
+                        progress(done, total)
+            self._write_index(folder, index)
+        return {name: int(entry[2], 16) for name, entry in index.items() if entry[2]}
+
+    def find(self, folder, progress=None):
+        """Clusters of near-duplicate file names in 'folder' (see cluster_duplicates)."""
+        return cluster_duplicates(self.hash_folder(folder, progress), self.max_distance)
@@ -0,0 +1,99 @@
+# ------------------------------------------------------------------------------
+# File: modules/edit_history.py
+# Description: Undo/redo stack of polygon operations.
+# ------------------------------------------------------------------------------
+
+from collections import deque
+
+
+def invert_op(op):
+    """Returns the operation that undoes 'op' (see WorkspacePolygons for the format)."""
+    kind = op[0]
+    if kind == "create":
+        return ("remove",) + tuple(op[1:])
+    if kind == "remove":
+        return ("create",) + tuple(op[1:])
+    if kind == "insert":
+        return ("delete",) + tuple(op[1:])
+    if kind == "delete":
+        return ("insert",) + tuple(op[1:])
+    if kind == "move":
+        key, idx, old_x, old_y, new_x, new_y = op[1:]
+        return ("move", key, idx, new_x, new_y, old_x, old_y)
+    if kind == "set":
+        key, field, old, new = op[1:]
+        return ("set", key, field, new, old)
+    raise ValueError(f"Cannot invert polygon operation: {kind}")
+
+
+def _op_cost(op):
+    """Approximate number of stored values of an operation."""
+    if op[0] in ("create", "remove"):
+        return 6 + len(op[5])
+    return len(op)
+
+
+class EditHistory:
+    """
+    Stores each edit as the group of operation tuples that produced it
+    (polygon key, point index, old/new coordinates), never a copy of the
+    polygons. Undo applies the inverted group, so its cost is the size of the
+    edit. The oldest groups are dropped once 'max_groups' or 'max_values'
+    (total stored coordinates/fields) is exceeded, keeping memory bounded.
+    """
+
+    def __init__(self, max_groups=1000, max_values=500000):
+        self.max_groups = max_groups
+        self.max_values = max_values
+        self._undo = deque()
+        self._redo = []
+        self._undo_cost = 0
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self._undo_cost = 0
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def drop_redo(self):
+        """Forgets the last undone edit (it can no longer be redone)."""
+        if self._redo:
+            self._redo.pop()
+
+    def push(self, ops):
+        """Records a new edit; it invalidates the redo stack."""
+        group = tuple(ops)
+        if not group:
+            return
+        cost = sum(_op_cost(op) for op in group)
+        self._undo.append((group, cost))
+        self._undo_cost += cost
+        self._redo.clear()
+        while self._undo and (
+            len(self._undo) > self.max_groups or self._undo_cost > self.max_values
+        ):
+            _, old_cost = self._undo.popleft()
+            self._undo_cost -= old_cost
+
+    def undo(self):
+        """Returns the operations that revert the last edit, or None."""
+        if not self._undo:
+            return None
+        group, cost = self._undo.pop()
+        self._undo_cost -= cost
+        self._redo.append((group, cost))
+        return [invert_op(op) for op in reversed(group)]
+
+    def redo(self):
+        """Returns the operations that re-apply the last undone edit, or None."""
+        if not self._redo:
+            return None
+        group, cost = self._redo.pop()
+        self._undo.append((group, cost))
+        self._undo_cost += cost
+        return list(group)
@@ -0,0 +1,130 @@
+# ------------------------------------------------------------------------------
+# File: modules/edit_journal.py
+# Description: Append-only journal of polygon edits, for crash-safe autosave.
+# ------------------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+
+
+def _to_json(value):
+    """Serializes the NumPy coordinate arrays carried by 'create'/'remove' operations."""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def default_journal_dir():
+    """Local directory for journals (kept off the dataset, which may be on network storage)."""
+    return os.path.join(os.path.expanduser("~"), ".ezlabel", "journal")
+
+
+class EditJournal:
+    """
+    Appends every polygon operation of the current image as one JSON line.
+
+    Only the small operation tuples are written (see WorkspacePolygons), so an
+    edit costs one short append instead of rewriting the label file. After
+    'compact_every' operations the journal is rewritten as a single snapshot,
+    which keeps replay after a crash fast. The journal is discarded once the
+    labels are saved.
+    """
+
+    def __init__(self, journal_dir=None, compact_every=500):
+        self.journal_dir = journal_dir or default_journal_dir()
+        self.compact_every = compact_every
+        self.image_path = None
+        self.path = None
+        self.snapshot_provider = None
+        self._file = None
+        self._ops_since_compact = 0
+        self._empty = True
+
+    def _path_for(self, image_path):
+        digest = hashlib.sha1(os.path.abspath(image_path).encode("utf-8")).hexdigest()
+        return os.path.join(self.journal_dir, digest + ".jsonl")
+
+    def open(self, image_path):
+        """Points the journal to the given image (the file is only created on first write)."""
+        self.close()
+        self.image_path = image_path
+        self.path = self._path_for(image_path)
+        self._ops_since_compact = 0
+        self._empty = not (os.path.exists(self.path) and os.path.getsize(self.path) > 0)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+        self.path = None
+
+    def is_empty(self):
+        return self.path is not None and self._empty
+
+    def _ensure_file(self):
+        if self._file is None:
+            os.makedirs(self.journal_dir, exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+
+    def append(self, ops):
+        """Appends a group of operations; each is flushed to the OS immediately."""
+        if self.path is None:
+            return
+        self._ensure_file()
+        self._file.write("".join(json.dumps(op, separators=(",", ":"), default=_to_json) + "\n" for op in ops))
+        self._file.flush()
+        self._empty = False
+        self._ops_since_compact += len(ops)
+        if self.snapshot_provider and self._ops_since_compact >= self.compact_every:
+            self.compact(self.snapshot_provider())
+
+    def compact(self, snapshot_ops):
+        """Atomically rewrites the journal as one snapshot of the current polygons."""
+        if self.path is None:
+            return
+        if self._file:
+            self._file.close()
+            self._file = None
+        os.makedirs(self.journal_dir, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(["header", os.path.abspath(self.image_path)]) + "\n")
+            f.write(json.dumps(["snapshot", snapshot_ops], separators=(",", ":"), default=_to_json) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._empty = False
+        self._ops_since_compact = 0
+
+    def read(self):
+        """
+        Returns the stored operations as tuples. Reading stops at the first
+        incomplete line (a write interrupted by the crash).
+        """
+        if self.path is None or not os.path.exists(self.path):
+            return []
+        ops = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    op = json.loads(line)
+                except ValueError:
+                    break
+                if op[0] == "header":
+                    continue
+                if op[0] == "snapshot":
+                    ops.append(("snapshot", [tuple(o) for o in op[1]]))
+                else:
+                    ops.append(tuple(op))
+        return ops
+
+    def discard(self):
+        """Deletes the journal of the current image (its labels were saved)."""
+        path = self.path
+        image_path = self.image_path
+        self.close()
+        if path and os.path.exists(path):
+            os.remove(path)
+        if image_path:
+            self.open(image_path)
@@ -0,0 +1,104 @@
+# ------------------------------------------------------------------------------
+# File: modules/event_dispatch.py
+# Description: Event dispatch layer that coalesces high-rate motion events,
+#              skips redundant widget reconfiguration and times the handlers.
+# ------------------------------------------------------------------------------
+
+import time
+
+
+class EventDispatcher:
+    """
+    Binds handlers to a Tk widget through a thin dispatch layer.
+
+    Sequences bound with 'coalesce=True' (mouse motion) only store the latest
+    event; the handler runs at most once per frame ('frame_ms') with that
+    event, however many events the device sends. Any other event first flushes
+    the pending ones, so e.g. a button release always sees the final drag
+    position. Every handler call is counted and timed (see 'stats').
+    """
+
+    def __init__(self, widget, frame_ms=16, clock=time.perf_counter):
+        self.widget = widget
+        self.frame_ms = frame_ms
+        self.clock = clock
+        self._pending = {}  # sequence -> (handler, latest event)
+        self._flush_id = None
+        self._last_flush = 0.0
+        self._config_cache = {}
+        self._stats = {}
+
+    def bind(self, sequence, handler, coalesce=False):
+        """Binds 'handler' to 'sequence' on the widget."""
+        if coalesce:
+            self.widget.bind(sequence, lambda e: self._queue(sequence, handler, e))
+        else:
+            self.widget.bind(sequence, lambda e: self._dispatch(handler, e))
+
+    def _stat(self, handler):
+        name = getattr(handler, "__name__", repr(handler))
+        stat = self._stats.get(name)
+        if stat is None:
+            stat = self._stats[name] = {
+                "events": 0,
+                "coalesced": 0,
+                "calls": 0,
+                "total_s": 0.0,
+                "max_s": 0.0,
+            }
+        return stat
+
+    def _queue(self, sequence, handler, event):
+        stat = self._stat(handler)
+        stat["events"] += 1
+        if sequence in self._pending:
+            stat["coalesced"] += 1
+        self._pending[sequence] = (handler, event)
+        if self._flush_id is None:
+            elapsed_ms = (self.clock() - self._last_flush) * 1000.0
+            delay = max(0, int(self.frame_ms - elapsed_ms))
+            self._flush_id = self.widget.after(delay, self.flush)
+
+    def flush(self):
+        """Runs the handlers of the pending (coalesced) events now."""
+        if self._flush_id is not None:
+            self.widget.after_cancel(self._flush_id)
+            self._flush_id = None
+        self._last_flush = self.clock()
+        pending = self._pending
+        self._pending = {}
+        for handler, event in pending.values():
+            self._call(handler, event)
+
+    def _dispatch(self, handler, event):
+        self._stat(handler)["events"] += 1
+        if self._pending:
+            self.flush()
+        return self._call(handler, event)
+
+    def _call(self, handler, event):
+        stat = self._stat(handler)
+        t0 = self.clock()
+        try:
+            return handler(event)
+        finally:
+            elapsed = self.clock() - t0
+            stat["calls"] += 1
+            stat["total_s"] += elapsed
+            if elapsed > stat["max_s"]:
+                stat["max_s"] = elapsed
+
+    def configure_once(self, widget, **options):
+        """Calls widget.configure only with the options whose value changed."""
+        cache = self._config_cache.setdefault(str(widget), {})
+        changed = {k: v for k, v in options.items() if cache.get(k, object()) != v}
+        if changed:
+            widget.configure(**changed)
+            cache.update(changed)
+
+    def stats(self):
+        """Per-handler counters: events received, coalesced, calls, total/max seconds."""
+        return {name: dict(stat) for name, stat in self._stats.items()}
+
+    def reset_stats(self):
+        self._stats.clear()
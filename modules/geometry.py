@@ -0,0 +1,436 @@
+# ------------------------------------------------------------------------------
+# File: modules/geometry.py
+# Description: NumPy geometry kernel shared by the workspace and offline tools
+#              (transforms, distances, area/bbox/centroid, point-in-polygon,
+#              simplification, self-intersections and IoU).
+# ------------------------------------------------------------------------------
+
+import math
+
+import numpy as np
+
+
+def as_coords(points):
+    """Returns 'points' (list of (x, y) or flat/(n, 2) array) as an (n, 2) float64 array."""
+    return np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+
+# ----------------------------
+# Coordinate transforms
+# ----------------------------
+
+
+def image_to_canvas(x, y, scale, offset_x, offset_y):
+    """Image -> canvas coordinates. Works on scalars and on arrays alike."""
+    return x * scale + offset_x, y * scale + offset_y
+
+
+def canvas_to_image(x, y, scale, offset_x, offset_y):
+    """Canvas -> image coordinates. Works on scalars and on arrays alike."""
+    return (x - offset_x) / scale, (y - offset_y) / scale
+
+
+def coords_to_canvas(coords, scale, offset_x, offset_y):
+    """Image -> canvas coordinates of an (n, 2) array."""
+    return coords * scale + (offset_x, offset_y)
+
+
+def coords_to_image(coords, scale, offset_x, offset_y):
+    """Canvas -> image coordinates of an (n, 2) array."""
+    return (as_coords(coords) - (offset_x, offset_y)) / scale
+
+
+# ----------------------------
+# Distances
+# ----------------------------
+
+
+def point_segment_distance(px, py, x1, y1, x2, y2):
+    """
+    Returns (dist, x_proj, y_proj, t) for the distance from (px, py) to the
+    segment (x1, y1)-(x2, y2). Scalar version, for single queries.
+    """
+    dx = x2 - x1
+    dy = y2 - y1
+    if dx == 0 and dy == 0:
+        return math.hypot(px - x1, py - y1), x1, y1, 0
+    t = ((px - x1) * dx + (py - y1) * dy) / float(dx * dx + dy * dy)
+    t = min(1.0, max(0.0, t))
+    x_proj = x1 + t * dx
+    y_proj = y1 + t * dy
+    return math.hypot(px - x_proj, py - y_proj), x_proj, y_proj, t
+
+
+def project_to_segments(px, py, x1, y1, x2, y2):
+    """
+    Vectorized point_segment_distance: projects point(s) (px, py) onto the
+    segments given by the arrays x1, y1, x2, y2 (broadcast together).
+    Returns (dist, x_proj, y_proj, t) arrays; degenerate segments project to
+    their first point.
+    """
+    dx = x2 - x1
+    dy = y2 - y1
+    len2 = dx * dx + dy * dy
+    degenerate = len2 == 0
+    t = ((px - x1) * dx + (py - y1) * dy) / np.where(degenerate, 1.0, len2)
+    t = np.where(degenerate, 0.0, np.clip(t, 0.0, 1.0))
+    x_proj = x1 + t * dx
+    y_proj = y1 + t * dy
+    return np.hypot(x_proj - px, y_proj - py), x_proj, y_proj, t
+
+
+def segment_distances(points, a, b):
+    """Distances from each point of 'points' (n, 2) to the segment a-b."""
+    return project_to_segments(points[:, 0], points[:, 1], a[0], a[1], b[0], b[1])[0]
+
+
+# ----------------------------
+# Measures
+# ----------------------------
+
+
+def signed_area(coords):
+    """Shoelace area of a closed polygon; positive when counter-clockwise (y up)."""
+    xy = as_coords(coords)
+    if len(xy) < 3:
+        return 0.0
+    x = xy[:, 0]
+    y = xy[:, 1]
+    return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y))
+
+
+def polygon_area(coords):
+    """Area of a closed polygon (self-intersecting parts follow the shoelace rule)."""
+    return abs(signed_area(coords))
+
+
+def polygon_bbox(coords):
+    """Returns (min_x, min_y, max_x, max_y)."""
+    xy = as_coords(coords)
+    mins = xy.min(axis=0)
+    maxs = xy.max(axis=0)
+    return float(mins[0]), float(mins[1]), float(maxs[0]), float(maxs[1])
+
+
+def polygon_centroid(coords):
+    """Area centroid of a closed polygon (vertex mean when the area is zero)."""
+    xy = as_coords(coords)
+    if len(xy) < 3:
+        mean = xy.mean(axis=0)
+        return float(mean[0]), float(mean[1])
+    # Desloca para o primeiro vértice para evitar cancelamento numérico
+    origin = xy[0]
+    rel = xy - origin
+    x = rel[:, 0]
+    y = rel[:, 1]
+    xn = np.roll(x, -1)
+    yn = np.roll(y, -1)
+    cross = x * yn - xn * y
+    area2 = cross.sum()
+    if area2 == 0:
+        mean = xy.mean(axis=0)
+        return float(mean[0]), float(mean[1])
+    cx = ((x + xn) * cross).sum() / (3.0 * area2)
+    cy = ((y + yn) * cross).sum() / (3.0 * area2)
+    return float(cx + origin[0]), float(cy + origin[1])
+
+
+def is_convex(coords):
+    """
+    True if the closed polygon is convex (collinear vertices allowed).
+
+    Turning always to the same side is not enough: a self-intersecting star
+    (pentagram) does that too, but winds twice. The turns must also add up to
+    exactly one full turn (2π). Degenerate (zero-area) polygons, e.g. all
+    vertices on one line, are not convex.
+    """
+    xy = as_coords(coords)
+    if polygon_area(xy) <= 1e-12:
+        return False
+    d1 = np.roll(xy, -1, axis=0) - xy
+    # Vértices repetidos não mudam a forma, mas zerariam a curva no ponto
+    d1 = d1[np.any(d1 != 0, axis=1)]
+    if len(d1) < 3:
+        return False
+    d2 = np.roll(d1, -1, axis=0)
+    cross = d1[:, 0] * d2[:, 1] - d1[:, 1] * d2[:, 0]
+    if not (np.all(cross >= 0) or np.all(cross <= 0)):
+        return False
+    dot = d1[:, 0] * d2[:, 0] + d1[:, 1] * d2[:, 1]
+    turning = np.arctan2(cross, dot).sum()
+    return bool(abs(abs(turning) - 2 * np.pi) < 1e-6)
+
+
+# ----------------------------
+# Containment
+# ----------------------------
+
+
+def points_in_rect(xy, x1, y1, x2, y2):
+    """Mask of the points of 'xy' (n, 2) inside the rectangle (any corner order)."""
+    min_x, max_x = sorted((x1, x2))
+    min_y, max_y = sorted((y1, y2))
+    x = xy[:, 0]
+    y = xy[:, 1]
+    return (x >= min_x) & (x <= max_x) & (y >= min_y) & (y <= max_y)
+
+
+def points_in_polygon(xy, polygon):
+    """
+    Mask of the points of 'xy' (n, 2) inside 'polygon' (m, 2), even-odd rule.
+    Points outside the polygon bounding box are discarded first; the crossing
+    test then runs on all remaining points at once, one pass per edge.
+    """
+    poly = as_coords(polygon)
+    mask = np.zeros(len(xy), dtype=bool)
+    if len(poly) < 3 or not len(xy):
+        return mask
+    candidates = np.flatnonzero(points_in_rect(xy, *poly.min(axis=0), *poly.max(axis=0)))
+    if not len(candidates):
+        return mask
+    px = xy[candidates, 0]
+    py = xy[candidates, 1]
+    inside = np.zeros(len(candidates), dtype=bool)
+    x1s, y1s = poly[:, 0], poly[:, 1]
+    x2s, y2s = np.roll(x1s, -1), np.roll(y1s, -1)
+    for x1, y1, x2, y2 in zip(x1s.tolist(), y1s.tolist(), x2s.tolist(), y2s.tolist()):
+        if y1 == y2:
+            continue
+        crosses = (y1 > py) != (y2 > py)
+        x_cross = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+        inside ^= crosses & (px < x_cross)
+    mask[candidates] = inside
+    return mask
+
+
+# ----------------------------
+# Cleanup and simplification
+# ----------------------------
+
+
+def remove_duplicate_vertices(coords, tolerance, is_closed):
+    """Drops consecutive vertices closer than 'tolerance' (incl. the closing one)."""
+    out = []
+    for x, y in as_coords(coords).tolist():
+        if out and math.hypot(out[-1][0] - x, out[-1][1] - y) <= tolerance:
+            continue
+        out.append((x, y))
+    if is_closed:
+        while len(out) > 1 and math.dist(out[0], out[-1]) <= tolerance:
+            out.pop()
+    return as_coords(out)
+
+
+def _vertex_deviation(p, a, b):
+    return point_segment_distance(p[0], p[1], a[0], a[1], b[0], b[1])[0]
+
+
+def remove_collinear_vertices(coords, tolerance, is_closed):
+    """Drops vertices lying on the segment joining their neighbours."""
+    out = []
+    for p in as_coords(coords).tolist():
+        while len(out) >= 2 and _vertex_deviation(out[-1], out[-2], p) <= tolerance:
+            out.pop()
+        out.append(p)
+    if is_closed:
+        # Confere também os vértices da "emenda" entre o último e o primeiro ponto
+        changed = True
+        while changed and len(out) > 3:
+            changed = False
+            if _vertex_deviation(out[-1], out[-2], out[0]) <= tolerance:
+                out.pop()
+                changed = True
+            elif _vertex_deviation(out[0], out[-1], out[1]) <= tolerance:
+                out.pop(0)
+                changed = True
+    return as_coords(out)
+
+
+def _simplify_chain(xy, tolerance):
+    """
+    Ramer-Douglas-Peucker over an open chain; iterative (no recursion limit),
+    with the farthest-vertex search of each range done in one NumPy pass.
+    """
+    n = len(xy)
+    if n < 3:
+        return xy.copy()
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        dist = segment_distances(xy[start + 1 : end], xy[start], xy[end])
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance:
+            mid = start + 1 + i
+            keep[mid] = True
+            stack.append((start, mid))
+            stack.append((mid, end))
+    return xy[keep]
+
+
+def simplify_polygon(coords, tolerance, is_closed=True):
+    """Simplifies a polygon/polyline so no removed vertex is farther than 'tolerance'."""
+    xy = as_coords(coords)
+    if len(xy) < 4:
+        return xy.copy()
+    if not is_closed:
+        return _simplify_chain(xy, tolerance)
+    # Polígono fechado: divide no vértice mais distante do primeiro e simplifica as duas metades
+    far_idx = int(np.argmax(np.hypot(*(xy - xy[0]).T)))
+    first = _simplify_chain(xy[: far_idx + 1], tolerance)
+    second = _simplify_chain(np.vstack((xy[far_idx:], xy[:1])), tolerance)
+    return np.vstack((first[:-1], second[:-1]))
+
+
+def normalize_polygon(
+    points,
+    is_closed=True,
+    duplicate_tolerance=0.5,
+    collinear_tolerance=0.01,
+    simplify_tolerance=0.0,
+):
+    """
+    Cleans pixel coordinates before writing them to disk: removes duplicate
+    and collinear vertices and, if 'simplify_tolerance' > 0, simplifies the
+    outline to that pixel tolerance. Returns a new (n, 2) array.
+    """
+    pts = remove_duplicate_vertices(points, duplicate_tolerance, is_closed)
+    if collinear_tolerance is not None and collinear_tolerance >= 0:
+        pts = remove_collinear_vertices(pts, collinear_tolerance, is_closed)
+    if simplify_tolerance and simplify_tolerance > 0:
+        pts = simplify_polygon(pts, simplify_tolerance, is_closed)
+        pts = remove_duplicate_vertices(pts, duplicate_tolerance, is_closed)
+    return pts
+
+
+# ----------------------------
+# Intersections and overlap
+# ----------------------------
+
+
+def _orientation(ax, ay, bx, by, cx, cy):
+    return np.sign((bx - ax) * (cy - ay) - (by - ay) * (cx - ax))
+
+
+def _on_segment(ax, ay, bx, by, cx, cy):
+    """c lies within the bounding box of a-b (used for collinear cases)."""
+    return (
+        (np.minimum(ax, bx) <= cx)
+        & (cx <= np.maximum(ax, bx))
+        & (np.minimum(ay, by) <= cy)
+        & (cy <= np.maximum(ay, by))
+    )
+
+
+def self_intersections(coords, is_closed=True, chunk=512):
+    """
+    Returns an (k, 2) array of index pairs (i, j), i < j, of non-adjacent edges
+    that cross or touch (edge i joins vertex i to i+1). Edge pairs are tested
+    in blocks of 'chunk' rows against all edges at once.
+    """
+    xy = as_coords(coords)
+    n = len(xy)
+    n_edges = n if is_closed else n - 1
+    if n_edges < 3:
+        return np.empty((0, 2), dtype=np.int64)
+    a = xy[:n_edges]
+    b = np.roll(xy, -1, axis=0)[:n_edges]
+    ax, ay, bx, by = a[:, 0], a[:, 1], b[:, 0], b[:, 1]
+    edges = np.arange(n_edges)
+    found = []
+    for start in range(0, n_edges, chunk):
+        rows = edges[start : start + chunk, None]
+        i = rows
+        j = edges[None, :]
+        # Só pares i < j que não compartilham vértice
+        valid = (j > i + 1) & ~(is_closed & (i == 0) & (j == n_edges - 1))
+        if not valid.any():
+            continue
+        p1x, p1y, p2x, p2y = ax[i], ay[i], bx[i], by[i]
+        q1x, q1y, q2x, q2y = ax[j], ay[j], bx[j], by[j]
+        o1 = _orientation(p1x, p1y, p2x, p2y, q1x, q1y)
+        o2 = _orientation(p1x, p1y, p2x, p2y, q2x, q2y)
+        o3 = _orientation(q1x, q1y, q2x, q2y, p1x, p1y)
+        o4 = _orientation(q1x, q1y, q2x, q2y, p2x, p2y)
+        hit = (o1 != o2) & (o3 != o4)
+        hit |= (o1 == 0) & _on_segment(p1x, p1y, p2x, p2y, q1x, q1y)
+        hit |= (o2 == 0) & _on_segment(p1x, p1y, p2x, p2y, q2x, q2y)
+        hit |= (o3 == 0) & _on_segment(q1x, q1y, q2x, q2y, p1x, p1y)
+        hit |= (o4 == 0) & _on_segment(q1x, q1y, q2x, q2y, p2x, p2y)
+        rr, cc = np.nonzero(hit & valid)
+        if len(rr):
+            found.append(np.column_stack((rr + start, cc)))
+    if not found:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.concatenate(found)
+
+
+def is_simple(coords, is_closed=True):
+    """True if no two non-adjacent edges cross or touch."""
+    return not len(self_intersections(coords, is_closed))
+
+
+def clip_convex(subject, clip):
+    """
+    Sutherland-Hodgman: the part of polygon 'subject' inside the convex polygon
+    'clip'. Returns an (m, 2) array (empty when they do not overlap).
+    """
+    out = as_coords(subject)
+    clip = as_coords(clip)
+    if signed_area(clip) < 0:
+        clip = clip[::-1]
+    for (cx1, cy1), (cx2, cy2) in zip(clip.tolist(), np.roll(clip, -1, axis=0).tolist()):
+        if not len(out):
+            break
+        ex, ey = cx2 - cx1, cy2 - cy1
+        side = ex * (out[:, 1] - cy1) - ey * (out[:, 0] - cx1)
+        nxt = np.roll(out, -1, axis=0)
+        side_nxt = np.roll(side, -1)
+        pts = []
+        for k in range(len(out)):
+            s_in = side[k] >= 0
+            e_in = side_nxt[k] >= 0
+            if s_in:
+                pts.append(out[k])
+            if s_in != e_in:
+                t = side[k] / (side[k] - side_nxt[k])
+                pts.append(out[k] + t * (nxt[k] - out[k]))
+        out = as_coords(pts)
+    return out
+
+
+def polygon_iou(a, b, resolution=256):
+    """
+    Intersection over union of two closed polygons. Exact (convex clipping)
+    when both are convex; otherwise estimated on a 'resolution' x 'resolution'
+    grid of samples over the union bounding box.
+    """
+    a = as_coords(a)
+    b = as_coords(b)
+    if len(a) < 3 or len(b) < 3:
+        return 0.0
+    ax1, ay1, ax2, ay2 = polygon_bbox(a)
+    bx1, by1, bx2, by2 = polygon_bbox(b)
+    if ax2 < bx1 or bx2 < ax1 or ay2 < by1 or by2 < ay1:
+        return 0.0
+    if is_convex(a) and is_convex(b):
+        inter = polygon_area(clip_convex(a, b))
+        union = polygon_area(a) + polygon_area(b) - inter
+        return inter / union if union > 0 else 0.0
+
+    x1, y1 = min(ax1, bx1), min(ay1, by1)
+    x2, y2 = max(ax2, bx2), max(ay2, by2)
+    step = max(x2 - x1, y2 - y1) / resolution
+    if step <= 0:
+        return 0.0
+    xs = np.arange(x1 + step / 2, x2, step)
+    ys = np.arange(y1 + step / 2, y2, step)
+    gx, gy = np.meshgrid(xs, ys)
+    samples = np.column_stack((gx.ravel(), gy.ravel()))
+    in_a = points_in_polygon(samples, a)
+    in_b = points_in_polygon(samples, b)
+    union = np.count_nonzero(in_a | in_b)
+    return np.count_nonzero(in_a & in_b) / union if union else 0.0
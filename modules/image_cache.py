@@ -0,0 +1,168 @@
+# ------------------------------------------------------------------------------
+# File: modules/image_cache.py
+# Description: On-disk cache of decoded, display-ready images, read back through
+#              a memory map so large scans reopen without decoding.
+# ------------------------------------------------------------------------------
+
+import hashlib
+import mmap
+import os
+import struct
+
+from PIL import Image
+
+from .image_files import open_display_image
+
+_MAGIC = b"EZL3"
+# magic, largura, altura e 4 bytes livres
+_HEADER = struct.Struct("<4sII4x")
+_SUFFIX = ".rgb"
+# Formato anterior (RGBX): não é mais lido, só removido pelo LRU
+_SUFFIXES = (_SUFFIX, ".rgbx")
+
+
+def default_cache_dir():
+    """Local directory for decoded images (next to the edit journals)."""
+    return os.path.join(os.path.expanduser("~"), ".ezlabel", "image_cache")
+
+
+class DecodedImageCache:
+    """
+    Keeps decoded images as raw RGB files (3 bytes per pixel, behind a small
+    header), keyed by path, mtime and file size. A cached image is read back
+    through a read-only memory map straight into an RGB image, the mode the
+    display pipeline works in (see to_display_image): there is no decoding
+    and no further conversion.
+
+    Only images of at least 'min_pixels' are cached, since small files decode
+    faster than they can be read back. The cache stays under 'max_bytes' by
+    evicting the least recently used files (use time = file mtime, touched on
+    every hit).
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=8 * 1024**3, min_pixels=16_000_000):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.min_pixels = min_pixels
+        self.hits = 0
+        self.misses = 0
+
+    def _path_for(self, image_path):
+        st = os.stat(image_path)
+        key = f"{os.path.abspath(image_path)}|{st.st_mtime_ns}|{st.st_size}"
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest + _SUFFIX)
+
+    def load(self, image_path):
+        """
+        Returns the display-ready (RGB) image of 'image_path': read from the
+        cache when present, otherwise decoded (and stored, if large enough).
+        """
+        cache_path = self._path_for(image_path)
+        image = self._open_cached(cache_path)
+        if image is not None:
+            self.hits += 1
+            return image
+        self.misses += 1
+
+        image = open_display_image(image_path)
+        width, height = image.size
+        if width * height < self.min_pixels or self._entry_size(width, height) > self.max_bytes:
+            return image
+        try:
+            self._store(cache_path, image)
+        except OSError:
+            return image
+        self._evict(keep=cache_path)
+        cached = self._open_cached(cache_path)
+        return cached if cached is not None else image
+
+    @staticmethod
+    def _entry_size(width, height):
+        return _HEADER.size + width * height * 3
+
+    def _open_cached(self, cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if len(buf) < _HEADER.size:
+            buf.close()
+            return None
+        magic, width, height = _HEADER.unpack_from(buf)
+        if magic != _MAGIC or len(buf) != self._entry_size(width, height):
+            buf.close()
+            return None
+        try:
+            os.utime(cache_path)
+        except OSError:
+            pass
+        # Pillow guarda RGB com 4 bytes por pixel, então a imagem é uma cópia e
+        # o mmap pode ser fechado logo em seguida
+        try:
+            with memoryview(buf) as view:
+                return Image.frombuffer(
+                    "RGB", (width, height), view[_HEADER.size :], "raw", "RGB", 0, 1
+                )
+        finally:
+            buf.close()
+
+    def _store(self, cache_path, image, rows=256):
+        """Writes 'image' as raw RGB in strips of 'rows' lines (no second full copy in RAM)."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        width, height = image.size
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, width, height))
+                for top in range(0, height, rows):
+                    strip = image.crop((0, top, width, min(height, top + rows)))
+                    f.write(strip.tobytes())
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _entries(self):
+        """(last use, size, path) of every cached file."""
+        entries = []
+        try:
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(_SUFFIXES) and entry.is_file():
+                        st = entry.stat()
+                        entries.append((st.st_mtime, st.st_size, entry.path))
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _evict(self, keep=None):
+        """Removes the least recently used files until the cache fits in max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                # p.ex. ainda mapeado no Windows; tenta de novo na próxima vez
+                continue
+            total -= size
+
+    def size_bytes(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def clear(self):
+        """Removes every cached file that is not in use."""
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
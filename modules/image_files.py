@@ -0,0 +1,50 @@
+# ------------------------------------------------------------------------------
+# File: modules/image_files.py
+# Description: Helpers to find image files on disk and open them for display.
+# ------------------------------------------------------------------------------
+
+import os
+
+import numpy as np
+from PIL import Image, ImageOps
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".gif", ".tif", ".tiff")
+
+# Modos inteiros de 16/32 bits (PNG de 16 bits em tons de cinza, TIFF etc.)
+_WIDE_INT_MODES = ("I", "I;16", "I;16B", "I;16L", "I;16N")
+
+
+def list_image_files(folder):
+    """Returns the names of the image files in 'folder', in directory order."""
+    with os.scandir(folder) as entries:
+        return [
+            entry.name
+            for entry in entries
+            if entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file()
+        ]
+
+
+def to_display_image(image):
+    """
+    Returns 'image' upright (EXIF orientation applied) as an 8-bit RGB image,
+    the only mode the draw pipeline works with. 16-bit images keep their high
+    byte, float images are clipped to 0-255 and alpha is dropped (as the
+    training loaders do).
+    """
+    image = ImageOps.exif_transpose(image)
+    if image.mode in _WIDE_INT_MODES:
+        data = np.clip(np.asarray(image, dtype=np.int64), 0, 65535) >> 8
+        image = Image.fromarray(data.astype(np.uint8), "L")
+    elif image.mode == "F":
+        data = np.clip(np.asarray(image), 0, 255)
+        image = Image.fromarray(data.astype(np.uint8), "L")
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    return image
+
+
+def open_display_image(path):
+    """Opens the image at 'path' fully decoded and ready for display (see to_display_image)."""
+    with Image.open(path) as image:
+        image.load()
+        return to_display_image(image)
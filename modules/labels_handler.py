@@ -4,7 +4,10 @@
 # ------------------------------------------------------------------------------
 
 import os
-from .shapes import PointData
+
+import numpy as np
+
+from .geometry import normalize_polygon
 
 
 class LabelHandler:
@@ -13,8 +16,28 @@ class LabelHandler:
     class x1 y1 x2 y2 ... xN yN
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        precision=6,
+        normalize=False,
+        duplicate_tolerance=0.5,
+        collinear_tolerance=0.01,
+        simplify_tolerance=0.0,
+    ):
+        """
+        :param precision: Casas decimais usadas nas coordenadas normalizadas.
+        :param normalize: Se True, limpa os polígonos antes de salvar (desligado por padrão:
+            os vértices são gravados como foram desenhados).
+        :param duplicate_tolerance: Distância (px) abaixo da qual vértices vizinhos são duplicados.
+        :param collinear_tolerance: Distância (px) de um vértice à reta dos vizinhos para ser removido.
+        :param simplify_tolerance: Tolerância (px) da simplificação; 0 desativa.
+        """
         self.current_image_path = None
+        self.precision = precision
+        self.normalize = normalize
+        self.duplicate_tolerance = duplicate_tolerance
+        self.collinear_tolerance = collinear_tolerance
+        self.simplify_tolerance = simplify_tolerance
         self.color_list = [
             "#FF0000",
             "#00FF00",
@@ -38,15 +61,24 @@ class LabelHandler:
             base_name = os.path.splitext(os.path.basename(self.current_image_path))[0]
             label_dest_path = os.path.join(folder, base_name + ".txt")
 
+        fmt = f"{{:.{self.precision}f}}"
+        scale = np.array((img_width, img_height), dtype=np.float64)
         lines = []
         for poly in polygons.values():
-            if len(poly["points"]) < 3:
+            points = poly.coords
+            if self.normalize:
+                points = normalize_polygon(
+                    points,
+                    is_closed=poly.is_closed,
+                    duplicate_tolerance=self.duplicate_tolerance,
+                    collinear_tolerance=self.collinear_tolerance,
+                    simplify_tolerance=self.simplify_tolerance,
+                )
+            if len(points) < 3:
                 continue
-            cls_id = poly.get("class_id", "0")
-            coords_norm = [
-                f"{p.x / img_width:.6f} {p.y / img_height:.6f}" for p in poly["points"]
-            ]
-            lines.append(f"{cls_id} " + " ".join(coords_norm))
+            cls_id = poly.class_id or "0"
+            coords_norm = (points / scale).ravel().tolist()
+            lines.append(f"{cls_id} " + " ".join(map(fmt.format, coords_norm)))
 
         with open(label_dest_path, "w", encoding="utf-8") as f:
             f.write("\n".join(lines))
@@ -54,7 +86,8 @@ class LabelHandler:
     def load_labels(self, txt_path, workspace_frame):
         """
         Loads labels from a YOLO format file and creates polygons in the workspace.
-        Assigns a color from the color palette to each polygon.
+        Assigns a color from the color palette to each polygon (colors repeat
+        after 8 polygons; each polygon gets its own ID, so there is no limit).
         """
         if not workspace_frame.image:
             return
@@ -99,37 +132,24 @@ class LabelHandler:
                     x4 = x1
                     y4 = y3
 
-                    poly_points = [
-                        PointData(x1, y1),
-                        PointData(x2, y2),
-                        PointData(x3, y3),
-                        PointData(x4, y4),
-                    ]
+                    poly_points = [(x1, y1), (x2, y2), (x3, y3), (x4, y4)]
 
                     color = self.color_list[self.color_index % len(self.color_list)]
                     self.color_index += 1
 
-                    polygon_dict = {
-                        "points": poly_points,
-                        "color": color,  # Usa a cor atribuída
-                        "class_id": str(int(cls_id)),
-                        "is_closed": True,
-                    }
-
-                    workspace_frame.poly_manager.polygons[color] = polygon_dict
+                    workspace_frame.poly_manager.add_polygon(
+                        poly_points,
+                        color,  # Usa a cor atribuída (só para desenho)
+                        str(int(cls_id)),
+                        is_closed=True,
+                        record=False,
+                    )
 
                 elif len(parts) >= 5 and len(parts) % 2 == 1:
                     try:
                         cls_id = parts[0]
-                        coords = list(map(float, parts[1:]))
-
-                        poly_points = []
-                        for i in range(0, len(coords), 2):
-                            xn = coords[i]
-                            yn = coords[i + 1]
-                            x_abs = xn * img_w
-                            y_abs = yn * img_h
-                            poly_points.append(PointData(x_abs, y_abs))
+                        coords = np.array(parts[1:], dtype=np.float64).reshape(-1, 2)
+                        poly_points = coords * (img_w, img_h)
 
                         if len(poly_points) >= 3:
                             color = self.color_list[
@@ -137,14 +157,13 @@ class LabelHandler:
                             ]
                             self.color_index += 1
 
-                            polygon_dict = {
-                                "points": poly_points,
-                                "color": color,
-                                "class_id": cls_id,
-                                "is_closed": True,
-                            }
-
-                            workspace_frame.poly_manager.polygons[color] = polygon_dict
+                            workspace_frame.poly_manager.add_polygon(
+                                poly_points,
+                                color,
+                                cls_id,
+                                is_closed=True,
+                                record=False,
+                            )
 
                     except ValueError:
                         continue
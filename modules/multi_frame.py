@@ -0,0 +1,109 @@
+# ------------------------------------------------------------------------------
+# File: modules/multi_frame.py
+# Description: Frame-level access to multi-frame images (multi-page TIFF scans,
+#              GIFs), with per-frame label names and background prefetching.
+# ------------------------------------------------------------------------------
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from .image_files import to_display_image
+
+MULTI_FRAME_EXTENSIONS = (".gif", ".tif", ".tiff")
+
+
+def frame_label_path(image_path, frame):
+    """Label file of one frame: 'scan.tif', frame 7 -> 'scan_f0007.txt'."""
+    return f"{os.path.splitext(image_path)[0]}_f{frame:04d}.txt"
+
+
+def frame_key(image_path, frame):
+    """Identifies one frame of a file (e.g. for its edit journal)."""
+    return f"{image_path}#f{frame:04d}"
+
+
+class FrameSource:
+    """
+    Keeps a multi-frame file open and hands out its frames as display-ready
+    images (see to_display_image).
+
+    The frame count is read once on open: for TIFF this walks the chain of
+    page directories (tags only, no pixels) and Pillow keeps the page offsets,
+    so jumping to page N later seeks straight to it instead of going through
+    pages 0..N-1. GIF frames are deltas of the previous ones and can only be
+    composed in order, which is why moving forward is cheap and the recent
+    frames are kept in a small LRU.
+
+    After each frame is shown, 'prefetch_around' decodes its neighbours in a
+    background thread, so paging through a document rarely waits on a decode.
+    """
+
+    def __init__(self, path, cache_size=5, prefetch_radius=1):
+        self.path = path
+        self.cache_size = max(1, cache_size)
+        self.prefetch_radius = prefetch_radius
+        self._image = Image.open(path)
+        self._lock = threading.Lock()  # o Image aberto não é thread-safe
+        self.n_frames = getattr(self._image, "n_frames", 1)
+        self._frames = OrderedDict()
+        self._pending = set()
+        self._pool = ThreadPoolExecutor(max_workers=1)
+        self._closed = False
+
+    def _decode(self, frame):
+        with self._lock:
+            cached = self._frames.get(frame)
+            if cached is not None:
+                return cached
+            if self._closed:
+                raise ValueError(f"{self.path} is closed")
+            self._image.seek(frame)
+            image = to_display_image(self._image)
+            self._frames[frame] = image
+            while len(self._frames) > self.cache_size:
+                self._frames.popitem(last=False)
+            return image
+
+    def get(self, frame):
+        """Display-ready image of 'frame' (0-based)."""
+        if not 0 <= frame < self.n_frames:
+            raise IndexError(f"frame {frame} out of range (0-{self.n_frames - 1})")
+        with self._lock:
+            cached = self._frames.get(frame)
+            if cached is not None:
+                self._frames.move_to_end(frame)
+                return cached
+        return self._decode(frame)
+
+    def prefetch_around(self, frame):
+        """Queues the decode of the frames next to 'frame' (following ones first)."""
+        for step in range(1, self.prefetch_radius + 1):
+            for neighbour in (frame + step, frame - step):
+                if 0 <= neighbour < self.n_frames and neighbour not in self._pending:
+                    with self._lock:
+                        if neighbour in self._frames:
+                            continue
+                    self._pending.add(neighbour)
+                    try:
+                        self._pool.submit(self._prefetch, neighbour)
+                    except RuntimeError:  # já fechado
+                        return
+
+    def _prefetch(self, frame):
+        try:
+            self._decode(frame)
+        except (OSError, EOFError, ValueError):
+            pass
+        finally:
+            self._pending.discard(frame)
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            self._closed = True
+            self._image.close()
+            self._frames.clear()
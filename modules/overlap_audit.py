@@ -0,0 +1,177 @@
+# ------------------------------------------------------------------------------
+# File: modules/overlap_audit.py
+# Description: Dataset-wide search for overlapping / duplicated annotations
+#              (the same object labeled twice, possibly with another class).
+# ------------------------------------------------------------------------------
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .dataset_split import label_path_for
+from .geometry import polygon_iou
+from .image_files import list_image_files
+
+
+def read_label_polygons(label_path):
+    """
+    Reads a YOLO label file as a list of (class_id, coords), coords being an
+    (n, 2) array of normalized coordinates. Lines are parsed and skipped
+    exactly like LabelHandler.load_labels does, so the list index matches the
+    order of the polygons loaded in the workspace.
+    """
+    polygons = []
+    with open(label_path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if not parts:
+                continue
+            if len(parts) == 5:
+                try:
+                    cls_id, cx, cy, w, h = map(float, parts)
+                except ValueError:
+                    continue
+                x1, y1, x2, y2 = cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2
+                coords = np.array([(x1, y1), (x2, y1), (x2, y2), (x1, y2)])
+                polygons.append((str(int(cls_id)), coords))
+            elif len(parts) >= 5 and len(parts) % 2 == 1:
+                try:
+                    coords = np.array(parts[1:], dtype=np.float64).reshape(-1, 2)
+                except ValueError:
+                    continue
+                if len(coords) >= 3:
+                    polygons.append((parts[0], coords))
+    return polygons
+
+
+def _candidate_pairs(bboxes, grid_size):
+    """
+    Pairs (i, j), i < j, of boxes that overlap, found through a uniform grid
+    over the boxes: each box is registered in every cell it covers and only
+    boxes sharing a cell are compared.
+    """
+    if len(bboxes) < 2:
+        return []
+    lo = bboxes[:, :2].min(axis=0)
+    span = np.maximum(bboxes[:, 2:].max(axis=0) - lo, 1e-12)
+    cell = span / grid_size
+    first = np.clip(((bboxes[:, :2] - lo) / cell).astype(np.int64), 0, grid_size - 1)
+    last = np.clip(((bboxes[:, 2:] - lo) / cell).astype(np.int64), 0, grid_size - 1)
+
+    cells = {}
+    for i, ((gx0, gy0), (gx1, gy1)) in enumerate(zip(first.tolist(), last.tolist())):
+        for gx in range(gx0, gx1 + 1):
+            for gy in range(gy0, gy1 + 1):
+                cells.setdefault((gx, gy), []).append(i)
+
+    pairs = set()
+    for members in cells.values():
+        for a in range(len(members)):
+            i = members[a]
+            for j in members[a + 1 :]:
+                pairs.add((i, j))
+    result = []
+    for i, j in sorted(pairs):
+        bi = bboxes[i]
+        bj = bboxes[j]
+        if bi[0] <= bj[2] and bj[0] <= bi[2] and bi[1] <= bj[3] and bj[1] <= bi[3]:
+            result.append((i, j))
+    return result
+
+
+def find_overlaps(polygons, iou_threshold=0.7, grid_size=8):
+    """
+    Returns the pairs of polygons (list of (class_id, coords)) whose IoU is at
+    least 'iou_threshold', as dicts {"a", "b", "class_a", "class_b", "iou",
+    "kind"}; kind is "duplicate" for the same class and "class_conflict" when
+    the two polygons have different classes.
+    """
+    if len(polygons) < 2:
+        return []
+    bboxes = np.array(
+        [np.concatenate((c.min(axis=0), c.max(axis=0))) for _, c in polygons]
+    )
+    findings = []
+    for i, j in _candidate_pairs(bboxes, grid_size):
+        iou = polygon_iou(polygons[i][1], polygons[j][1])
+        if iou < iou_threshold:
+            continue
+        cls_a, cls_b = polygons[i][0], polygons[j][0]
+        findings.append(
+            {
+                "a": i,
+                "b": j,
+                "class_a": cls_a,
+                "class_b": cls_b,
+                "iou": round(float(iou), 4),
+                "kind": "duplicate" if cls_a == cls_b else "class_conflict",
+            }
+        )
+    return findings
+
+
+def audit_label_file(image_path, label_path, iou_threshold=0.7):
+    """Findings of one label file, each tagged with its image/label paths."""
+    try:
+        polygons = read_label_polygons(label_path)
+    except (OSError, UnicodeDecodeError):
+        return []
+    findings = find_overlaps(polygons, iou_threshold)
+    for finding in findings:
+        finding["image"] = image_path
+        finding["label"] = label_path
+    return findings
+
+
+def _audit_batch(items, iou_threshold):
+    findings = []
+    for image_path, label_path in items:
+        findings.extend(audit_label_file(image_path, label_path, iou_threshold))
+    return findings, len(items)
+
+
+class OverlapAuditor:
+    """
+    Runs find_overlaps over every labeled image of a folder in a process pool
+    (the IoU work is CPU bound), 'batch_size' label files per task.
+    """
+
+    def __init__(self, iou_threshold=0.7, workers=None, batch_size=32):
+        self.iou_threshold = iou_threshold
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+
+    def audit_folder(self, folder, progress=None):
+        """Audits the images of 'folder' that have a sibling .txt label."""
+        items = []
+        for name in list_image_files(folder):
+            image_path = os.path.join(folder, name)
+            label_path = label_path_for(image_path)
+            if os.path.exists(label_path):
+                items.append((image_path, label_path))
+        return self.audit(items, progress)
+
+    def audit(self, items, progress=None):
+        """
+        Audits (image_path, label_path) items. 'progress(done, total)' is called
+        as files finish. Returns the findings sorted by IoU (highest first).
+        """
+        findings = []
+        total = len(items)
+        if not total:
+            return findings
+        done = 0
+        batches = [
+            items[start : start + self.batch_size] for start in range(0, total, self.batch_size)
+        ]
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(batches))) as pool:
+            futures = [pool.submit(_audit_batch, batch, self.iou_threshold) for batch in batches]
+            for future in as_completed(futures):
+                batch_findings, count = future.result()
+                findings.extend(batch_findings)
+                done += count
+                if progress:
+                    progress(done, total)
+        findings.sort(key=lambda f: (-f["iou"], f["image"], f["a"], f["b"]))
+        return findings
@@ -0,0 +1,58 @@
+# ------------------------------------------------------------------------------
+# File: modules/selection.py
+# Description: Rectangle and lasso selection of polygon vertices.
+# ------------------------------------------------------------------------------
+
+import numpy as np
+
+from .geometry import points_in_polygon, points_in_rect
+
+
+def _stack(polygons):
+    """
+    Returns (keys, coords, owner, starts): every vertex of every polygon in one
+    (n, 2) array, the polygon index of each vertex and where each polygon starts.
+    """
+    keys = [key for key, poly in polygons.items() if len(poly)]
+    if not keys:
+        return keys, np.empty((0, 2)), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    parts = [polygons[key].coords for key in keys]
+    sizes = np.array([len(p) for p in parts], dtype=np.int64)
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    owner = np.repeat(np.arange(len(keys)), sizes)
+    return keys, np.concatenate(parts), owner, starts
+
+
+def _group(keys, mask, owner, starts):
+    """Turns a mask over the stacked vertices into {polygon_key: index array}."""
+    hits = np.flatnonzero(mask)
+    if not len(hits):
+        return {}
+    hit_owner = owner[hits]
+    local = hits - starts[hit_owner]
+    bounds = np.flatnonzero(np.diff(hit_owner)) + 1
+    selection = {}
+    for idx_part, own in zip(np.split(local, bounds), hit_owner[np.r_[0, bounds]].tolist()):
+        selection[keys[own]] = idx_part
+    return selection
+
+
+def select_in_rect(polygons, x1, y1, x2, y2):
+    """Vertices of all polygons inside the rectangle, as {polygon_key: index array}."""
+    keys, xy, owner, starts = _stack(polygons)
+    if not keys:
+        return {}
+    return _group(keys, points_in_rect(xy, x1, y1, x2, y2), owner, starts)
+
+
+def select_in_lasso(polygons, lasso):
+    """Vertices of all polygons inside the freehand 'lasso' path (closed implicitly)."""
+    keys, xy, owner, starts = _stack(polygons)
+    if not keys:
+        return {}
+    return _group(keys, points_in_polygon(xy, lasso), owner, starts)
+
+
+def selection_size(selection):
+    """Number of selected vertices."""
+    return sum(len(idx) for idx in selection.values())
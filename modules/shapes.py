@@ -3,17 +3,92 @@
 # Description: Contains data classes for polygons, points, etc.
 # ------------------------------------------------------------------------------
 
+import numpy as np
+
+
 class PointData:
     """ Holds x, y coords of a point. """
+    __slots__ = ("x", "y")
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
 
+
+class VertexHandle:
+    """
+    Live view of one vertex of a PolygonData: reading or assigning x/y goes
+    straight to the polygon's coordinate array. Stays valid while the polygon
+    gains no points before 'idx' (e.g. for the whole duration of a drag).
+    """
+    __slots__ = ("polygon", "idx")
+
+    def __init__(self, polygon, idx):
+        self.polygon = polygon
+        self.idx = idx
+
+    @property
+    def x(self):
+        return float(self.polygon.coords[self.idx, 0])
+
+    @x.setter
+    def x(self, value):
+        self.polygon.coords[self.idx, 0] = value
+
+    @property
+    def y(self):
+        return float(self.polygon.coords[self.idx, 1])
+
+    @y.setter
+    def y(self, value):
+        self.polygon.coords[self.idx, 1] = value
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, VertexHandle)
+            and other.polygon is self.polygon
+            and other.idx == self.idx
+        )
+
+    def __hash__(self):
+        return hash((id(self.polygon), self.idx))
+
+
 class PolygonData:
-    """ 
-    Holds a list of points (2 for bounding box), a color, and a class ID. 
     """
-    def __init__(self, points, color, class_id=None):
-        self.points = points  # list of PointData
+    Holds the vertices of a polygon in a contiguous (n, 2) float64 array
+    (image coordinates), plus its color, class ID and closed flag.
+    """
+    __slots__ = ("coords", "color", "class_id", "is_closed")
+
+    def __init__(self, coords=(), color=None, class_id="", is_closed=False):
+        self.coords = np.array(coords, dtype=np.float64).reshape(-1, 2)
         self.color = color
         self.class_id = class_id
+        self.is_closed = is_closed
+
+    def __len__(self):
+        return len(self.coords)
+
+    def vertex(self, idx):
+        """Returns a VertexHandle for point 'idx'."""
+        return VertexHandle(self, idx)
+
+    @property
+    def points(self):
+        """Vertex handles of all points (a view; prefer 'coords' for bulk work)."""
+        return [VertexHandle(self, i) for i in range(len(self.coords))]
+
+    def flat_coords(self):
+        """Returns a flat copy [x0, y0, x1, y1, ...] of the coordinates."""
+        return self.coords.ravel().copy()
+
+    def insert_point(self, idx, x, y):
+        self.coords = np.insert(self.coords, idx, (x, y), axis=0)
+
+    def delete_point(self, idx):
+        self.coords = np.delete(self.coords, idx, axis=0)
+
+    def set_point(self, idx, x, y):
+        self.coords[idx, 0] = x
+        self.coords[idx, 1] = y
@@ -0,0 +1,277 @@
+# ------------------------------------------------------------------------------
+# File: modules/spatial_index.py
+# Description: Spatial indexes used for hit-testing and snapping polygon vertices.
+# ------------------------------------------------------------------------------
+
+import math
+
+import numpy as np
+
+from .geometry import project_to_segments
+
+
+class VertexGrid:
+    """
+    Uniform grid over all polygon vertices, in image coordinates.
+
+    Each cell holds the (polygon_key, point_index) pairs of the vertices inside it.
+    Point moves update a single entry. Polygons that gain or lose points (which
+    shifts the indexes after the edited one) are only marked stale and
+    re-indexed on the next query, so loading or bulk edits cost nothing until
+    hit-testing is needed.
+    """
+
+    def __init__(self, cell_size=32.0):
+        self.cell_size = float(cell_size)
+        self._cells = {}
+        self._vertex_cells = {}  # polygon_key -> [cell of point 0, cell of point 1, ...]
+        self._stale = set()
+
+    def _cell(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def clear(self):
+        self._cells.clear()
+        self._vertex_cells.clear()
+        self._stale.clear()
+
+    def invalidate(self, key):
+        """Marks a polygon as created, removed or re-indexed."""
+        self._stale.add(key)
+
+    def move(self, key, idx, x, y):
+        """Updates the cell of one vertex after it moved."""
+        if key in self._stale:
+            return
+        cells = self._vertex_cells.get(key)
+        if cells is None or idx >= len(cells):
+            self._stale.add(key)
+            return
+        new_cell = self._cell(x, y)
+        old_cell = cells[idx]
+        if new_cell == old_cell:
+            return
+        self._discard(old_cell, (key, idx))
+        self._cells.setdefault(new_cell, set()).add((key, idx))
+        cells[idx] = new_cell
+
+    def _discard(self, cell, entry):
+        bucket = self._cells.get(cell)
+        if bucket is not None:
+            bucket.discard(entry)
+            if not bucket:
+                del self._cells[cell]
+
+    def _remove_polygon(self, key):
+        for idx, cell in enumerate(self._vertex_cells.pop(key, ())):
+            self._discard(cell, (key, idx))
+
+    def _sync(self, polygons):
+        """Re-indexes the stale polygons."""
+        if not self._stale:
+            return
+        for key in self._stale:
+            self._remove_polygon(key)
+            poly = polygons.get(key)
+            if poly is None:
+                continue
+            grid = np.floor(poly.coords / self.cell_size).astype(np.int64)
+            cells = list(zip(grid[:, 0].tolist(), grid[:, 1].tolist()))
+            for idx, cell in enumerate(cells):
+                self._cells.setdefault(cell, set()).add((key, idx))
+            self._vertex_cells[key] = cells
+        self._stale.clear()
+
+    def nearest(self, polygons, x, y, radius, exclude=None):
+        """
+        Returns (polygon_key, point_index, distance) of the vertex closest to
+        (x, y) within 'radius', or None. 'exclude' is an optional (key, index)
+        pair to ignore.
+        """
+        self._sync(polygons)
+        cs = self.cell_size
+        x0 = math.floor((x - radius) / cs)
+        x1 = math.floor((x + radius) / cs)
+        y0 = math.floor((y - radius) / cs)
+        y1 = math.floor((y + radius) / cs)
+
+        best = None
+        best_dist = radius
+        cells = self._cells
+        for gx in range(x0, x1 + 1):
+            for gy in range(y0, y1 + 1):
+                bucket = cells.get((gx, gy))
+                if not bucket:
+                    continue
+                for entry in bucket:
+                    if entry == exclude:
+                        continue
+                    key, idx = entry
+                    coords = polygons[key].coords
+                    dist = math.hypot(coords.item(idx, 0) - x, coords.item(idx, 1) - y)
+                    if dist < best_dist or (best is None and dist <= best_dist):
+                        best = entry
+                        best_dist = dist
+        if best is None:
+            return None
+        return best[0], best[1], best_dist
+
+
+class SegmentIndex:
+    """
+    Edge arrays of every polygon (segment i joins point i to point i+1, wrapping
+    around), used to find the segment nearest to a point with one vectorized
+    projection/clamp/distance pass.
+
+    Each polygon keeps its own cached arrays and bounding box; an edit only
+    marks that polygon stale. Queries first discard the polygons whose bounding
+    box (grown by the radius) does not contain the point.
+    """
+
+    def __init__(self):
+        self._edges = {}  # polygon_key -> (x1, y1, x2, y2) arrays
+        self._bboxes = {}  # polygon_key -> (min_x, min_y, max_x, max_y)
+        self._stale = set()
+        self._all_stale = True
+        self._bbox_keys = []
+        self._bbox_array = np.empty((0, 4))
+
+    def clear(self):
+        self._edges.clear()
+        self._bboxes.clear()
+        self._stale.clear()
+        self._all_stale = True
+
+    def invalidate(self, key):
+        """Marks a polygon whose points changed in any way."""
+        self._stale.add(key)
+
+    def _sync(self, polygons):
+        if self._all_stale:
+            self._edges.clear()
+            self._bboxes.clear()
+            stale = set(polygons)
+        else:
+            stale = self._stale
+        if not stale and len(self._bbox_keys) == len(self._edges):
+            return
+        for key in stale:
+            self._edges.pop(key, None)
+            self._bboxes.pop(key, None)
+            poly = polygons.get(key)
+            if poly is None or len(poly) < 2:
+                continue
+            xy = poly.coords
+            nxt = np.roll(xy, -1, axis=0)
+            self._edges[key] = (xy[:, 0], xy[:, 1], nxt[:, 0], nxt[:, 1])
+            mins = xy.min(axis=0)
+            maxs = xy.max(axis=0)
+            self._bboxes[key] = (mins[0], mins[1], maxs[0], maxs[1])
+        self._stale = set()
+        self._all_stale = False
+        # Mantém a ordem do dict de polígonos (mesma ordem de desempate da busca linear)
+        self._bbox_keys = [key for key in polygons if key in self._bboxes]
+        self._bbox_array = np.array(
+            [self._bboxes[key] for key in self._bbox_keys], dtype=np.float64
+        ).reshape(-1, 4)
+
+    def nearest(self, polygons, x, y, radius):
+        """
+        Returns (polygon_key, segment_index, x_proj, y_proj, distance) for the
+        segment closest to (x, y) within 'radius', or None.
+        """
+        self._sync(polygons)
+        if not self._bbox_keys:
+            return None
+        bb = self._bbox_array
+        mask = (
+            (bb[:, 0] - radius <= x)
+            & (bb[:, 2] + radius >= x)
+            & (bb[:, 1] - radius <= y)
+            & (bb[:, 3] + radius >= y)
+        )
+        candidates = [self._bbox_keys[i] for i in np.flatnonzero(mask)]
+        if not candidates:
+            return None
+
+        parts = [self._edges[key] for key in candidates]
+        x1 = np.concatenate([p[0] for p in parts])
+        y1 = np.concatenate([p[1] for p in parts])
+        x2 = np.concatenate([p[2] for p in parts])
+        y2 = np.concatenate([p[3] for p in parts])
+
+        dist, x_proj, y_proj, _ = project_to_segments(x, y, x1, y1, x2, y2)
+
+        best = int(np.argmin(dist))
+        if dist[best] > radius:
+            return None
+        # Converte o índice plano de volta para (polígono, segmento)
+        seg = best
+        for key, part in zip(candidates, parts):
+            n = len(part[0])
+            if seg < n:
+                return key, seg, float(x_proj[best]), float(y_proj[best]), float(dist[best])
+            seg -= n
+        return None
+
+
+class SnapIndex:
+    """
+    Static grid of snap targets, built once when a drag starts.
+
+    The vertices of all polygons except the dragged one are bucketed by cell
+    (sorted by cell, one slice of the coordinate array per cell), so the
+    dragged vertex can never be its own snap target and every motion event
+    only looks at the cells around the pointer. Nothing else moves during a
+    drag, so the index never needs updating.
+    """
+
+    def __init__(self, coords, cell_size=10.0):
+        self.cell_size = max(float(cell_size), 1e-6)
+        self._cells = {}
+        coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        if not len(coords):
+            return
+        cells = np.floor(coords / self.cell_size).astype(np.int64)
+        order = np.lexsort((cells[:, 1], cells[:, 0]))
+        cells = cells[order]
+        coords = coords[order]
+        starts = np.flatnonzero(np.any(np.diff(cells, axis=0) != 0, axis=1)) + 1
+        bounds = [0] + starts.tolist() + [len(coords)]
+        for (gx, gy), start, end in zip(cells[bounds[:-1]].tolist(), bounds[:-1], bounds[1:]):
+            self._cells[(gx, gy)] = coords[start:end]
+
+    @classmethod
+    def from_polygons(cls, polygons, exclude=None, cell_size=10.0):
+        """
+        Builds the index over all vertices of 'polygons' (dict of PolygonData).
+        'exclude' is an optional (key, index) pair left out (the dragged vertex).
+        """
+        parts = []
+        for key, poly in polygons.items():
+            coords = poly.coords
+            if exclude is not None and key == exclude[0]:
+                coords = np.delete(coords, exclude[1], axis=0)
+            parts.append(coords)
+        if not parts:
+            return cls(np.empty((0, 2)), cell_size)
+        return cls(np.concatenate(parts), cell_size)
+
+    def nearest(self, x, y, radius):
+        """Returns (x, y, distance) of the closest target strictly within 'radius', or None."""
+        cs = self.cell_size
+        cells = self._cells
+        parts = []
+        for gx in range(math.floor((x - radius) / cs), math.floor((x + radius) / cs) + 1):
+            for gy in range(math.floor((y - radius) / cs), math.floor((y + radius) / cs) + 1):
+                bucket = cells.get((gx, gy))
+                if bucket is not None:
+                    parts.append(bucket)
+        if not parts:
+            return None
+        pts = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        dist = np.hypot(pts[:, 0] - x, pts[:, 1] - y)
+        best = int(np.argmin(dist))
+        if dist[best] >= radius:
+            return None
+        return float(pts[best, 0]), float(pts[best, 1]), float(dist[best])
@@ -0,0 +1,231 @@
+# ------------------------------------------------------------------------------
+# File: modules/thumbnail_grid.py
+# Description: Virtualized thumbnail grid of the files of a folder.
+# ------------------------------------------------------------------------------
+
+import math
+import os
+import tkinter as tk
+
+from PIL import ImageTk
+
+from .thumbnails import ThumbnailLoader
+
+
+class ThumbnailGrid(tk.Toplevel):
+    """
+    Window with a scrollable grid of thumbnails, each with a badge showing the
+    label status (polygon count, or "no label").
+
+    Only the cells of the visible rows (plus 'overscan' rows) exist as canvas
+    items; the scroll region just reserves the height of all rows. When the
+    view moves, cells that left it are deleted (and their pending thumbnail
+    requests cancelled) and the new ones are created, so the cost of scrolling
+    does not depend on the number of files.
+    """
+
+    POLL_MS = 30
+
+    def __init__(self, parent, folder, names, on_open=None, thumb_size=128, overscan=1):
+        """
+        :param names: File names (relative to 'folder'), in display order.
+        :param on_open: Called with the name of a double-clicked thumbnail.
+        """
+        super().__init__(parent)
+        self.title(f"Thumbnails - {folder}")
+        self.geometry("900x600")
+        self.folder = folder
+        self.names = list(names)
+        self.on_open = on_open
+        self.thumb_size = thumb_size
+        self.overscan = overscan
+        self.cell_w = thumb_size + 16
+        self.cell_h = thumb_size + 32
+        self.columns = 1
+        self.loader = ThumbnailLoader()
+        self._cells = {}  # índice -> {"photo", "future", "x", "y", "tag"}
+        self._update_id = None
+        self._poll_id = None
+
+        self.canvas = tk.Canvas(self, bg="#303030", highlightthickness=0)
+        scrollbar = tk.Scrollbar(self, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=lambda lo, hi: self._on_yview(scrollbar, lo, hi))
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.canvas.bind("<Configure>", self._on_configure)
+        self.canvas.bind("<MouseWheel>", self._on_mouse_wheel)
+        self.canvas.bind("<Button-4>", lambda e: self.canvas.yview_scroll(-1, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.canvas.yview_scroll(1, "units"))
+        self.canvas.bind("<Double-Button-1>", self._on_double_click)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+    # ----------------------------
+    # Layout / virtualization
+    # ----------------------------
+
+    def _on_configure(self, event):
+        columns = max(1, event.width // self.cell_w)
+        rows = math.ceil(len(self.names) / columns)
+        self.canvas.configure(
+            scrollregion=(0, 0, columns * self.cell_w, rows * self.cell_h),
+            yscrollincrement=self.cell_h // 4,
+        )
+        if columns != self.columns:
+            self.columns = columns
+            self._clear_cells()
+        self._schedule_update()
+
+    def _on_yview(self, scrollbar, lo, hi):
+        scrollbar.set(lo, hi)
+        self._schedule_update()
+
+    def _on_mouse_wheel(self, event):
+        self.canvas.yview_scroll(-1 if event.delta > 0 else 1, "units")
+
+    def _schedule_update(self):
+        # Vários eventos de rolagem no mesmo ciclo viram uma única atualização
+        if self._update_id is None:
+            self._update_id = self.after_idle(self._update_visible)
+
+    def visible_range(self):
+        """Indices [first, last) of the cells in (or near) the view."""
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        first_row = max(0, int(top // self.cell_h) - self.overscan)
+        last_row = int(bottom // self.cell_h) + 1 + self.overscan
+        return first_row * self.columns, min(len(self.names), last_row * self.columns)
+
+    def _update_visible(self):
+        self._update_id = None
+        first, last = self.visible_range()
+        for index in [i for i in self._cells if not first <= i < last]:
+            self._delete_cell(index)
+        for index in range(first, last):
+            if index not in self._cells:
+                self._create_cell(index)
+        if self._poll_id is None and any(c["future"] for c in self._cells.values()):
+            self._poll_id = self.after(self.POLL_MS, self._poll)
+
+    def _clear_cells(self):
+        for index in list(self._cells):
+            self._delete_cell(index)
+
+    # ----------------------------
+    # Cells
+    # ----------------------------
+
+    def _path(self, index):
+        return os.path.join(self.folder, self.names[index])
+
+    def _create_cell(self, index):
+        row, col = divmod(index, self.columns)
+        x = col * self.cell_w + self.cell_w // 2
+        y = row * self.cell_h + 8
+        tag = f"cell:{index}"
+        canvas = self.canvas
+        canvas.create_rectangle(
+            x - self.thumb_size // 2 - 2,
+            y - 2,
+            x + self.thumb_size // 2 + 2,
+            y + self.thumb_size + 2,
+            outline="#505050",
+            tags=tag,
+        )
+        name = self.names[index]
+        if len(name) > 20:
+            name = name[:9] + "…" + name[-10:]
+        canvas.create_text(
+            x, y + self.thumb_size + 12, text=name, fill="white", font=("Arial", 8), tags=tag
+        )
+        cell = {"photo": None, "future": None, "x": x, "y": y, "tag": tag}
+        self._cells[index] = cell
+
+        path = self._path(index)
+        result = self.loader.cached(path)
+        if result is not None:
+            self._fill_cell(cell, result)
+        else:
+            cell["future"] = self.loader.request(path)
+
+    def _fill_cell(self, cell, result):
+        thumb, n_polygons = result
+        canvas = self.canvas
+        x, y, tag = cell["x"], cell["y"], cell["tag"]
+        if thumb is not None:
+            cell["photo"] = ImageTk.PhotoImage(thumb)
+            canvas.create_image(x, y + self.thumb_size // 2, image=cell["photo"], tags=tag)
+        else:
+            canvas.create_text(
+                x, y + self.thumb_size // 2, text="?", fill="gray", font=("Arial", 16), tags=tag
+            )
+
+        # Selo com o estado do rótulo no canto superior esquerdo
+        if n_polygons is None:
+            text, color = "no label", "#808080"
+        elif n_polygons == 0:
+            text, color = "empty", "#C08000"
+        else:
+            text, color = str(n_polygons), "#008000"
+        bx = x - self.thumb_size // 2
+        badge = canvas.create_text(
+            bx + 4,
+            y + 4,
+            text=text,
+            anchor="nw",
+            fill="white",
+            font=("Arial", 8, "bold"),
+            tags=tag,
+        )
+        x1, y1, x2, y2 = canvas.bbox(badge)
+        box = canvas.create_rectangle(
+            x1 - 2, y1 - 1, x2 + 2, y2 + 1, fill=color, outline="", tags=tag
+        )
+        canvas.tag_lower(box, badge)
+
+    def _delete_cell(self, index):
+        cell = self._cells.pop(index)
+        if cell["future"] is not None:
+            cell["future"].cancel()
+        self.canvas.delete(cell["tag"])
+
+    def _poll(self):
+        """Moves finished thumbnails from the pool into their cells (Tk is single-threaded)."""
+        self._poll_id = None
+        waiting = False
+        for cell in self._cells.values():
+            future = cell["future"]
+            if future is None:
+                continue
+            if future.done():
+                cell["future"] = None
+                if not future.cancelled() and future.exception() is None:
+                    self._fill_cell(cell, future.result())
+            else:
+                waiting = True
+        if waiting:
+            self._poll_id = self.after(self.POLL_MS, self._poll)
+
+    def _on_double_click(self, event):
+        col = int(self.canvas.canvasx(event.x) // self.cell_w)
+        row = int(self.canvas.canvasy(event.y) // self.cell_h)
+        index = row * self.columns + col
+        if col < self.columns and 0 <= index < len(self.names) and self.on_open:
+            self.on_open(self.names[index])
+
+    def refresh_item(self, name):
+        """Rebuilds the cell of 'name' (e.g. after its labels were saved)."""
+        if name not in self.names:
+            return
+        index = self.names.index(name)
+        self.loader.forget(self._path(index))
+        if index in self._cells:
+            self._delete_cell(index)
+            self._schedule_update()
+
+    def close(self):
+        for after_id in (self._update_id, self._poll_id):
+            if after_id is not None:
+                self.after_cancel(after_id)
+        self.loader.close()
+        self.destroy()
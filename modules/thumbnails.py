@@ -0,0 +1,128 @@
+# ------------------------------------------------------------------------------
+# File: modules/thumbnails.py
+# Description: Persistent thumbnail cache and the background pool that fills
+#              it (used by the thumbnail grid).
+# ------------------------------------------------------------------------------
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from .dataset_split import label_path_for, read_label_classes
+from .image_files import to_display_image
+
+
+def default_thumbnail_dir():
+    """Local directory for thumbnails (next to the edit journals)."""
+    return os.path.join(os.path.expanduser("~"), ".ezlabel", "thumbnails")
+
+
+def label_status(image_path):
+    """Polygon count of the sibling label file, or None when the image has no label."""
+    label_path = label_path_for(image_path)
+    if not os.path.exists(label_path):
+        return None
+    return len(read_label_classes(label_path))
+
+
+class ThumbnailCache:
+    """
+    Thumbnails of at most 'size' x 'size' px stored as small JPEG files, keyed
+    by image path, mtime and file size (an edited image gets a new thumbnail).
+    JPEG sources are decoded with 'draft', which lets libjpeg decode directly
+    at 1/2, 1/4 or 1/8 scale instead of decoding the full image.
+    """
+
+    def __init__(self, cache_dir=None, size=128):
+        self.cache_dir = cache_dir or default_thumbnail_dir()
+        self.size = size
+
+    def _path_for(self, image_path):
+        st = os.stat(image_path)
+        key = f"{os.path.abspath(image_path)}|{st.st_mtime_ns}|{st.st_size}|{self.size}"
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest + ".jpg")
+
+    def load(self, image_path):
+        """Returns the thumbnail of 'image_path' (RGB), creating and storing it if needed."""
+        cache_path = self._path_for(image_path)
+        try:
+            with Image.open(cache_path) as cached:
+                cached.load()
+                return cached
+        except OSError:
+            pass
+        thumb = self.make(image_path)
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            thumb.save(tmp_path, "JPEG", quality=85)
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass
+        return thumb
+
+    def make(self, image_path):
+        size = (self.size, self.size)
+        with Image.open(image_path) as image:
+            if image.format == "JPEG":
+                image.draft("RGB", size)
+            image.load()
+            thumb = to_display_image(image)
+        thumb.thumbnail(size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+        return thumb
+
+
+class ThumbnailLoader:
+    """
+    Fills thumbnails in a thread pool (decoding releases the GIL). Results are
+    kept in a memory LRU of 'memory_items' thumbnails, so scrolling back does
+    not touch the disk again. 'request' returns a Future of
+    (thumbnail or None, polygon count or None); requests for items that
+    scrolled out of view can be cancelled before they start.
+    """
+
+    def __init__(self, cache=None, workers=None, memory_items=1024):
+        self.cache = cache or ThumbnailCache()
+        self.memory_items = memory_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers or min(8, os.cpu_count() or 1))
+
+    def cached(self, image_path):
+        """Result already in memory, or None."""
+        with self._lock:
+            result = self._memory.get(image_path)
+            if result is not None:
+                self._memory.move_to_end(image_path)
+            return result
+
+    def request(self, image_path):
+        return self._pool.submit(self._load, image_path)
+
+    def _load(self, image_path):
+        result = self.cached(image_path)
+        if result is not None:
+            return result
+        try:
+            thumb = self.cache.load(image_path)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            thumb = None
+        result = (thumb, label_status(image_path))
+        with self._lock:
+            self._memory[image_path] = result
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+        return result
+
+    def forget(self, image_path):
+        """Drops the in-memory result (e.g. after its labels changed)."""
+        with self._lock:
+            self._memory.pop(image_path, None)
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
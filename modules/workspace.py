@@ -1,6 +1,4 @@
-import math
 import tkinter as tk
-from PIL import Image
 
 from .shapes import PointData
 from .balloon_zoom import BalloonZoom
@@ -8,6 +6,10 @@ from .workspace_draw import WorkspaceDrawer
 from .workspace_events import WorkspaceEvents
 from .workspace_polygons import WorkspacePolygons
 from .class_selection import ClassSelectionDialog
+from .edit_journal import EditJournal
+from .geometry import canvas_to_image, image_to_canvas, point_segment_distance
+from .image_files import open_display_image
+from .multi_frame import MULTI_FRAME_EXTENSIONS, FrameSource, frame_key
 
 
 class WorkspaceFrame(tk.Frame):
@@ -21,6 +23,9 @@ class WorkspaceFrame(tk.Frame):
 
         self.parent = parent
         self.image = None
+        self.image_cache = None  # DecodedImageCache opcional (imagens enormes)
+        self.frame_source = None  # FrameSource da imagem atual, se tiver vários frames
+        self.frame_index = 0
         self.class_definitions = class_definitions
         self.canvas = tk.Canvas(self, cursor="cross")
         self.canvas.pack(fill=tk.BOTH, expand=True)
@@ -45,6 +50,9 @@ class WorkspaceFrame(tk.Frame):
         # Managers
         self.balloon_zoom = BalloonZoom(self.canvas)
         self.poly_manager = WorkspacePolygons(self)
+        self.journal = EditJournal()
+        self.journal.snapshot_provider = self.poly_manager.snapshot
+        self.poly_manager.journal = self.journal
         self.drawer = WorkspaceDrawer(self)
         self.events = WorkspaceEvents(self)
         self.events.bind_all()
@@ -52,8 +60,21 @@ class WorkspaceFrame(tk.Frame):
     def clear_workspace(self):
         """Clears the workspace: removes all polygons, clears the image, and resets the canvas."""
         self.poly_manager.clear_all()
+        self.journal.close()
         self.image = None
         self.canvas.delete("all")
+        self._close_frame_source()
+
+    @property
+    def n_frames(self):
+        """Number of frames of the loaded file (1 for ordinary images)."""
+        return self.frame_source.n_frames if self.frame_source is not None else 1
+
+    def _close_frame_source(self):
+        if self.frame_source is not None:
+            self.frame_source.close()
+            self.frame_source = None
+        self.frame_index = 0
 
     def set_manual_zoom(self, zoom_factor):
         """Sets the zoom to the given factor and re-centers the image."""
@@ -103,8 +124,8 @@ class WorkspaceFrame(tk.Frame):
         # Descobre quais IDs estão presentes nos polígonos carregados
         existing_class_ids = set()
         for _, poly in self.poly_manager.polygons.items():
-            if "class_id" in poly and poly["class_id"]:
-                existing_class_ids.add(poly["class_id"])
+            if poly.class_id:
+                existing_class_ids.add(poly.class_id)
 
         dialog = ClassSelectionDialog(
             parent=self.parent,
@@ -116,41 +137,125 @@ class WorkspaceFrame(tk.Frame):
         )
         return dialog.show()
 
-    def load_image(self, path):
+    def load_image(self, path, frame=0):
         """
         Loads image, resets zoom/pan to 100% (instead of FIT), clears polygons, and redraws.
+        The image is converted once to an upright RGB buffer; its size is the
+        coordinate frame of the labels. With an image_cache set, large images
+        are read (RGB, no decoding) from the decoded cache instead.
+        For multi-frame files (GIF/TIFF pages) 'frame' selects the frame shown;
+        the file stays open while its frames are browsed.
         """
-        self.image = Image.open(path)
+        if self.frame_source is not None and self.frame_source.path != path:
+            self._close_frame_source()
+        if self.frame_source is None and path.lower().endswith(MULTI_FRAME_EXTENSIONS):
+            source = FrameSource(path)
+            if source.n_frames > 1:
+                self.frame_source = source
+            else:
+                source.close()
+
+        if self.frame_source is not None:
+            frame = max(0, min(frame, self.frame_source.n_frames - 1))
+            self.image = self.frame_source.get(frame)
+            self.frame_source.prefetch_around(frame)
+            journal_key = frame_key(path, frame)
+        else:
+            frame = 0
+            if self.image_cache is not None:
+                self.image = self.image_cache.load(path)
+            else:
+                self.image = open_display_image(path)
+            journal_key = path
+        self.frame_index = frame
         self.base_width = self.image.width
         self.base_height = self.image.height
         self.poly_manager.clear_all()
+        self.journal.open(journal_key)
         self.scale = 1.0
         self._center_image()
         self.drawer.draw_all()
 
+    def recover_unsaved_edits(self):
+        """
+        Replays the edit journal of the current image (edits made after the last
+        save that were lost, e.g. by a crash). Call after the labels are loaded.
+        Returns True if edits were recovered.
+        """
+        if not self.image:
+            return False
+        if self.poly_manager.replay_journal():
+            self.drawer.refresh()
+            return True
+        return False
+
+    def undo(self):
+        """Reverts the last polygon edit."""
+        if self.events.dragged_point or self.events.group_drag_start is not None:
+            return
+        if self.poly_manager.undo():
+            self.drawer.refresh()
+
+    def redo(self):
+        """Re-applies the last undone polygon edit."""
+        if self.events.dragged_point or self.events.group_drag_start is not None:
+            return
+        if self.poly_manager.redo():
+            self.drawer.refresh()
+
+    def delete_selection(self):
+        """Deletes the selected vertices (selection mode)."""
+        pm = self.poly_manager
+        if not pm.selection or self.events.group_drag_start is not None:
+            return
+        pm.delete_vertices(pm.selection)
+        self.drawer.refresh()
+
+    def extract_selection(self):
+        """Creates new closed polygons from the selected vertices, asking for the class."""
+        pm = self.poly_manager
+        if not pm.selection or self.events.group_drag_start is not None:
+            return
+        class_id = self.prompt_class_selection()
+        if class_id is None:
+            return
+        keys = pm.extract_polygons(pm.selection, self.line_color, class_id)
+        if keys:
+            pm.set_active(keys[-1])
+        self.drawer.refresh()
+
+    def clear_selection(self):
+        """Drops the vertex selection."""
+        if self.poly_manager.selection:
+            self.poly_manager.selection = {}
+            self.drawer.refresh()
+
     def set_continuous_mode(self, val):
         """Activates/deactivates continuous mode in free drawing."""
         self.is_continuous_free_mode = val
-        self.poly_manager.current_free_polygon = None
-        self.drawer.draw_all()
+        self.poly_manager.active_key = None
+        self.drawer.refresh()
 
     def set_draw_mode(self, mode):
         """Sets draw mode and resets related states."""
         self.draw_mode = mode
+        self.poly_manager.selection = {}
         self.temp_point = None
         self.is_drawing_segment = False
-        self.poly_manager.current_free_polygon = None
+        self.poly_manager.active_key = None
         self.poly_manager.temp_free_point = None
-        self.drawer.draw_all()
+        self.drawer.refresh()
 
     def set_line_color(self, color):
         """Updates the color used for new polygons."""
         if color:
             self.line_color = color
+            # A próxima polyline começa do zero com a nova cor
+            self.poly_manager.active_key = None
 
     def set_selected_polygon(self, poly_key):
         """Delegates to polygon manager."""
-        self.poly_manager.set_selected_polygon(poly_key)
+        self.poly_manager.set_active(poly_key)
 
     @property
     def polygons(self):
@@ -166,40 +271,24 @@ class WorkspaceFrame(tk.Frame):
 
     def _to_image_coords(self, cx, cy):
         """Canvas -> image coordinates."""
-        x = (cx - self.offset_x) / self.scale
-        y = (cy - self.offset_y) / self.scale
-        return x, y
+        return canvas_to_image(cx, cy, self.scale, self.offset_x, self.offset_y)
 
     def _to_canvas_coords(self, x, y):
         """Image -> canvas coordinates."""
-        cx = x * self.scale + self.offset_x
-        cy = y * self.scale + self.offset_y
-        return cx, cy
+        return image_to_canvas(x, y, self.scale, self.offset_x, self.offset_y)
 
     def _find_point_near(self, x, y, radius=20):
         """
         Returns (closest_point, polygon_key, index_in_polygon)
         if found within 'radius' distance on canvas.
+        'closest_point' is a VertexHandle (live view of the vertex).
         """
-        nearest_point = None
-        nearest_poly_key = None
-        nearest_pt_idx = None
-        min_dist = float("inf")
-
-        for key, poly in self.poly_manager.polygons.items():
-            for i, pt in enumerate(poly["points"]):
-                dist = math.dist((pt.x, pt.y), (x, y))
-                if dist < min_dist and dist <= radius / self.scale:
-                    min_dist = dist
-                    nearest_point = pt
-                    nearest_poly_key = key
-                    nearest_pt_idx = i
-
-        return (
-            (nearest_point, nearest_poly_key, nearest_pt_idx)
-            if nearest_point
-            else (None, None, None)
-        )
+        pm = self.poly_manager
+        hit = pm.vertex_index.nearest(pm.polygons, x, y, radius / self.scale)
+        if hit is None:
+            return (None, None, None)
+        key, idx, _ = hit
+        return pm.polygons[key].vertex(idx), key, idx
 
     def _check_near_point(self, x, y, radius=20):
         """
@@ -211,49 +300,17 @@ class WorkspaceFrame(tk.Frame):
     def _find_segment_near(self, x, y, radius=20):
         """
         Searches all polygons for a line segment near (x, y).
+        'radius' is in canvas pixels (converted with the current zoom).
         Returns (polygon_key, segment_index, x_proj, y_proj) if found.
         """
-        best_dist = float("inf")
-        best_result = None
-
-        for key, poly in self.poly_manager.polygons.items():
-            pts = poly["points"]
-            num_points = len(pts)
-            if num_points < 2:
-                continue
-            for i in range(num_points):
-                p1 = pts[i]
-                p2 = pts[(i + 1) % num_points]
-                dist_info = self._point_to_segment_distance(x, y, p1.x, p1.y, p2.x, p2.y)
-                dist, x_proj, y_proj, _ = dist_info
-
-                # Avalia distância em coords de canvas
-                cx_proj, cy_proj = self._to_canvas_coords(x_proj, y_proj)
-                cx_click, cy_click = self._to_canvas_coords(x, y)
-                canvas_dist = math.dist((cx_proj, cy_proj), (cx_click, cy_click))
-
-                if canvas_dist < best_dist and canvas_dist <= radius:
-                    best_dist = canvas_dist
-                    best_result = (key, i, x_proj, y_proj)
-        return best_result
+        pm = self.poly_manager
+        hit = pm.segment_index.nearest(pm.polygons, x, y, radius / self.scale)
+        if hit is None:
+            return None
+        return hit[:4]
 
     def _point_to_segment_distance(self, px, py, x1, y1, x2, y2):
         """
         Returns (dist, x_proj, y_proj, t) for distance from (px, py) to segment (x1,y1)-(x2,y2).
         """
-        dx = x2 - x1
-        dy = y2 - y1
-        if dx == 0 and dy == 0:
-            dist = math.dist((px, py), (x1, y1))
-            return dist, x1, y1, 0
-
-        t = ((px - x1) * dx + (py - y1) * dy) / float(dx * dx + dy * dy)
-        if t < 0:
-            t = 0
-        elif t > 1:
-            t = 1
-
-        x_proj = x1 + t * dx
-        y_proj = y1 + t * dy
-        dist = math.dist((px, py), (x_proj, y_proj))
-        return dist, x_proj, y_proj, t
\ No newline at end of file
+        return point_segment_distance(px, py, x1, y1, x2, y2)
@@ -4,73 +4,297 @@
 # --------------------------------------------------------------------------
 
 import math
-from PIL import Image, ImageTk
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageTk
+
+from .geometry import coords_to_canvas
 
 
 class WorkspaceDrawer:
     """Manages image and polygon rendering on the workspace canvas."""
 
-    def __init__(self, workspace):
+    # Reamostragem rápida para quadros intermediários (zoom pela roda, pan)
+    FAST_RESAMPLE = Image.Resampling.NEAREST
+    FULL_RESAMPLE = Image.Resampling.LANCZOS
+
+    def __init__(self, workspace, overlay_threshold=3000):
+        """
+        :param overlay_threshold: From this many vertices on, the polygons that
+            are not being edited are rasterized into one overlay image instead
+            of being drawn as canvas items (0 = always, None = never).
+        """
         self.workspace = workspace
         self.photo_image = None
+        self._frame_image = None
+        self._frame_key = None  # (caixa, tamanho, qualidade) do último quadro
+        self._full_render_id = None
+        self._drawn_image = None
+        self._drawn_view = None
+        self.overlay_threshold = overlay_threshold
+        self.overlay_photo = None
+        self._overlay_on = False  # o último draw_all usou o overlay?
+        self._overlay_key = None  # (vista, polígonos vivos) do overlay em cache
+        self._live_keys = frozenset()
 
-    def draw_all(self):
-        """Clears canvas and draws the image, polygons, and any temp segments."""
+    def draw_all(self, fast=False):
+        """
+        Clears canvas and draws the image, polygons, and any temp segments.
+        With 'fast', the image is resampled with a cheap filter; call
+        'request_full_render' to replace it by the high-quality frame later.
+        """
         ws = self.workspace
+        if not fast:
+            self._cancel_full_render()
+        pm = ws.poly_manager
         ws.canvas.delete("all")
-        self._draw_image()
-        self._draw_polygons()
-        self._draw_temp_segment()
+        self._draw_image(fast)
+        self._overlay_on = self._use_overlay()
+        if self._overlay_on:
+            if pm.all_dirty or ws.image is not self._drawn_image or not pm.dirty <= self._live_keys:
+                self._overlay_key = None
+            self._draw_layers()
+        else:
+            self._overlay_key = None
+            self._draw_polygons()
+            self._draw_temp_segment()
+        pm.dirty.clear()
+        pm.all_dirty = False
+        self._drawn_image = ws.image
+        self._drawn_view = self._view_key()
 
         # Trigger refresh in main app
         ws.event_generate("<<RefreshPolygonList>>", when="tail")
 
-    def _draw_image(self):
-        """Draws the main image onto the canvas with current offset and scale."""
+    def refresh(self):
+        """
+        Redraws only the polygons marked dirty by WorkspacePolygons, plus the
+        selection and temp overlays; the image layer and the other polygons are
+        left untouched. Falls back to draw_all when the view changed.
+        """
+        ws = self.workspace
+        pm = ws.poly_manager
+        if (
+            pm.all_dirty
+            or ws.image is not self._drawn_image
+            or self._view_key() != self._drawn_view
+        ):
+            self.draw_all()
+            return
+        canvas = ws.canvas
+        if self._overlay_on != self._use_overlay():
+            self.draw_all()
+            return
+        if self._overlay_on and (
+            self._current_live_keys() != self._live_keys or not pm.dirty <= self._live_keys
+        ):
+            # Um polígono rasterizado mudou (ou outro passou a ser editado):
+            # refaz o overlay e os itens vivos; a imagem fica como está.
+            if not pm.dirty <= self._live_keys:
+                self._overlay_key = None
+            canvas.delete("overlay", "polygon", "selection", "temp")
+            self._draw_layers()
+            pm.dirty.clear()
+            ws.event_generate("<<RefreshPolygonList>>", when="tail")
+            return
+        for key in pm.dirty:
+            canvas.delete(self._polygon_tag(key))
+            poly = pm.polygons.get(key)
+            if poly is not None:
+                self._draw_polygon(key, poly)
+        pm.dirty.clear()
+        canvas.delete("selection")
+        self._draw_selection()
+        canvas.delete("temp")
+        self._draw_temp_segment()
+
+        ws.event_generate("<<RefreshPolygonList>>", when="tail")
+
+    def _view_key(self):
+        ws = self.workspace
+        return (
+            ws.scale,
+            ws.offset_x,
+            ws.offset_y,
+            ws.canvas.winfo_width(),
+            ws.canvas.winfo_height(),
+        )
+
+    def request_full_render(self, delay_ms=150):
+        """(Re)schedules a high-quality draw_all once 'delay_ms' pass without new requests."""
+        self._cancel_full_render()
+        self._full_render_id = self.workspace.canvas.after(delay_ms, self._full_render)
+
+    def _full_render(self):
+        self._full_render_id = None
+        self.draw_all()
+
+    def _cancel_full_render(self):
+        if self._full_render_id is not None:
+            self.workspace.canvas.after_cancel(self._full_render_id)
+            self._full_render_id = None
+
+    def _visible_box(self):
+        """
+        Part of the image visible on the canvas: (box, size, position), 'box'
+        in image pixels, 'size' the rendered size and 'position' its canvas
+        corner. Returns None when nothing is visible.
+        """
+        ws = self.workspace
+        scale = ws.scale
+        cw = ws.canvas.winfo_width()
+        ch = ws.canvas.winfo_height()
+        x0 = max(0, math.floor(-ws.offset_x / scale))
+        y0 = max(0, math.floor(-ws.offset_y / scale))
+        x1 = min(ws.base_width, math.ceil((cw - ws.offset_x) / scale))
+        y1 = min(ws.base_height, math.ceil((ch - ws.offset_y) / scale))
+        if x1 <= x0 or y1 <= y0:
+            return None
+        size = (max(1, round((x1 - x0) * scale)), max(1, round((y1 - y0) * scale)))
+        position = (ws.offset_x + x0 * scale, ws.offset_y + y0 * scale)
+        return (x0, y0, x1, y1), size, position
+
+    def _draw_image(self, fast=False):
+        """
+        Draws the visible part of the image onto the canvas with current
+        offset and scale. Only the viewport is resampled, and the last frame
+        is reused while image, viewport and quality stay the same (e.g. while
+        dragging points).
+        """
         ws = self.workspace
         if not ws.image:
             return
-        w = int(ws.base_width * ws.scale)
-        h = int(ws.base_height * ws.scale)
-        if w < 1:
-            w = 1
-        if h < 1:
-            h = 1
+        visible = self._visible_box()
+        if visible is None:
+            return
+        box, size, position = visible
+
+        key = (box, size, fast)
+        if ws.image is not self._frame_image or key != self._frame_key:
+            resample = self.FAST_RESAMPLE if fast else self.FULL_RESAMPLE
+            resized_img = ws.image.resize(size, resample, box=box)
+            self.photo_image = ImageTk.PhotoImage(resized_img)
+            self._frame_image = ws.image
+            self._frame_key = key
+        ws.canvas.create_image(position[0], position[1], image=self.photo_image, anchor="nw")
+
+    def _use_overlay(self):
+        threshold = self.overlay_threshold
+        if threshold is None:
+            return False
+        polygons = self.workspace.poly_manager.polygons
+        return sum(len(poly) for poly in polygons.values()) >= threshold
 
-        resized_img = ws.image.resize((w, h), Image.Resampling.LANCZOS)
-        self.photo_image = ImageTk.PhotoImage(resized_img)
-        ws.canvas.create_image(ws.offset_x, ws.offset_y, image=self.photo_image, anchor="nw")
+    def _current_live_keys(self):
+        """Polygons kept as canvas items in overlay mode: the active and the selected ones."""
+        pm = self.workspace.poly_manager
+        live = set(pm.selection)
+        if pm.active_key is not None:
+            live.add(pm.active_key)
+        return frozenset(key for key in live if key in pm.polygons)
+
+    def _draw_layers(self):
+        """
+        Overlay mode: one RGBA image with every polygon that is not being
+        edited, then the live polygons, the selection and temp items on top.
+        """
+        ws = self.workspace
+        pm = ws.poly_manager
+        live = self._current_live_keys()
+        key = (self._view_key(), live)
+        if key != self._overlay_key:
+            self.overlay_photo = ImageTk.PhotoImage(self._render_overlay(live))
+            self._overlay_key = key
+        ws.canvas.create_image(0, 0, image=self.overlay_photo, anchor="nw", tags="overlay")
+        self._live_keys = live
+        for key in live:
+            self._draw_polygon(key, pm.polygons[key])
+        self._draw_selection()
+        self._draw_temp_segment()
+
+    def _render_overlay(self, exclude):
+        """
+        Rasterizes the polygons not in 'exclude' at the current view into a
+        transparent canvas-sized RGBA image, with the same look as the canvas
+        items (2 px outline, 3 px radius vertices).
+        """
+        ws = self.workspace
+        width = max(1, ws.canvas.winfo_width())
+        height = max(1, ws.canvas.winfo_height())
+        layer = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(layer)
+        for key, poly in ws.poly_manager.polygons.items():
+            if key in exclude or len(poly) == 0:
+                continue
+            canvas_pts = coords_to_canvas(poly.coords, ws.scale, ws.offset_x, ws.offset_y)
+            lo = canvas_pts.min(axis=0)
+            hi = canvas_pts.max(axis=0)
+            if hi[0] < -3 or hi[1] < -3 or lo[0] > width + 3 or lo[1] > height + 3:
+                continue
+            color = poly.color
+            if len(canvas_pts) >= 2:
+                line = canvas_pts.tolist()
+                if poly.is_closed:
+                    line.append(line[0])
+                draw.line([tuple(p) for p in line], fill=color, width=2)
+            for cx, cy in canvas_pts.tolist():
+                draw.ellipse((cx - 3, cy - 3, cx + 3, cy + 3), fill=color)
+        return layer
 
     def _draw_polygons(self):
         """Draws all polygons from the polygon manager."""
+        for key, poly in self.workspace.poly_manager.polygons.items():
+            self._draw_polygon(key, poly)
+        self._draw_selection()
+
+    @staticmethod
+    def _polygon_tag(key):
+        return f"poly:{key}"
+
+    def _draw_polygon(self, key, poly):
+        """Draws one polygon; its items are tagged so 'refresh' can replace them."""
+        ws = self.workspace
+        if len(poly) == 0:
+            return
+        color = poly.color
+        tags = ("polygon", self._polygon_tag(key))
+        # Converte todos os vértices para coordenadas de canvas de uma vez
+        canvas_pts = coords_to_canvas(poly.coords, ws.scale, ws.offset_x, ws.offset_y)
+
+        if len(canvas_pts) >= 2:
+            # Uma única polyline por polígono; se fechado, repete o primeiro ponto no fim
+            if poly.is_closed:
+                canvas_pts_line = np.vstack((canvas_pts, canvas_pts[:1]))
+            else:
+                canvas_pts_line = canvas_pts
+            ws.canvas.create_line(
+                *canvas_pts_line.ravel().tolist(), fill=color, width=2, tags=tags
+            )
+
+        # Points (small circles)
+        for cx, cy in canvas_pts.tolist():
+            ws.canvas.create_oval(
+                cx - 3, cy - 3, cx + 3, cy + 3, fill=color, outline="", tags=tags
+            )
+
+    def _draw_selection(self):
+        """Rings around the selected vertices (selection mode)."""
         ws = self.workspace
-        for _, poly in ws.poly_manager.polygons.items():
-            pts = poly["points"]
-            color = poly["color"]
-            is_closed = poly["is_closed"]
-
-            if len(pts) >= 2:
-                for i in range(len(pts) - 1):
-                    p1, p2 = pts[i], pts[i + 1]
-                    x1, y1 = ws._to_canvas_coords(p1.x, p1.y)
-                    x2, y2 = ws._to_canvas_coords(p2.x, p2.y)
-                    ws.canvas.create_line(x1, y1, x2, y2, fill=color, width=2)
-                
-                # Desenha a linha de fechamento se o polígono estiver fechado e tiver pelo menos 2 pontos
-                if is_closed and len(pts) >= 2:
-                    p1, p2 = pts[-1], pts[0] # Último e primeiro ponto
-                    x1, y1 = ws._to_canvas_coords(p1.x, p1.y)
-                    x2, y2 = ws._to_canvas_coords(p2.x, p2.y)
-                    ws.canvas.create_line(x1, y1, x2, y2, fill=color, width=2)
-
-            # Points (small circles)
-            for pt in pts:
-                cx, cy = ws._to_canvas_coords(pt.x, pt.y)
-                ws.canvas.create_oval(cx - 3, cy - 3, cx + 3, cy + 3, fill=color, outline="")
+        pm = ws.poly_manager
+        for key, idx in pm.selection.items():
+            canvas_pts = coords_to_canvas(
+                pm.polygons[key].coords[idx], ws.scale, ws.offset_x, ws.offset_y
+            )
+            for cx, cy in canvas_pts.tolist():
+                ws.canvas.create_oval(
+                    cx - 5, cy - 5, cx + 5, cy + 5, outline="blue", width=2, tags="selection"
+                )
 
     def _draw_temp_segment(self):
         """Draws the temporary segment while creating a bounding box in box mode."""
         ws = self.workspace
         if ws.is_drawing_segment and ws.temp_point:
             x1, y1 = ws._to_canvas_coords(ws.temp_point.x, ws.temp_point.y)
-            ws.canvas.create_oval(x1 - 3, y1 - 3, x1 + 3, y1 + 3, fill=ws.line_color, outline="")
+            ws.canvas.create_oval(
+                x1 - 3, y1 - 3, x1 + 3, y1 + 3, fill=ws.line_color, outline="", tags="temp"
+            )
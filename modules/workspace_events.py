@@ -1,15 +1,40 @@
 import math
 from tkinter import messagebox, simpledialog
 
+import numpy as np
+
+from .event_dispatch import EventDispatcher
+from .geometry import coords_to_image
+from .selection import select_in_lasso, select_in_rect
+from .spatial_index import SnapIndex
+
+# Distância máxima (pixels da imagem) para o ponto arrastado grudar em outro vértice
+SNAP_DISTANCE = 10
+
+# Janela (ms) em que os passos da roda são somados num único zoom, e a espera
+# sem novos passos antes do redesenho em alta qualidade
+WHEEL_WINDOW_MS = 30
+FULL_RENDER_DELAY_MS = 150
+
 
 class WorkspaceEvents:
     """Manages the event callbacks and bindings for the workspace."""
 
     def __init__(self, workspace):
         self.workspace = workspace
+        self.dispatcher = None
         self.dragged_point = None
+        self.dragged_poly_key = None
+        self.dragged_pt_idx = None
         self.drag_start_x = None
         self.drag_start_y = None
+        self.drag_origin = None
+        self.snap_index = None
+        # Polígono criado pelo último clique (o 1º clique de um duplo clique cria um ponto solto)
+        self.click_created_key = None
+        self.wheel_steps = 0
+        self.wheel_pivot = (0, 0)
+        self.wheel_after_id = None
         self.is_panning = False
         self.pan_start_x = 0
         self.pan_start_y = 0
@@ -19,25 +44,31 @@ class WorkspaceEvents:
         self.sel_rect_id = None
         self.sel_rect_start_x = None
         self.sel_rect_start_y = None
+        self.lasso_points = None  # caminho do laço (coordenadas do canvas) com Shift
+        self.group_drag_start = None
+        self.group_drag_total = (0.0, 0.0)
 
     def bind_all(self):
-        """Binds all events to the workspace canvas."""
+        """
+        Binds all events to the workspace canvas, through an EventDispatcher:
+        motion events are coalesced to the latest position once per frame.
+        """
         ws = self.workspace
-        c = ws.canvas
-
-        c.bind("<Configure>", self._on_configure)
-        c.bind("<Button-1>", self._on_left_click)
-        c.bind("<B1-Motion>", self._on_left_drag)
-        c.bind("<ButtonRelease-1>", self._on_left_release)
-        c.bind("<Button-3>", self._on_right_click)
-        c.bind("<B3-Motion>", self._on_pan_drag)
-        c.bind("<ButtonRelease-3>", self._on_pan_release)
-        c.bind("<Double-Button-1>", self._on_left_double_click)
-
-        c.bind("<MouseWheel>", self._on_mouse_wheel)
-        c.bind("<Button-4>", self._on_mouse_wheel)
-        c.bind("<Button-5>", self._on_mouse_wheel)
-        c.bind("<Motion>", self._on_mouse_move)
+        d = self.dispatcher = EventDispatcher(ws.canvas)
+
+        d.bind("<Configure>", self._on_configure, coalesce=True)
+        d.bind("<Button-1>", self._on_left_click)
+        d.bind("<B1-Motion>", self._on_left_drag, coalesce=True)
+        d.bind("<ButtonRelease-1>", self._on_left_release)
+        d.bind("<Button-3>", self._on_right_click)
+        d.bind("<B3-Motion>", self._on_pan_drag, coalesce=True)
+        d.bind("<ButtonRelease-3>", self._on_pan_release)
+        d.bind("<Double-Button-1>", self._on_left_double_click)
+
+        d.bind("<MouseWheel>", self._on_mouse_wheel)
+        d.bind("<Button-4>", self._on_mouse_wheel)
+        d.bind("<Button-5>", self._on_mouse_wheel)
+        d.bind("<Motion>", self._on_mouse_move, coalesce=True)
 
     def _on_configure(self, event):
         """Redraws on canvas resize."""
@@ -45,15 +76,34 @@ class WorkspaceEvents:
 
     def _on_left_click(self, event):
         ws = self.workspace
+        # Os atalhos de seleção (Delete, e) ignoram teclas vindas da lista de
+        # arquivos ou de campos de texto; o clique devolve o foco ao canvas
+        ws.canvas.focus_set()
         cx, cy = ws._to_image_coords(event.x, event.y)
+        self.click_created_key = None
 
         # -----------------------------
         # Novo modo: SELECTION
         # -----------------------------
         if ws.draw_mode == "selection":
+            pm = ws.poly_manager
+            # Clique sobre um vértice selecionado: arrasta a seleção inteira
+            _, poly_key, pt_idx = ws._find_point_near(cx, cy)
+            if poly_key in pm.selection and pt_idx in pm.selection[poly_key]:
+                self.group_drag_start = (cx, cy)
+                self.group_drag_total = (0.0, 0.0)
+                return
+
             self.is_selecting_area = True
             self.sel_rect_start_x = event.x
             self.sel_rect_start_y = event.y
+            if event.state & 0x0001:  # Shift: laço à mão livre
+                self.lasso_points = [(event.x, event.y)]
+                self.sel_rect_id = ws.canvas.create_line(
+                    event.x, event.y, event.x, event.y, fill="blue", dash=(2, 2)
+                )
+                return
+            self.lasso_points = None
             self.sel_rect_id = ws.canvas.create_rectangle(
                 self.sel_rect_start_x,
                 self.sel_rect_start_y,
@@ -69,15 +119,6 @@ class WorkspaceEvents:
         # -----------------------------
         if ws.draw_mode == "rect":
             color = ws.line_color
-            if color in ws.poly_manager.polygons:
-                if ws._check_near_point(cx, cy) is None:
-                    return
-                else:
-                    new_color = self.get_unused_color(ws)
-                    if new_color is None:
-                        return
-                    ws.set_line_color(new_color)
-                    color = new_color
             if not ws.is_drawing_segment:
                 ws.temp_point = ws.PointDataClass(cx, cy)
                 ws.is_drawing_segment = True
@@ -87,7 +128,7 @@ class WorkspaceEvents:
                 ws.poly_manager.create_box_polygon(p1, p2, color)
                 ws.is_drawing_segment = False
                 ws.temp_point = None
-            ws.drawer.draw_all()
+            ws.drawer.refresh()
             return
 
         # -----------------------------
@@ -96,32 +137,53 @@ class WorkspaceEvents:
         found_point, poly_key, pt_idx = ws._find_point_near(cx, cy)
         if found_point:
             self.dragged_point = found_point
+            self.dragged_poly_key = poly_key
+            self.dragged_pt_idx = pt_idx
             self.drag_start_x = cx
             self.drag_start_y = cy
+            self.drag_origin = (found_point.x, found_point.y)
+            self.snap_index = None  # construído no primeiro movimento (um clique simples não paga)
+            ws.poly_manager.set_active(poly_key)
             return
 
         color = ws.line_color
         if ws.draw_mode == "free":
-            poly = ws.poly_manager.get_polygon_by_color(color)
-            if poly:
-                if not poly["is_closed"]:
-                    poly["points"].append(ws.PointDataClass(cx, cy))
-                    ws.drawer.draw_all()
-                    return
-            else:
-                ws.poly_manager.create_or_append_free_polygon(cx, cy, color)
-                ws.drawer.draw_all()
-                return
+            pm = ws.poly_manager
+            poly = pm.get_active_polygon()
+            if poly and not poly.is_closed:
+                pm.append_point(pm.active_key, cx, cy)
+            elif poly is None or ws.is_continuous_free_mode:
+                # Sem polígono aberto: começa um novo (sem limite por cor)
+                self.click_created_key = pm.create_or_append_free_polygon(cx, cy, color)
+            ws.drawer.refresh()
+            return
 
         if ws.draw_mode == "box":
             self._handle_box_click(cx, cy, color)
 
-        ws.drawer.draw_all()
+        ws.drawer.refresh()
 
     def _on_left_drag(self, event):
         ws = self.workspace
 
         # Se estamos no modo selection e arrastando:
+        if self.group_drag_start is not None:
+            cx, cy = ws._to_image_coords(event.x, event.y)
+            sx, sy = self.group_drag_start
+            tx, ty = self.group_drag_total
+            # Aplica só o incremento desde o último movimento
+            ws.poly_manager.translate_vertices(
+                ws.poly_manager.selection, cx - sx - tx, cy - sy - ty
+            )
+            self.group_drag_total = (cx - sx, cy - sy)
+            ws.drawer.refresh()
+            return
+
+        if ws.draw_mode == "selection" and self.is_selecting_area and self.lasso_points is not None:
+            self.lasso_points.append((event.x, event.y))
+            ws.canvas.coords(self.sel_rect_id, *np.ravel(self.lasso_points + self.lasso_points[:1]).tolist())
+            return
+
         if ws.draw_mode == "selection" and self.is_selecting_area and self.sel_rect_id:
             ws.canvas.coords(
                 self.sel_rect_id,
@@ -146,15 +208,19 @@ class WorkspaceEvents:
         if cy > ws.image.height:
             cy = ws.image.height
 
-        self.dragged_point.x = cx
-        self.dragged_point.y = cy
+        # Mesmo raio de antes: 20 px no canvas, limitado a SNAP_DISTANCE na imagem
+        snap_radius = min(20 / ws.scale, SNAP_DISTANCE)
+        if self.snap_index is None:
+            self.snap_index = SnapIndex.from_polygons(
+                ws.poly_manager.polygons,
+                exclude=(self.dragged_poly_key, self.dragged_pt_idx),
+                cell_size=snap_radius,
+            )
+        snap_target = self.snap_index.nearest(cx, cy, snap_radius)
+        if snap_target:
+            cx, cy = snap_target[0], snap_target[1]
 
-        snap_target = ws._check_near_point(cx, cy)
-        if snap_target and snap_target is not self.dragged_point:
-            dist = math.dist((snap_target.x, snap_target.y), (cx, cy))
-            if dist < 10:
-                self.dragged_point.x = snap_target.x
-                self.dragged_point.y = snap_target.y
+        ws.poly_manager.move_point(self.dragged_poly_key, self.dragged_pt_idx, cx, cy)
 
         ws.balloon_zoom.update_zoom_view(
             ws.image,
@@ -164,77 +230,51 @@ class WorkspaceEvents:
             mouse_x_root=ws.canvas.winfo_pointerx(),
             mouse_y_root=ws.canvas.winfo_pointery(),
         )
-        ws.drawer.draw_all()
+        ws.drawer.refresh()
 
     def _on_left_release(self, event):
         ws = self.workspace
 
-        # Finaliza seleção se estivermos no modo selection
+        # Arrasto do grupo de vértices selecionados
+        if self.group_drag_start is not None:
+            self.group_drag_start = None
+            ws.poly_manager.finish_translate(ws.poly_manager.selection, *self.group_drag_total)
+            ws.drawer.refresh()
+            return
+
+        # Finaliza seleção (retângulo ou laço) se estivermos no modo selection
         if ws.draw_mode == "selection" and self.is_selecting_area and self.sel_rect_id:
-            x1 = self.sel_rect_start_x
-            y1 = self.sel_rect_start_y
-            x2 = event.x
-            y2 = event.y
-            # Remove o retângulo de seleção do canvas
+            # Remove o retângulo/laço de seleção do canvas
             ws.canvas.delete(self.sel_rect_id)
             self.sel_rect_id = None
             self.is_selecting_area = False
+            pm = ws.poly_manager
 
-            # Ordena as coordenadas do canvas
-            min_cx, max_cx = sorted([x1, x2])
-            min_cy, max_cy = sorted([y1, y2])
-
-            # Converte do espaço do canvas para as coordenadas da imagem
-            ix1, iy1 = ws._to_image_coords(min_cx, min_cy)
-            ix2, iy2 = ws._to_image_coords(max_cx, max_cy)
-
-            # Obtém o polígono ativo com base na cor atual
-            active_poly = ws.poly_manager.get_polygon_by_color(ws.line_color)
-            if not active_poly:
-                messagebox.showinfo("Seleção", "Nenhum polígono ativo para seleção.")
-                return
-
-            # Coleta os pontos que estão dentro da área de seleção
-            selected_points = []
-            for pt in active_poly["points"]:
-                if ix1 <= pt.x <= ix2 and iy1 <= pt.y <= iy2:
-                    selected_points.append(pt)
-
-            if not selected_points:
-                # Se nada for selecionado, encerra.
-                return
+            if self.lasso_points is not None:
+                # Converte do espaço do canvas para as coordenadas da imagem
+                lasso = coords_to_image(self.lasso_points, ws.scale, ws.offset_x, ws.offset_y)
+                self.lasso_points = None
+                selection = select_in_lasso(pm.polygons, lasso)
+            else:
+                ix1, iy1 = ws._to_image_coords(self.sel_rect_start_x, self.sel_rect_start_y)
+                ix2, iy2 = ws._to_image_coords(event.x, event.y)
+                selection = select_in_rect(pm.polygons, ix1, iy1, ix2, iy2)
 
-            # Ordenação circular (apenas para manter uma sequência coerente)
-            if len(selected_points) > 1:
-                cx = sum(pt.x for pt in selected_points) / len(selected_points)
-                cy = sum(pt.y for pt in selected_points) / len(selected_points)
-                selected_points.sort(key=lambda pt: math.atan2(pt.y - cy, pt.x - cx))
-
-            # Cria cópias dos pontos selecionados nas mesmas coordenadas
-            new_points = []
-            for old_pt in selected_points:
-                new_points.append(ws.PointDataClass(old_pt.x, old_pt.y))
-
-            # Pergunta a classe e cria nova polyline fechada
-            class_id = ws.prompt_class_selection()
-            if class_id is not None:
-                new_color = self.get_unused_color(ws)
-                if new_color:
-                    new_poly = {
-                        "points": new_points,
-                        "color": new_color,
-                        "class_id": class_id,
-                        "is_closed": True, 
-                    }
-                    ws.poly_manager.polygons[new_color] = new_poly
-                    ws.drawer.draw_all()
+            pm.set_selection(selection)
+            ws.drawer.refresh()
             return
 
         # Se estávamos arrastando ponto, encerramos arrasto
         if self.dragged_point:
+            ws.poly_manager.finish_move(
+                self.dragged_poly_key, self.dragged_pt_idx, *self.drag_origin
+            )
             self.dragged_point = None
+            self.dragged_poly_key = None
+            self.dragged_pt_idx = None
+            self.snap_index = None
             self.workspace.balloon_zoom.hide_zoom_view()
-            self.workspace.drawer.draw_all()
+            self.workspace.drawer.refresh()
 
     def _on_right_click(self, event):
         ws = self.workspace
@@ -248,7 +288,7 @@ class WorkspaceEvents:
             )
             if ans:
                 pm.delete_point(polygon_key, pt_idx)
-                ws.drawer.draw_all()
+                ws.drawer.refresh()
             return
 
         self.is_panning = True
@@ -265,66 +305,96 @@ class WorkspaceEvents:
         ws.offset_y += dy
         self.pan_start_x = event.x
         self.pan_start_y = event.y
-        ws.drawer.draw_all()
+        ws.drawer.draw_all(fast=True)
 
     def _on_pan_release(self, event):
+        if self.is_panning:
+            self.workspace.drawer.draw_all()
         self.is_panning = False
 
     def _on_left_double_click(self, event):
         ws = self.workspace
         pm = ws.poly_manager
-        color = ws.line_color
-        poly = pm.get_polygon_by_color(color)
-        if not poly:
-            return
-
-        poly_data = poly
         cx, cy = ws._to_image_coords(event.x, event.y)
-        points = poly_data["points"]
-        if not points:
-            return
 
-        first_pt = points[0]
-        dist_to_first = math.dist((first_pt.x, first_pt.y), (cx, cy))
-
-        # Fecha polígono se estiver aberto e o clique duplo for próximo do primeiro ponto
-        if not poly_data["is_closed"] and dist_to_first < 20 and len(points) >= 2:
-            if points[-1] != first_pt:
-                points.append(first_pt)
-            poly_data["is_closed"] = True
-            class_id = ws.prompt_class_selection()
-            poly_data["class_id"] = class_id if class_id else "0"
-            ws.drawer.draw_all()
+        # O primeiro clique do duplo clique pode ter iniciado um polígono de um ponto só
+        stray_key = self.click_created_key
+        self.click_created_key = None
+        stray = pm.polygons.get(stray_key)
+        if stray is not None and len(stray) == 1:
+            pm.revert_last_edit()
+
+        poly_data = pm.get_active_polygon()
+        if poly_data is not None and not poly_data.is_closed:
+            dist_to_first = math.dist(poly_data.coords[0], (cx, cy))
+
+            # Fecha polígono se o clique duplo for próximo do primeiro ponto
+            if dist_to_first < 20 and len(poly_data) >= 2:
+                pm.close_polygon(pm.active_key)
+                ws.drawer.refresh()
             return
 
-        # Se o polígono está fechado, podemos inserir ponto no segmento
-        if poly_data["is_closed"]:
+        # Sem polígono aberto: podemos inserir ponto no segmento de qualquer polígono
+        if poly_data is None or poly_data.is_closed:
             found_segment = ws._find_segment_near(cx, cy, radius=10)
             if found_segment:
                 seg_poly_key, seg_index, x_ins, y_ins = found_segment
                 pm.insert_point_on_segment(seg_poly_key, seg_index, x_ins, y_ins)
-                ws.drawer.draw_all()
+                pm.set_active(seg_poly_key)
+            ws.drawer.refresh()
 
     def _on_mouse_move(self, event):
-        self.workspace.canvas.config(cursor="tcross")
+        self.dispatcher.configure_once(self.workspace.canvas, cursor="tcross")
 
     def _on_mouse_wheel(self, event):
+        """
+        Accumulates wheel steps for WHEEL_WINDOW_MS and applies them as a single
+        zoom; the interim frame is rendered fast and the high-quality resample
+        happens once the wheel stops.
+        """
         ws = self.workspace
-        delta = 1
-        if hasattr(event, "delta"):
-            if event.delta < 0:
-                delta = -1
+        if event.num == 4:
+            steps = 1
         elif event.num == 5:
-            delta = -1
+            steps = -1
+        elif abs(event.delta) >= 120:
+            steps = event.delta / 120.0  # Windows: 120 por "clique" da roda
+        else:
+            steps = (event.delta > 0) - (event.delta < 0)  # macOS / trackpads
+        if not steps:
+            return
+
+        # Durante o arrasto de um ponto, a roda muda só a ampliação do balloon
+        if self.dragged_point:
+            ws.balloon_zoom.cycle_zoom(1 if steps > 0 else -1)
+            ws.balloon_zoom.update_zoom_view(
+                ws.image,
+                self.dragged_point.x,
+                self.dragged_point.y,
+                ws.scale,
+                mouse_x_root=ws.canvas.winfo_pointerx(),
+                mouse_y_root=ws.canvas.winfo_pointery(),
+            )
+            return
 
-        zoom_factor = 1.1
-        if delta < 0:
-            zoom_factor = 1 / zoom_factor
+        self.wheel_steps += steps
+        self.wheel_pivot = (event.x, event.y)
+        if self.wheel_after_id is None:
+            self.wheel_after_id = ws.canvas.after(WHEEL_WINDOW_MS, self._apply_wheel_zoom)
 
-        pivot_cx, pivot_cy = event.x, event.y
+    def _apply_wheel_zoom(self):
+        ws = self.workspace
+        self.wheel_after_id = None
+        steps = self.wheel_steps
+        self.wheel_steps = 0
+        if not steps:
+            return
+
+        zoom_factor = 1.1**steps
+
+        pivot_cx, pivot_cy = self.wheel_pivot
         px, py = ws._to_image_coords(pivot_cx, pivot_cy)
 
-        old_scale = ws.scale
         ws.scale *= zoom_factor
         if ws.scale < 0.1:
             ws.scale = 0.1
@@ -338,7 +408,8 @@ class WorkspaceEvents:
         zoom_val = int(round(ws.scale * 100))
         ws.parent.update_zoom_in_combo(zoom_val)
 
-        ws.drawer.draw_all()
+        ws.drawer.draw_all(fast=True)
+        ws.drawer.request_full_render(FULL_RENDER_DELAY_MS)
 
     def _handle_box_click(self, cx, cy, color):
         ws = self.workspace
@@ -360,12 +431,3 @@ class WorkspaceEvents:
             pm.create_box_polygon(p1, p2, color)
             ws.is_drawing_segment = False
             ws.temp_point = None
-
-    def get_unused_color(self, ws):
-        """Returns a color from the available palette that is not used in any polygon."""
-        available_colors = list(ws.parent.color_buttons.keys())
-        used_colors = set(ws.poly_manager.polygons.keys())
-        for col in available_colors:
-            if col not in used_colors:
-                return col
-        return None
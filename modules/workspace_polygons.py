@@ -4,55 +4,257 @@
 
 import math
 from tkinter import simpledialog
-from .shapes import PointData
+
+import numpy as np
+
+from .shapes import PolygonData
+from .edit_history import EditHistory
+from .spatial_index import SegmentIndex, VertexGrid
 
 
 class WorkspacePolygons:
-    """Manages polygon operations (creation, editing, storage), now tied to color."""
+    """
+    Manages polygon operations (creation, editing, storage).
+
+    Polygons are keyed by stable integer IDs ('new_key'); the color is only a
+    rendering attribute, so there is no limit on the number of polygons.
+    'active_key' is the polygon currently being drawn/edited.
+
+    Every edit is expressed as a small operation tuple and applied by 'apply_op':
+        ("create", key, color, class_id, is_closed, coords)
+        ("remove", key, color, class_id, is_closed, coords)
+        ("insert", key, idx, x, y)
+        ("delete", key, idx, x, y)
+        ("move",   key, idx, old_x, old_y, new_x, new_y)
+        ("set",    key, field, old_value, new_value)
+    where 'coords' is a flat sequence [x0, y0, x1, y1, ...] in image coordinates.
+    Polygons are stored as PolygonData (coordinates in one float array each).
+    Applied operations are appended to the edit journal, if one is attached,
+    and pushed to the undo history.
+    """
 
     def __init__(self, workspace):
         self.workspace = workspace
         self.polygons = {}
-        self.current_free_polygon = None
+        self.active_key = None
+        self._next_key = 1
         self.temp_free_point = None
+        self.journal = None
+        self.history = EditHistory()
+        self.vertex_index = VertexGrid()
+        self.segment_index = SegmentIndex()
+        # Vértices selecionados: {polygon_key: array de índices}
+        self.selection = {}
+        # Polígonos alterados desde o último desenho (o drawer redesenha só esses)
+        self.dirty = set()
+        self.all_dirty = True
+
+    # ----------------------------
+    # Operations
+    # ----------------------------
+
+    def apply_op(self, op):
+        """Applies one operation tuple to the polygons dict (no journaling)."""
+        kind, key = op[0], op[1]
+        self.dirty.add(key)
+        if kind != "set":
+            self.segment_index.invalidate(key)
+            if kind == "move":
+                self.vertex_index.move(key, op[2], op[5], op[6])
+            else:
+                self.vertex_index.invalidate(key)
+        if kind == "create":
+            _, _, color, class_id, is_closed, coords = op
+            self.polygons[key] = PolygonData(coords, color, class_id, is_closed)
+            if isinstance(key, int) and key >= self._next_key:
+                self._next_key = key + 1
+        elif kind == "remove":
+            del self.polygons[key]
+        elif kind == "insert":
+            _, _, idx, x, y = op
+            self.polygons[key].insert_point(idx, x, y)
+        elif kind == "delete":
+            self.polygons[key].delete_point(op[2])
+        elif kind == "move":
+            self.polygons[key].set_point(op[2], op[5], op[6])
+        elif kind == "set":
+            setattr(self.polygons[key], op[2], op[4])
+        else:
+            raise ValueError(f"Unknown polygon operation: {kind}")
+
+    def _commit(self, *ops):
+        """Applies a group of operations and records them."""
+        # Índices selecionados deixam de valer após qualquer edição
+        self.selection = {}
+        self._record_snapshot_if_needed()
+        for op in ops:
+            self.apply_op(op)
+        self._record(ops)
+
+    def _record(self, ops, history=True):
+        if self.journal is not None:
+            self.journal.append(ops)
+        if history:
+            self.history.push(ops)
 
-    def get_polygon_by_color(self, color):
+    def undo(self):
+        """Reverts the last edit. Returns True if something was undone."""
+        return self._apply_history(self.history.undo())
+
+    def redo(self):
+        """Re-applies the last undone edit. Returns True if something was redone."""
+        return self._apply_history(self.history.redo())
+
+    def revert_last_edit(self):
+        """Undoes the last edit without keeping it for redo (e.g. a stray click)."""
+        if self.undo():
+            self.history.drop_redo()
+
+    def _apply_history(self, ops):
+        if not ops:
+            return False
+        self.selection = {}
+        self._record_snapshot_if_needed()
+        for op in ops:
+            self.apply_op(op)
+        self._record(ops, history=False)
+        if self.active_key not in self.polygons:
+            self.active_key = None
+        return True
+
+    def _record_snapshot_if_needed(self):
+        """A fresh journal starts with the state the following ops apply to."""
+        if self.journal is not None and self.journal.is_empty():
+            self.journal.compact(self.snapshot())
+
+    def _create_op(self, key):
+        poly = self.polygons[key]
+        return ("create", key, poly.color, poly.class_id, poly.is_closed, poly.flat_coords())
+
+    def snapshot(self):
+        """Returns the current state as a list of 'create' operations."""
+        return [self._create_op(key) for key in self.polygons]
+
+    def restore_snapshot(self, ops):
+        """Replaces all polygons by the given 'create' operations."""
+        self.polygons.clear()
+        self.vertex_index.clear()
+        self.segment_index.clear()
+        self.selection = {}
+        self.all_dirty = True
+        for op in ops:
+            self.apply_op(op)
+
+    def replay_journal(self):
+        """
+        Re-applies the operations stored in the attached journal (edits that
+        were never saved to a label file). Returns True if anything was replayed.
+        """
+        if self.journal is None:
+            return False
+        ops = self.journal.read()
+        if not ops:
+            return False
+        for op in ops:
+            if op[0] == "snapshot":
+                self.restore_snapshot(op[1])
+            else:
+                try:
+                    self.apply_op(op)
+                except (KeyError, IndexError):
+                    continue
+        self.active_key = None
+        return True
+
+    # ----------------------------
+    # Queries
+    # ----------------------------
+
+    def new_key(self):
+        """Returns a new, never used polygon ID."""
+        key = self._next_key
+        self._next_key += 1
+        return key
+
+    def get_active_polygon(self):
+        """Returns the polygon being drawn/edited, or None."""
+        return self.polygons.get(self.active_key)
+
+    def set_active(self, key):
+        """Makes 'key' the polygon being drawn/edited (None for no polygon)."""
+        self.active_key = key if key in self.polygons else None
+
+    # ----------------------------
+    # Edits
+    # ----------------------------
+
+    def add_polygon(self, points, color, class_id="", is_closed=True, key=None, record=True):
         """
-        Returns the polygon dict associated with the given color, or None if it doesn't exist yet.
+        Adds a polygon from a list of (x, y) tuples or an (n, 2) array and returns its key.
+        'record=False' is used when loading labels (the file is the saved state).
         """
-        return self.polygons.get(color)
+        if key is None:
+            key = self.new_key()
+        coords = np.array(points, dtype=np.float64).ravel()
+        op = ("create", key, color, class_id, is_closed, coords)
+        if record:
+            self._commit(op)
+        else:
+            self.apply_op(op)
+        return key
 
     def create_or_append_free_polygon(self, cx, cy, color):
         """
-        Creates or appends a point to the polygon of 'color' in free mode.
-        If it doesn't exist yet, starts a new polygon.
-        """
-        if color not in self.polygons:
-            p = PointData(cx, cy)
-            self.polygons[color] = {  # Modificação 1: Usa a cor como chave do polígono.
-                "points": [p],
-                "color": color,
-                "class_id": "",
-                "is_closed": False,
-            }
-            self.current_free_polygon = self.polygons[color]
+        Appends a point to the active polygon in free mode, closing it when the
+        point is near the first one. If there is no open active polygon, starts
+        a new one with the given color. Returns the key of the polygon.
+        """
+        poly = self.get_active_polygon()
+        if poly is None or poly.is_closed:
+            key = self.new_key()
+            self._commit(("create", key, color, "", False, np.array([cx, cy], dtype=np.float64)))
+            self.active_key = key
+            return key
+
+        key = self.active_key
+        dist = math.dist(poly.coords[0], (cx, cy))
+        if dist < 10:
+            self.close_polygon(key)
         else:
-            poly = self.polygons[color]
-            if not poly["is_closed"]:
-                first_pt = poly["points"][0]
-                dist = math.dist((first_pt.x, first_pt.y), (cx, cy))
-                if dist < 10:
-                    if poly["points"][-1] != first_pt:
-                        poly["points"].append(first_pt)
-                    poly["is_closed"] = True
-                    class_id = self.workspace.prompt_class_selection()
-                    poly["class_id"] = class_id if class_id else "0"
-                else:
-                    poly["points"].append(PointData(cx, cy))
+            self.append_point(key, cx, cy)
+        return key
+
+    def append_point(self, key, x, y):
+        """Appends a point to the end of the polygon."""
+        if key not in self.polygons:
+            return
+        idx = len(self.polygons[key])
+        self._commit(("insert", key, idx, x, y))
+
+    def close_polygon(self, key):
+        """
+        Closes the polygon and asks for its class.
+        The closing edge is implicit (last -> first point); no duplicate vertex is added.
+        """
+        poly = self.polygons.get(key)
+        if not poly or poly.is_closed:
+            return
+        class_id = self.workspace.prompt_class_selection()
+        self._commit(
+            ("set", key, "is_closed", False, True),
+            ("set", key, "class_id", poly.class_id, class_id if class_id else "0"),
+        )
+
+    def set_class(self, key, class_id):
+        """Changes the class id of the polygon."""
+        poly = self.polygons.get(key)
+        if not poly or poly.class_id == class_id:
+            return
+        self._commit(("set", key, "class_id", poly.class_id, class_id))
 
     def create_box_polygon(self, p1, p2, color):
         """
-        Creates a rectangular polygon from two diagonal points.
+        Creates a rectangular polygon from two diagonal points and returns its key.
         """
         x1, y1 = p1.x, p1.y
         x2, y2 = p2.x, p2.y
@@ -61,55 +263,178 @@ class WorkspacePolygons:
         min_x, max_x = sorted([x1, x2])
         min_y, max_y = sorted([y1, y2])
 
-        # Define os quatro pontos do retângulo
-        rect_points = [
-            PointData(min_x, min_y),
-            PointData(max_x, min_y),
-            PointData(max_x, max_y),
-            PointData(min_x, max_y),
-        ]
-
-        self.polygons[color] = {  # Modificação 2: Usa a cor como chave do polígono.
-            "points": rect_points,
-            "color": color,
-            "class_id": "",
-            "is_closed": True,
-        }
         class_id = self.workspace.prompt_class_selection()
-        self.polygons[color]["class_id"] = class_id if class_id else "0"
 
-    def delete_point(self, color, point_idx):
+        # Define os quatro pontos do retângulo
+        key = self.new_key()
+        self._commit(
+            (
+                "create",
+                key,
+                color,
+                class_id if class_id else "0",
+                True,
+                np.array(
+                    [min_x, min_y, max_x, min_y, max_x, max_y, min_x, max_y],
+                    dtype=np.float64,
+                ),
+            )
+        )
+        self.active_key = key
+        return key
+
+    def delete_point(self, key, point_idx):
         """
-        Deletes a point from the polygon of the given color.
+        Deletes a point from the polygon.
         If the polygon ends up too small, remove it entirely.
         """
-        if color not in self.polygons:
+        if key not in self.polygons:
             return
-        poly = self.polygons[color]
-        poly["points"].pop(point_idx)
+        poly = self.polygons[key]
+        x, y = poly.coords[point_idx]
+        ops = [("delete", key, point_idx, float(x), float(y))]
 
         # Se ficou menor que 2 pontos, apagamos o polígono
-        if len(poly["points"]) < 2:
-            del self.polygons[color]
+        if len(poly) - 1 < 2:
+            coords = np.delete(poly.coords, point_idx, axis=0).ravel()
+            ops.append(("remove", key, poly.color, poly.class_id, poly.is_closed, coords))
+        self._commit(*ops)
+        if self.active_key not in self.polygons:
+            self.active_key = None
 
-    def insert_point_on_segment(self, color, seg_index, x_ins, y_ins):
-        """Inserts a point at (x_ins, y_ins) in the polygon with that color."""
-        if color not in self.polygons:
+    def remove_polygon(self, key):
+        """Removes a whole polygon."""
+        poly = self.polygons.get(key)
+        if poly is None:
             return
-        poly = self.polygons[color]
-        new_pt = PointData(x_ins, y_ins)
-        poly["points"].insert(seg_index + 1, new_pt)
+        self._commit(
+            ("remove", key, poly.color, poly.class_id, poly.is_closed, poly.flat_coords())
+        )
+        if self.active_key == key:
+            self.active_key = None
 
-    def insert_point_after(self, color, point_index, x_new, y_new):
-        """Inserts a new point after 'point_index' in the polygon with that color."""
-        if color not in self.polygons:
+    def insert_point_on_segment(self, key, seg_index, x_ins, y_ins):
+        """Inserts a point at (x_ins, y_ins) after segment 'seg_index' of the polygon."""
+        if key not in self.polygons:
+            return
+        self._commit(("insert", key, seg_index + 1, x_ins, y_ins))
+
+    def insert_point_after(self, key, point_index, x_new, y_new):
+        """Inserts a new point after 'point_index' in the polygon."""
+        if key not in self.polygons:
+            return
+        self._commit(("insert", key, point_index + 1, x_new, y_new))
+
+    def move_point(self, key, point_idx, x, y):
+        """
+        Moves a point live (e.g. on every drag motion) without recording it.
+        Call 'finish_move' once the drag ends to record a single operation.
+        """
+        self.polygons[key].set_point(point_idx, x, y)
+        self.dirty.add(key)
+        self.vertex_index.move(key, point_idx, x, y)
+        self.segment_index.invalidate(key)
+
+    def finish_move(self, key, point_idx, old_x, old_y):
+        """Records the move of a point from (old_x, old_y) to its current position."""
+        poly = self.polygons.get(key)
+        if not poly or point_idx >= len(poly):
+            return
+        x, y = (float(v) for v in poly.coords[point_idx])
+        if (x, y) == (old_x, old_y):
             return
-        poly = self.polygons[color]
-        new_pt = PointData(x_new, y_new)
-        poly["points"].insert(point_index + 1, new_pt)
+        self._record_snapshot_if_needed()
+        self._record([("move", key, point_idx, old_x, old_y, x, y)])
+
+    # ----------------------------
+    # Batch edits on selected vertices ({polygon_key: index array})
+    # ----------------------------
+
+    def set_selection(self, selection):
+        """Replaces the vertex selection (e.g. from select_in_rect / select_in_lasso)."""
+        self.selection = {
+            key: np.asarray(idx, dtype=np.int64)
+            for key, idx in selection.items()
+            if key in self.polygons and len(idx)
+        }
+
+    def translate_vertices(self, selection, dx, dy):
+        """
+        Moves the selected vertices live by (dx, dy) without recording.
+        Call 'finish_translate' once the drag ends to record a single edit.
+        """
+        for key, idx in selection.items():
+            self.polygons[key].coords[idx] += (dx, dy)
+            self.dirty.add(key)
+            self.vertex_index.invalidate(key)
+            self.segment_index.invalidate(key)
+
+    def finish_translate(self, selection, dx, dy):
+        """Records the move by (dx, dy) of the selected vertices (already applied)."""
+        if not selection or (dx == 0 and dy == 0):
+            return
+        ops = []
+        for key, idx in selection.items():
+            coords = self.polygons[key].coords
+            for i, (x, y) in zip(idx.tolist(), coords[idx].tolist()):
+                ops.append(("move", key, i, x - dx, y - dy, x, y))
+        self._record_snapshot_if_needed()
+        self._record(ops)
+
+    def move_vertices(self, selection, dx, dy):
+        """Moves the selected vertices by (dx, dy) as one edit; the selection is kept."""
+        selection = dict(selection)
+        self.translate_vertices(selection, dx, dy)
+        self.finish_translate(selection, dx, dy)
+        self.selection = selection
+
+    def delete_vertices(self, selection):
+        """
+        Deletes the selected vertices as one edit. Polygons left with fewer
+        than 2 points are removed entirely.
+        """
+        ops = []
+        for key, idx in selection.items():
+            poly = self.polygons.get(key)
+            if poly is None:
+                continue
+            # Índices decrescentes: cada remoção não desloca as seguintes
+            for i in sorted(set(idx.tolist()), reverse=True):
+                x, y = poly.coords[i]
+                ops.append(("delete", key, i, float(x), float(y)))
+            remaining = np.delete(poly.coords, idx, axis=0)
+            if len(remaining) < 2:
+                ops.append(("remove", key, poly.color, poly.class_id, poly.is_closed, remaining.ravel()))
+        if not ops:
+            return
+        self._commit(*ops)
+        if self.active_key not in self.polygons:
+            self.active_key = None
+
+    def extract_polygons(self, selection, color, class_id):
+        """
+        Creates one closed polygon per source polygon from its selected vertices
+        (kept in their original order), as one edit. Sources with fewer than 3
+        selected vertices are skipped. Returns the new keys.
+        """
+        ops = []
+        for key, idx in selection.items():
+            poly = self.polygons.get(key)
+            if poly is None or len(idx) < 3:
+                continue
+            coords = poly.coords[np.unique(idx)].ravel()
+            ops.append(("create", self.new_key(), color, class_id, True, coords))
+        if ops:
+            self._commit(*ops)
+        return [op[1] for op in ops]
 
     def clear_all(self):
         """Clears all polygons."""
+        self.selection = {}
+        self.all_dirty = True
         self.polygons.clear()
-        self.current_free_polygon = None
+        self.history.clear()
+        self.vertex_index.clear()
+        self.segment_index.clear()
+        self.active_key = None
         self.temp_free_point = None